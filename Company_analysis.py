@@ -1,15 +1,11 @@
 import streamlit as st
 import google.generativeai as genai
 import os
-import time
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
 import pandas as pd
 import numpy as np
-from newspaper import Article
-import concurrent.futures
 import re  # Import the regular expression module
+import news_fetch
 
 
 # Configure page settings
@@ -330,18 +326,19 @@ st.markdown(f"""
 <p style='text-align: center; color: #6b7280;'>Last Updated: {current_time}</p>
 """, unsafe_allow_html=True)
 
-# Helper function to fetch article content using newspaper3k
-def fetch_article_content(url):
-    """
-    Fetch article content using newspaper3k
-    """
-    try:
-        article = Article(url)
-        article.download()
-        article.parse()
-        return article.text, article.summary # Return both text and summary
-    except Exception as e:
-        return "Could not fetch article details.", "No summary available"
+def company_news_queries(company_name):
+    return [
+        f"{company_name}+company+news",
+        f"{company_name}+financial+news",
+        f"{company_name}+stock+news",
+        f"{company_name}+product+announcements",
+        f"{company_name}+leadership+changes",
+        f"{company_name}+mergers+acquisitions",
+        f"{company_name}+market+analysis",
+        f"{company_name}+competitor+analysis",
+
+    ]
+
 
 # News scraping function with detailed article content and GDP filtering
 def fetch_company_news(company_name, num_articles=10): # Adjusted default to 10
@@ -349,40 +346,8 @@ def fetch_company_news(company_name, num_articles=10): # Adjusted default to 10
     Improved news scraping function with detailed article content
     """
     try:
-        base_url = "https://www.google.com/search?q="
-        search_queries = [
-            f"{company_name}+company+news",
-            f"{company_name}+financial+news",
-            f"{company_name}+stock+news",
-            f"{company_name}+product+announcements",
-            f"{company_name}+leadership+changes",
-            f"{company_name}+mergers+acquisitions",
-            f"{company_name}+market+analysis",
-            f"{company_name}+competitor+analysis",
-
-        ]
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,/;q=0.8"
-        }
-
-        all_news_items = []
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_articles = {}
-            for query in search_queries:
-                url = f"{base_url}{query}&tbm=nws"
-                future = executor.submit(fetch_news_from_url, url, query, headers)
-                future_to_articles[future] = query
-
-            for future in concurrent.futures.as_completed(future_to_articles):
-                query = future_to_articles[future]
-                try:
-                    news_items = future.result()
-                    all_news_items.extend(news_items)
-
-                except Exception as e:
-                    st.error(f"Error fetching news for {query}: {str(e)}")
+        # Only the search pages are fetched; an article's text is only downloaded once its expander is opened (see news_fetch.py)
+        all_news_items = news_fetch.fetch_news(company_news_queries(company_name), lazy=True)
 
 
         return all_news_items[:num_articles]  # Return top N articles
@@ -391,91 +356,6 @@ def fetch_company_news(company_name, num_articles=10): # Adjusted default to 10
         st.error(f"Error fetching news: {str(e)}")
         return []
 
-def fetch_news_from_url(url, query, headers):
-    """Fetches news from a given URL and returns a list of news items."""
-    news_items = []
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        articles = soup.select('div.SoaBEf') or \
-                   soup.select('div.Gx5Zad') or \
-                   soup.select('g-card')
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_article = {}
-
-            for article in articles:
-                try:
-                    # Extract title and URL
-                    title_elem = article.select_one('.vvjwJb') or \
-                               article.select_one('.n0jPhd') or \
-                               article.select_one('.mCBkyc')
-
-                    link_elem = article.select_one('a')
-
-                    # Extract source and time
-                    metadata_elem = article.select_one('.UPmit') or \
-                                  article.select_one('.LfVVr') or \
-                                  article.select_one('.CEMjEf')
-
-                    time_elem = article.select_one('time') or \
-                               article.select_one('.ZE0LJd') or \
-                               article.select_one('.jJzYv')
-
-                    # Extract summary
-                    summary_elem = article.select_one('.GI74Re') or \
-                                 article.select_one('.VwiC3b') or \
-                                 article.select_one('.s3v9rd')
-
-                    if title_elem and link_elem:
-                        title = title_elem.get_text().strip()
-                        url = link_elem.get('href', '')
-
-                        # Extract source and time if available
-                        source = metadata_elem.get_text().strip() if metadata_elem else "News Source"
-                        published_time = time_elem.get_text().strip() if time_elem else "Recent"
-
-                        # Extract summary if available
-                        summary = summary_elem.get_text().strip() if summary_elem else "No summary available"
-
-                        # Submit article fetching task to thread pool
-                        if url:
-                            future = executor.submit(fetch_article_content, url)
-                            future_to_article[future] = {
-                                'index': len(news_items),
-                                'title': title,
-                                'source': source,
-                                'time': published_time,
-                                'summary': summary,
-                                'url': url,
-                                'query': query
-                            }
-                            news_items.append(None) # Placeholder, will be filled after thread completion
-
-                except Exception as e:
-                    continue
-
-            # Collect results from threads
-            for future in concurrent.futures.as_completed(future_to_article):
-                article_data_placeholder = future_to_article[future]
-                article_index = article_data_placeholder['index']
-                try:
-                    full_text, full_summary = future.result()
-                    if article_index < len(news_items):
-                        news_items[article_index] = {**article_data_placeholder, 'full_text': full_text, 'full_summary':full_summary} # Fill in the placeholder
-                except Exception as e:
-                     if article_index < len(news_items):
-                        if news_items[article_index] is None: # in case placeholder is still None
-                            news_items[article_index] = article_data_placeholder # to avoid key error
-                        news_items[article_index]['full_text'] = "Error fetching article content."
-                        news_items[article_index]['full_summary'] = "Could not fetch the summary"
-        return news_items
-    except Exception as e:
-        return []
-
 # Helper function to generate analysis prompt - Modified for Company Research
 def get_analysis_prompt(company_name, news_items):
     news_summary_list = []
@@ -547,56 +427,80 @@ with col2:
     pass
 
 # Function to display news (modified for company news)
-def display_company_news(company_name):
+def display_company_news(company_name, num_articles=10, status=None):
     """
-    Enhanced news display with collapsible detailed content for company news
+    Enhanced news display with collapsible detailed content for company news.
+    Articles are shown as their searches come back, numbered in arrival order, which is also the order
+    they are returned in for the prompt; the rest are cancelled once num_articles are shown.
     """
-    # Display news with loading animation - Spinner moved to the analysis tab
-    news_items = fetch_company_news(company_name)
-    time.sleep(0.5)
-
-    if news_items:
-        st.markdown(f"""
-            <div class="news-container">
-                <div class="news-header">
-                    📰 Latest News for {company_name}
-                    <span class="news-date">
-                        {datetime.now().strftime("%B %d, %Y %H:%M")}
-                    </span>
-                </div>
+    st.markdown(f"""
+        <div class="news-container">
+            <div class="news-header">
+                📰 Latest News for {company_name}
+                <span class="news-date">
+                    {datetime.now().strftime("%B %d, %Y %H:%M")}
+                </span>
             </div>
-        """, unsafe_allow_html=True)
-
-        news_container = st.container()
-        with news_container:
-           for i, item in enumerate(news_items):
-                news_item_class = "news-item"
+        </div>
+    """, unsafe_allow_html=True)
 
+    news_container = st.container()
+    news_items = []
+    report = {}
+    stream = news_fetch.iter_news(company_news_queries(company_name), lazy=True, report=report)
+    try:
+        for item in stream:
+            news_items.append(item)
+            with news_container:
+                render_company_news_item(item, len(news_items))
+            if status is not None:
+                status.info(f"Fetching latest company news... {len(news_items)} articles", icon="🔍")
+            if len(news_items) >= num_articles:
+                break
+    except Exception as e:
+        st.error(f"Error fetching news: {str(e)}")
+    finally:
+        # Cancels the searches still pending and fills the report
+        stream.close()
+    if report:
+        st.caption(f"🕒 News: {news_fetch.describe_report(report)}")
 
-                with st.expander(f"📰 {item['title']}", expanded = False):
-                     st.markdown(f"""
-                        <div class="{news_item_class}">
-                            <div class="news-summary">{item['summary']}</div>
-                            <div class="news-source">
-                                <a href="{item['url']}" target="_blank" class="news-source-link">
-                                    🗞️ {item['source']}
-                                </a>
-                            </div>
-                            <div class="news-time">⏰ {item['time']}</div>
-                            <div class="news-full-text">
-                                <p><strong>Full Summary:</strong></p>
-                                <p>{item['full_summary'] if item['full_summary'] else 'No full summary available'}</p>
-                                <p><strong>Full Article Text:</strong></p>
-                                <p>{item['full_text'] if item['full_text'] else 'No full text available'}</p>
-                            </div>
-                        </div>
-                    """, unsafe_allow_html=True)
-
+    if news_items:
         return news_items
     else:
         st.info("Fetching news... If no results appear, try refreshing the page.", icon="ℹ️")
         return []
 
+
+@st.fragment
+def render_company_news_item(item, number):
+    # Opening the expander reruns only this fragment, so the searches and the analysis are not redone;
+    # the text is downloaded then, within news_fetch.DEADLINE
+    expander = st.expander(f"[{number}] 📰 {item['title']}", expanded = False, key=f"news_{item['url']}", on_change="rerun")
+    with expander:
+         st.markdown(f"""
+            <div class="news-item">
+                <div class="news-summary">{item['summary']}</div>
+                <div class="news-source">
+                    <a href="{item['url']}" target="_blank" class="news-source-link">
+                        🗞️ {item['source']}
+                    </a>
+                </div>
+                <div class="news-time">⏰ {item['time']}</div>
+            </div>
+        """, unsafe_allow_html=True)
+         if expander.open:
+             with st.spinner("Loading the full article..."):
+                 full_summary, full_text = item.article_summary(), item.text()
+             st.markdown(f"""
+                <div class="news-full-text">
+                    <p><strong>Full Summary:</strong></p>
+                    <p>{full_summary or 'No full summary available'}</p>
+                    <p><strong>Full Article Text:</strong></p>
+                    <p>{full_text or 'No full text available'}</p>
+                </div>
+            """, unsafe_allow_html=True)
+
 if company_name:
     if not api_key:
         st.stop()
@@ -626,7 +530,8 @@ if company_name:
             status_placeholder = st.empty()
             status_placeholder.info("Fetching latest company news...", icon="🔍")
 
-            news_for_analysis = fetch_company_news(company_name)
+            # Articles appear as their searches come back, with the running count in the status line
+            news_for_analysis = display_company_news(company_name, status=status_placeholder)
             if news_for_analysis:
                 status_placeholder.success("News fetched successfully!", icon="✅")
             else:
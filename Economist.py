@@ -1,457 +1,91 @@
 import streamlit as st
 import google.generativeai as genai
 import os
-import time
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
 import pandas as pd
 import numpy as np
-from newspaper import Article
-import concurrent.futures
 import io  # Import for creating in-memory file - not needed anymore
 # from markdown2pdf import convert_from_markdown  # Import for PDF generation - not needed anymore
 import re  # Import the regular expression module
 import logging
+from collections import Counter
 import plotly.express as px
 from difflib import get_close_matches
 from fuzzywuzzy import process
+import country_autocomplete
+import country_resolver
+import gem_cache
+import gem_catalog
+import gem_loader
+import gem_panel
+import gem_periods
+import gem_snapshot
+import news_fetch
+import news_tagger
+import xlsx_stream
 
 
 # Configure logging for chart plotting functions
 logging.basicConfig(level=logging.INFO)
 data_path_input = "GemDataEXTR"
+# Map the warm-start snapshot (panel, derived series, catalog) so the first chart slices arrays,
+# and rebuild it in the background if it's missing or a workbook changed
+gem_snapshot.attach(data_path_input)
+gem_loader.start_panel_warmup(data_path_input)
 
 
 
-def normalize_country(text):
-    # Remove all non-alphanumeric characters and convert to lower case
-    return "".join(ch for ch in text.lower() if ch.isalnum())
-
 def get_matching_country(country, country_list=None):
-    # Normalize input
-    norm_input = normalize_country(country)
-    
-    # Comprehensive list of countries
-    all_countries = [
-        "Albania", "Advanced Economies", "Argentina", "Armenia", "Australia", "Austria", 
-        "Belgium", "Bulgaria", "Bahrain", "Bosnia and Herzegovina", "Belarus", "Bolivia", 
-        "Brazil", "Botswana", "Canada", "Switzerland", "Chile", "China", "Cameroon", 
-        "Colombia", "Costa Rica", "Cyprus", "Czech Republic", "Germany", "Denmark", 
-        "EMDE East Asia & Pacific", "EMDE Europe & Central Asia", "Ecuador", 
-        "Egypt, Arab Rep.", "Emerging Market and Developing Economies (EMDEs)", 
-        "Spain", "Estonia", "Finland", "France", "United Kingdom", "Georgia", "Ghana", 
-        "Greece", "Guatemala", "High Income Countries", "Hong Kong SAR, China", 
-        "Honduras", "Croatia", "Hungary", "Indonesia", "India", "Ireland", "Iceland", 
-        "Israel", "Italy", "Jamaica", "Jordan", "Japan", "Kazakhstan", "Kenya", 
-        "Korea, Rep.", "Kuwait", "EMDE Latin America & Caribbean", 
-        "Low-Income Countries (LIC)", "Sri Lanka", "Lithuania", "Luxembourg", "Latvia", 
-        "Morocco", "Moldova, Rep.", "Mexico", "Middle-Income Countries (MIC)", 
-        "North Macedonia", "Malta", "Mongolia", "EMDE Middle East & N. Africa", 
-        "Mauritius", "Malaysia", "Nigeria", "Nicaragua", "Netherlands", "Norway", 
-        "New Zealand", "Peru", "Philippines", "Poland", "Portugal", "Paraguay", 
-        "Romania", "Russian Federation", "EMDE South Asia", "Saudi Arabia", "Singapore", 
-        "El Salvador", "Serbia", "EMDE Sub-Saharan Africa", "Slovakia", "Slovenia", 
-        "Sweden", "Thailand", "Tunisia", "Turkey", "Taiwan, China", "Ukraine", 
-        "Uruguay", "United States", "Uzbekistan", "World (WBG members)", "South Africa",
-        "Afghanistan", "Algeria", "Angola", "Antigua and Barbuda", "Azerbaijan", 
-        "Bahamas", "Bangladesh", "Barbados", "Belize", "Benin", "Bhutan", 
-        "Brunei Darussalam", "Burkina Faso", "Burundi", "Cabo Verde", "Cambodia", 
-        "Central African Republic", "Chad", "Comoros", "Congo, Dem. Rep.", 
-        "Congo, Rep.", "Côte d'Ivoire", "Cuba", "Djibouti", "Dominica", 
-        "Dominican Republic", "Equatorial Guinea", "Eritrea", "Eswatini", "Ethiopia", 
-        "Fiji", "Gabon", "Gambia", "Grenada", "Guinea", "Guinea-Bissau", "Guyana", 
-        "Haiti", "Iran, Islamic Rep.", "Iraq", "Kiribati", "Korea, Dem. People's Rep.", 
-        "Kyrgyz Republic", "Lao PDR", "Lebanon", "Lesotho", "Liberia", "Libya", 
-        "Madagascar", "Malawi", "Maldives", "Mali", "Marshall Islands", "Mauritania", 
-        "Micronesia, Fed. Sts.", "Montenegro", "Mozambique", "Myanmar", "Namibia", 
-        "Nauru", "Nepal", "Niger", "Oman", "Pakistan", "Palau", "Panama", 
-        "Papua New Guinea", "Qatar", "Rwanda", "Samoa", "San Marino", 
-        "São Tomé and Principe", "Senegal", "Seychelles", "Sierra Leone", 
-        "Solomon Islands", "Somalia", "South Sudan", "St. Kitts and Nevis", "St. Lucia", 
-        "St. Vincent and the Grenadines", "Sudan", "Suriname", "Syrian Arab Republic", 
-        "Tajikistan", "Tanzania", "Timor-Leste", "Togo", "Tonga", "Trinidad and Tobago", 
-        "Turkmenistan", "Tuvalu", "Uganda", "United Arab Emirates", "Vanuatu", 
-        "Venezuela, RB", "Vietnam", "Yemen, Rep.", "Zambia", "Zimbabwe"
-    ]
-    
-    # Use provided country_list or default to all_countries
-    if country_list is None:
-        country_list = all_countries
-
-
-    # Original mapping: keys will be normalized.
-    country_variants = {
-    "us":"United States",   
-    "usa": "United States",
-    "unitedstatesofamerica": "United States",
-    "u.s.a": "United States",
-    "unitedstates": "United States",
-    "uk": "United Kingdom",
-    "u.k.": "United Kingdom",
-    "britain": "United Kingdom",
-    "greatbritain": "United Kingdom",
-    "england": "United Kingdom",
-    "scotland": "United Kingdom",
-    "wales": "United Kingdom",
-    "northernireland": "United Kingdom",
-    "uae": "United Arab Emirates",
-    "emirates": "United Arab Emirates",
-    "southkorea": "Korea, Rep.",
-    "republicofkorea": "Korea, Rep.",
-    "northkorea": "Korea, Dem. People’s Rep.",
-    "dprk": "Korea, Dem. People’s Rep.",
-    "russia": "Russian Federation",
-    "ussr": "Russian Federation",
-    "sovietunion": "Russian Federation",
-    "czechia": "Czech Republic",
-    "czechrepublic": "Czech Republic",
-    "slovakrepublic": "Slovakia",
-    "slovakia": "Slovakia",
-    "egypt": "Egypt, Arab Rep.",
-    "world": "World (WBG members)",
-    "emergingmarkets": "Emerging Market and Developing Economies (EMDEs)",
-    "advancedeconomies": "Advanced Economies",
-    "lowincomecountries": "Low-Income Countries (LIC)",
-    "middleincomecountries": "Middle-Income Countries (MIC)",
-    "southafrica": "South Africa",
-    "rsa": "South Africa",
-    "taiwan": "Taiwan, China",
-    "roc": "Taiwan, China",
-    "venezuela": "Venezuela, RB",
-    "ivorycoast": "Côte d’Ivoire",
-    "bolivia": "Bolivia",
-    "iran": "Iran, Islamic Rep.",
-    "persia": "Iran, Islamic Rep.",
-    "vietnam": "Viet Nam",
-    "vietnam": "Viet Nam",
-    "hongkong": "Hong Kong SAR, China",
-    "hk": "Hong Kong SAR, China",
-    "india": "India",
-    "bharat": "India",
-    "australia": "Australia",
-    "oz": "Australia",
-    "canada": "Canada",
-    "ca": "Canada",
-    "germany": "Germany",
-    "deutschland": "Germany",
-    "france": "France",
-    "frenchrepublic": "France",
-    "japan": "Japan",
-    "nippon": "Japan",
-    "brazil": "Brazil",
-    "brasil": "Brazil",
-    "mexico": "Mexico",
-    "méxico": "Mexico",
-    "peru": "Peru",
-    "chile": "Chile",
-    "colombia": "Colombia",
-    "argentina": "Argentina",
-    "algeria": "Algeria",
-    "algérie": "Algeria",
-    "morocco": "Morocco",
-    "maroc": "Morocco",
-    "nigeria": "Nigeria",
-    "ghana": "Ghana",
-    "kenya": "Kenya",
-    "ethiopia": "Ethiopia",
-    "tanzania": "Tanzania, United Rep.",
-    "uganda": "Uganda",
-    "southsudan": "South Sudan",
-    "sudan": "Sudan",
-    "lebanon": "Lebanon",
-    "jordan": "Jordan",
-    "iraq": "Iraq",
-    "kuwait": "Kuwait",
-    "qatar": "Qatar",
-    "oman": "Oman",
-    "bahrain": "Bahrain",
-    "cyprus": "Cyprus",
-    "croatia": "Croatia",
-    "hrvatska": "Croatia",
-    "bosniaandherzegovina": "Bosnia and Herzegovina",
-    "bih": "Bosnia and Herzegovina",
-    "serbia": "Serbia",
-    "srbija": "Serbia",
-    "bulgaria": "Bulgaria",
-    "българия": "Bulgaria",
-    "romania": "Romania",
-    "românia": "Romania",
-    "hungary": "Hungary",
-    "magyarország": "Hungary",
-    "greece": "Greece",
-    "hellas": "Greece",
-    "italy": "Italy",
-    "italia": "Italy",
-    "spain": "Spain",
-    "españa": "Spain",
-    "portugal": "Portugal",
-    "portugueserepublic": "Portugal",
-    "poland": "Poland",
-    "polska": "Poland",
-    "sweden": "Sweden",
-    "sverige": "Sweden",
-    "switzerland": "Switzerland",
-    "suisse": "Switzerland",
-    "schweiz": "Switzerland",
-    "svizzera": "Switzerland",
-    "austria": "Austria",
-    "österreich": "Austria",
-    "belgium": "Belgium",
-    "belgique": "Belgium",
-    "belgië": "Belgium",
-    "netherlands": "Netherlands",
-    "holland": "Netherlands",
-    "denmark": "Denmark",
-    "danmark": "Denmark",
-    "norway": "Norway",
-    "norge": "Norway",
-    "finland": "Finland",
-    "suomi": "Finland",
-    "ireland": "Ireland",
-    "éire": "Ireland",
-    "newzealand": "New Zealand",
-    "nz": "New Zealand",
-    "singapore": "Singapore",
-    "singapura": "Singapore",
-    "malaysia": "Malaysia",
-    "malaisie": "Malaysia",
-    "thailand": "Thailand",
-    "siam": "Thailand",
-    "indonesia": "Indonesia",
-    "philippines": "Philippines",
-    "brunei": "Brunei Darussalam",
-    "macau": "Macau SAR, China",
-    "mongolia": "Mongolia",
-    "монголулс": "Mongolia",
-    "costarica": "Costa Rica",
-    "panama": "Panama",
-    "dominicanrepublic": "Dominican Rep.",
-    "haiti": "Haiti",
-    "jamaica": "Jamaica",
-    "trinidadandtobago": "Trinidad & Tobago",
-    "barbados": "Barbados",
-    "bahamas": "Bahamas",
-    "cuba": "Cuba",
-    "guyana": "Guyana",
-    "suriname": "Suriname",
-    "belize": "Belize",
-    "guatemala": "Guatemala",
-    "honduras": "Honduras",
-    "elsalvador": "El Salvador",
-    "nicaragua": "Nicaragua",
-    "ecuador": "Ecuador",
-    "paraguay": "Paraguay",
-    "uruguay": "Uruguay",
-    "turkey": "Turkey",
-    "turkiye": "Turkey",
-    "saudiarabia": "Saudi Arabia",
-    "ksa": "Saudi Arabia",
-    "israel": "Israel",
-    "israelistate": "Israel",
-    "palestine": "Palestine",
-    "jordan": "Jordan",
-    "lebanon": "Lebanon",
-    "iraq": "Iraq",
-    "kuwait": "Kuwait",
-    "qatar": "Qatar",
-    "oman": "Oman",
-    "bahrain": "Bahrain",
-    "cyprus": "Cyprus",
-    "croatia": "Croatia",
-    "hrvatska": "Croatia",
-    "bosniaandherzegovina": "Bosnia and Herzegovina",
-    "bih": "Bosnia and Herzegovina",
-    "serbia": "Serbia",
-    "srbija": "Serbia",
-    "bulgaria": "Bulgaria",
-    "българия": "Bulgaria",
-    "romania": "Romania",
-    "românia": "Romania",
-    "hungary": "Hungary",
-    "magyarország": "Hungary",
-    "greece": "Greece",
-    "hellas": "Greece",
-    "italy": "Italy",
-    "italia": "Italy",
-    "spain": "Spain",
-    "españa": "Spain",
-    "portugal": "Portugal",
-    "portugueserepublic": "Portugal",
-    "poland": "Poland",
-    "polska": "Poland",
-    "sweden": "Sweden",
-    "sverige": "Sweden",
-    "switzerland": "Switzerland",
-    "suisse": "Switzerland",
-    "schweiz": "Switzerland",
-    "svizzera": "Switzerland",
-    "austria": "Austria",
-    "österreich": "Austria",
-    "belgium": "Belgium",
-    "belgique": "Belgium",
-    "belgië": "Belgium",
-    "netherlands": "Netherlands",
-    "holland": "Netherlands",
-    "denmark": "Denmark",
-    "danmark": "Denmark",
-    "norway": "Norway",
-    "norge": "Norway",
-    "finland": "Finland",
-    "suomi": "Finland",
-    "ireland": "Ireland",
-    "éire": "Ireland",
-    "newzealand": "New Zealand",
-    "nz": "New Zealand",
-    "singapore": "Singapore",
-    "singapura": "Singapore",
-    "malaysia": "Malaysia",
-    "malaisie": "Malaysia",
-    "thailand": "Thailand",
-    "siam": "Thailand",
-    "indonesia": "Indonesia",
-    "philippines": "Philippines",
-    "brunei": "Brunei Darussalam",
-    "macau": "Macau SAR, China",
-    "mongolia": "Mongolia",
-    "монголулс": "Mongolia",
-    "costarica": "Costa Rica",
-    "panama": "Panama",
-    "dominicanrepublic": "Dominican Rep.",
-    "haiti": "Haiti",
-    "jamaica": "Jamaica",
-    "trinidadandtobago": "Trinidad & Tobago",
-    "barbados": "Barbados",
-    "bahamas": "Bahamas",
-    "cuba": "Cuba",
-    "guyana": "Guyana",
-    "suriname": "Suriname",
-    "belize": "Belize",
-    "guatemala": "Guatemala",
-    "honduras": "Honduras",
-    "elsalvador": "El Salvador",
-    "nicaragua": "Nicaragua",
-    "ecuador": "Ecuador",
-    "paraguay": "Paraguay",
-    "uruguay": "Uruguay",
-    "turkey": "Turkey",
-    "turkiye": "Turkey",
-    "saudiarabia": "Saudi Arabia",
-    "ksa": "Saudi Arabia",
-    "israel": "Israel",
-    "israelistate": "Israel",
-    "palestine": "Palestine",
-    "jordan": "Jordan",
-    "lebanon": "Lebanon",
-    "iraq": "Iraq",
-    "kuwait": "Kuwait",
-    "qatar": "Qatar",
-    "oman": "Oman",
-    "bahrain": "Bahrain",
-    "cyprus": "Cyprus",
-    "croatia": "Croatia",
-    "hrvatska": "Croatia",
-    "bosniaandherzegovina": "Bosnia and Herzegovina",
-    "bih": "Bosnia and Herzegovina",
-    "serbia": "Serbia",
-    "srbija": "Serbia",
-    "bulgaria": "Bulgaria",
-    "българия": "Bulgaria",
-    "romania": "Romania",
-    "românia": "Romania",
-    "hungary": "Hungary",
-    "magyarország": "Hungary",
-    "greece": "Greece",
-    "hellas": "Greece",
-    "italy": "Italy",
-    "italia": "Italy",
-    "spain": "Spain",
-    "españa": "Spain",
-    "portugal": "Portugal",
-    "portugueserepublic": "Portugal",
-    "poland": "Poland",
-    "polska": "Poland",
-    "sweden": "Sweden",
-    "sverige": "Sweden",
-    "switzerland": "Switzerland",
-    "suisse": "Switzerland",
-    "schweiz": "Switzerland",
-    "svizzera": "Switzerland",
-    "austria": "Austria",
-    "österreich": "Austria",
-    "belgium": "Belgium",
-    "belgique": "Belgium",
-    "belgië": "Belgium",
-    "netherlands": "Netherlands",
-    "holland": "Netherlands"
-}
-
-    # Normalize the keys in the variants mapping
-    normalized_variants = {normalize_country(k): v for k, v in country_variants.items()}
-    
-    # Check for direct match in variants
-    if norm_input in normalized_variants:
-        variant_match = normalized_variants[norm_input]
-        # Verify the variant match exists in country_list
-        for country_name in country_list:
-            if variant_match == country_name:
-                return variant_match
-    
-    # If no direct variant match found, use fuzzy matching
-    # First, try exact match on normalized country list
-    normalized_country_dict = {normalize_country(name): name for name in country_list}
-    if norm_input in normalized_country_dict:
-        return normalized_country_dict[norm_input]
-    
-    # If no exact match, use fuzzy matching with configurable threshold
-    match, score = process.extractOne(norm_input, [normalize_country(c) for c in country_list])
-    
-    if score >= 70:  # Slightly lower threshold without difflib fallback
-        # Map back to original name
-        for country_name in country_list:
-            if normalize_country(country_name) == match:
-                return country_name
-    
-    return None
+    # Aliases, exact normalized names, then fuzzy matching over an n-gram shortlist; the tables are
+    # compiled once per candidate list and results are memoized (see country_resolver.py)
+    return country_resolver.get_resolver(country_list).resolve(country)
 
 def load_data(file_path, sheet_name, country, indicator_name):
     try:
         logging.info(f"Loading data from {file_path} ({sheet_name}) for {country}")
-        xls = pd.ExcelFile(file_path)
-        if sheet_name not in xls.sheet_names:
-            logging.error(f"Worksheet named '{sheet_name}' not found in {file_path}. Available sheets: {xls.sheet_names}")
+        # Sheets are served from the columnar cache (see gem_cache.py) instead of openpyxl.
+        # On a cold cache the requested column is streamed straight out of the sheet XML.
+        # Once the catalog is built, sheet and column checks don't open the workbook at all.
+        catalog = gem_catalog.peek_catalog(os.path.dirname(file_path))
+        source = gem_cache if gem_cache.is_cached(file_path) else xlsx_stream
+        available_sheets = catalog.sheet_names(file_path) if catalog is not None else source.sheet_names(file_path)
+        if sheet_name not in available_sheets:
+            logging.error(f"Worksheet named '{sheet_name}' not found in {file_path}. Available sheets: {available_sheets}")
             return None
-        df = pd.read_excel(xls, sheet_name=sheet_name).dropna(how="all")
-        df.columns = df.columns.str.strip()
-        if 'Unnamed: 0' not in df.columns:
-            logging.error("Expected 'Unnamed: 0' column for years not found.")
-            return None
-        df.rename(columns={"Unnamed: 0": "Year"}, inplace=True)
-        # Match country name
-        matched_country = get_matching_country(country, df.columns)
+        if catalog is not None:
+            # Columns carry their country ID in the manifest, so this is a dict lookup
+            country_columns = catalog.columns(file_path, sheet_name)
+            matched_country = catalog.column_for(file_path, sheet_name, country_resolver.country_id(country))
+        else:
+            columns = source.read_header(file_path, sheet_name)
+            if 'Unnamed: 0' not in columns:
+                logging.error("Expected 'Unnamed: 0' column for years not found.")
+                return None
+            country_columns = [column for column in columns if column != 'Unnamed: 0']
+            # Match country name
+            matched_country = get_matching_country(country, country_columns)
         if not matched_country:
-            logging.error(f"{indicator_name} data not found for {country}. Available: {df.columns[1:].tolist()}")
+            logging.error(f"{indicator_name} data not found for {country}. Available: {country_columns}")
             return None
-        try:
-            data = df[["Year", matched_country]].dropna()
-        except KeyError:
+        if catalog is not None and not catalog.has_series(file_path, sheet_name, matched_country):
+            logging.info(f"{indicator_name} has no {sheet_name} data for {matched_country}")
             return None
+        # Only the period column and the matched country column are read from disk
+        df = source.read_sheet(file_path, sheet_name, columns=['Unnamed: 0', matched_country])
+        # Period labels of the whole sheet are parsed once and shared by every country (see gem_periods.py):
+        # int years for annual sheets, period-start dates for quarterly and monthly ones
+        axis = gem_periods.sheet_axis(file_path, sheet_name, df['Unnamed: 0'])
+        df.rename(columns={"Unnamed: 0": "Year"}, inplace=True)
+        data = df[["Year", matched_country]].dropna()
         data.columns = ["Year", indicator_name]
-        # Convert "Year" differently based on sheet type
-        if sheet_name == "monthly":
-            data["Year"] = data["Year"].apply(
-                lambda x: pd.to_datetime(x.replace("M", "-"), format='%Y-%m') if isinstance(x, str) else x
-            )
-        else:
-            data["Year"] = data["Year"].astype(int)
+        data["Year"] = axis.lookup(data["Year"])
         return data
     except Exception as e:
         logging.error(f"Error loading data: {e}")
         return None
 
-def analyze_country_charts(country, data_path):
-    matched_country = get_matching_country(country, None)
-    datasets = {
+def get_chart_datasets(data_path):
+    return {
         "GDP": {"file": f"{data_path}/GDP at market prices, current US$, millions, seas. adj..xlsx", "sheet": "annual"},
         "CPI": {"file": f"{data_path}/CPI Price, % y-o-y, nominal, seas. adj..xlsx", "sheet": "annual"},
         "Unemployment Rate": {"file": f"{data_path}/Unemployment Rate, seas. adj..xlsx", "sheet": "annual"},
@@ -465,17 +99,37 @@ def analyze_country_charts(country, data_path):
         "Retail Sales Volume Index": {"file": f"{data_path}/Retail Sales Volume Index, seas. adj..xlsx", "sheet": "annual"}
     }
 
+def analyze_country_charts(country, data_path, prefetch=None, country_id=None):
+    datasets = get_chart_datasets(data_path)
+    if prefetch is None:
+        prefetch = gem_loader.prefetch(datasets, data_path)
+    # Slice from the shared panel once it's built; until then each workbook is read from
+    # the cache as soon as its prefetch lands
+    panel = gem_panel.peek_panel(data_path)
+    catalog = gem_catalog.peek_catalog(data_path)
+    # Resolve the input to a canonical country ID once; each dataset's column is then found by ID
+    country_id = country_id or country_resolver.country_id(country)
+    matched_country = country_resolver.country_name(country_id)
+
     st.subheader("Economic Indicator Charts") # Add a subheader for charts
-    for indicator, params in datasets.items():
-        data = load_data(params["file"], params["sheet"], country, indicator)
-        dataset_title = os.path.basename(params["file"]).replace(".xlsx", "")
+    for indicator, params in prefetch.as_completed():
+        dataset_title = gem_panel.indicator_key(params["file"])
+        column = catalog.column_for(params["file"], params["sheet"], country_id) if catalog is not None else None
+        if catalog is not None and not catalog.has_series(params["file"], params["sheet"], column):
+            # Known to be missing, no need to touch the panel or the workbook
+            data = None
+        elif panel is not None:
+            column = column or panel.country_for(country_id)
+            data = panel.series(dataset_title, params["sheet"], column, indicator) if column else None
+        else:
+            data = load_data(params["file"], params["sheet"], country, indicator)
         if data is not None:
             title = f"{dataset_title} Trend for {matched_country}"
             fig = px.line(data, x="Year", y=indicator, title=title)
             fig.update_traces(mode="lines+markers")
             st.plotly_chart(fig, use_container_width=True)
         else:
-            st.warning(f"") # Inform user if chart data is missing
+            st.warning(f"No {dataset_title} data available for {matched_country or country}") # Inform user if chart data is missing
 # Chart plotting functions from the first code block - END
 
 
@@ -810,189 +464,92 @@ st.markdown(f"""
 <p style='text-align: center; color: #6b7280;'>Last Updated: {current_time}</p>
 """, unsafe_allow_html=True)
 
-# Helper function to fetch article content using newspaper3k (rest of the functions are the same as provided in the prompt)
-def fetch_article_content(url):
+def economic_news_queries(country):
+    # Searches behind the economic news, most general first; ties in ranking go to the earlier search
+    return [
+        f"{country}+economy+financial+news",
+        f"{country}+economic+outlook", # Added economic outlook
+        f"{country}+financial+stability", # Added financial stability
+        f"{country}+economic+indicators", # Added economic indicators
+        f"{country}+fiscal+policy",      # Added fiscal policy
+        f"{country}+monetary+policy",    # Added monetary policy
+        f"{country}+trade+balance",      # Added trade balance
+        f"{country}+inflation+rate",     # Added inflation rate
+        f"{country}+interest+rates",     # Added interest rates
+        f"{country}+unemployment+rate",  # Added unemployment+rate
+        f"{country}+consumer+confidence", # Added consumer confidence
+        f"{country}+business+sentiment",  # Added business sentiment
+        f"{country}+bond+market+news",
+        f"{country}+stock+market+news",
+        f"{country}+yield+curve+news",
+        f"{country}+exchange+rate+news", # Added exchange rate news as requested
+        f"{country}+economic+growth+news", # Added economic growth news
+        f"{country}+sovereign+debt+news",  # Added sovereign debt news
+        f"{country}+credit+rating+news", # Added credit rating news
+        f"{country}+banking+sector+news"  # Added banking sector news
+    ]
+
+
+def stream_economic_news(country, num_articles=10, report=None):
     """
-    Fetch article content using newspaper3k
+    fetch_economic_news's articles as they arrive: each is yielded tagged, with its 'bucket', as soon as
+    the quota accepts it, so the page can show it before the slower searches are back. The stream ends
+    at news_fetch.DEADLINE at the latest; `report` (a dict) is then filled with what was dropped and why.
     """
-    try:
-        article = Article(url)
-        article.download()
-        article.parse()
-        return article.text, article.summary # Return both text and summary
-    except Exception as e:
-        return "Could not fetch article details.", "No summary available"
+    # Only the search pages are fetched (see news_fetch.py): the prompt needs nothing but the title,
+    # snippet, source and time, and an article's text is only downloaded once its expander is opened.
+    # The quota tags each result (countries, topics) from its title and snippet and stops the searches
+    # once the buckets below are full; the country tags only rank the results (see news_tagger.py)
+    quota = news_tagger.BucketQuota(num_articles)
+    yield from news_fetch.iter_news(economic_news_queries(country), quota=quota, lazy=True, report=report)
+
+
+def rank_economic_news(country, news_items, num_articles=10, country_id=None):
+    """
+    Streamed articles in prompt order: GDP, bond, stock and yield news, each by relevance, then other news
+    """
+    country_id = country_id or country_resolver.country_id(country)
+    search_order = {query: i for i, query in enumerate(economic_news_queries(country))}
+
+    def rank(item):
+        first_hit = item['hits'][0]
+        return news_tagger.relevance(item, country_id), search_order.get(first_hit['query'], 0), first_hit['rank']
+
+    buckets = {bucket: [] for bucket in news_tagger.BUCKETS}
+    for item in news_items:
+        buckets[item['bucket']].append(item)
+    for bucket_items in buckets.values():
+        bucket_items.sort(key=rank)
+    gdp_news_items = buckets["gdp"]
+    bond_news_items = buckets["bond"]
+    stock_news_items = buckets["stock"]
+    yield_news_items = buckets["yield"]
+    other_news_items = buckets["other"]
+
+    combined_news_items = (
+        gdp_news_items[:num_articles] +
+        bond_news_items[:num_articles] +
+        stock_news_items[:num_articles] +
+        yield_news_items[:num_articles] +
+        other_news_items[:max(0, num_articles - len(gdp_news_items) - len(bond_news_items)- len(stock_news_items) - len(yield_news_items))] # Prioritize GDP news, then fill with others
+    )
+    return combined_news_items
+
 
 # News scraping function with detailed article content and GDP filtering
-def fetch_economic_news(country, num_articles=10): # Adjusted default to 10
+def fetch_economic_news(country, num_articles=10, country_id=None): # Adjusted default to 10
     """
     Improved news scraping function with detailed article content and GDP filtering
     """
     try:
-        base_url = "https://www.google.com/search?q="
-        search_queries = [
-            f"{country}+economy+financial+news",
-            f"{country}+economic+outlook", # Added economic outlook
-            f"{country}+financial+stability", # Added financial stability
-            f"{country}+economic+indicators", # Added economic indicators
-            f"{country}+fiscal+policy",      # Added fiscal policy
-            f"{country}+monetary+policy",    # Added monetary policy
-            f"{country}+trade+balance",      # Added trade balance
-            f"{country}+inflation+rate",     # Added inflation rate
-            f"{country}+interest+rates",     # Added interest rates
-            f"{country}+unemployment+rate",  # Added unemployment+rate
-            f"{country}+consumer+confidence", # Added consumer confidence
-            f"{country}+business+sentiment",  # Added business sentiment
-            f"{country}+bond+market+news",
-            f"{country}+stock+market+news",
-            f"{country}+yield+curve+news",
-            f"{country}+exchange+rate+news", # Added exchange rate news as requested
-            f"{country}+economic+growth+news", # Added economic growth news
-            f"{country}+sovereign+debt+news",  # Added sovereign debt news
-            f"{country}+credit+rating+news", # Added credit rating news
-            f"{country}+banking+sector+news"  # Added banking sector news
-        ]
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,/;q=0.8"
-        }
-
-        all_news_items = []
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_articles = {}
-            for query in search_queries:
-                url = f"{base_url}{query}&tbm=nws"
-                future = executor.submit(fetch_news_from_url, url, query, headers)
-                future_to_articles[future] = query
-
-            for future in concurrent.futures.as_completed(future_to_articles):
-                query = future_to_articles[future]
-                try:
-                    news_items = future.result()
-                    all_news_items.extend(news_items)
-
-                except Exception as e:
-                    st.error(f"Error fetching news for {query}: {str(e)}")
-
-        gdp_news_items = []
-        bond_news_items = []
-        stock_news_items = []
-        yield_news_items = []
-        other_news_items = []
-        gdp_keywords = ["GDP", "growth rate", "economic growth", "GDP growth", "percent growth", "% growth", "gdp percentage", "growth percentage"]
-
-        for item in all_news_items:
-           is_gdp_news = any(keyword.lower() in item['full_text'].lower() for keyword in gdp_keywords)
-           if is_gdp_news:
-                gdp_news_items.append(item)
-           elif "bond" in item['query'].lower():
-                bond_news_items.append(item)
-           elif "stock" in item['query'].lower():
-                stock_news_items.append(item)
-           elif "yield" in item['query'].lower():
-                yield_news_items.append(item)
-           else:
-               other_news_items.append(item)
-
-        combined_news_items = (
-            gdp_news_items[:num_articles] +
-            bond_news_items[:num_articles] +
-            stock_news_items[:num_articles] +
-            yield_news_items[:num_articles] +
-            other_news_items[:max(0, num_articles - len(gdp_news_items) - len(bond_news_items)- len(stock_news_items) - len(yield_news_items))] # Prioritize GDP news, then fill with others
-        )
-        return combined_news_items
+        country_id = country_id or country_resolver.country_id(country)
+        news_items = list(stream_economic_news(country, num_articles))
+        return rank_economic_news(country, news_items, num_articles, country_id)
 
     except Exception as e:
         st.error(f"Error fetching news: {str(e)}")
         return []
 
-def fetch_news_from_url(url, query, headers):
-    """Fetches news from a given URL and returns a list of news items."""
-    news_items = []
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        articles = soup.select('div.SoaBEf') or \
-                   soup.select('div.Gx5Zad') or \
-                   soup.select('g-card')
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_article = {}
-
-            for article in articles:
-                try:
-                    # Extract title and URL
-                    title_elem = article.select_one('.vvjwJb') or \
-                               article.select_one('.n0jPhd') or \
-                               article.select_one('.mCBkyc')
-
-                    link_elem = article.select_one('a')
-
-                    # Extract source and time
-                    metadata_elem = article.select_one('.UPmit') or \
-                                  article.select_one('.LfVVr') or \
-                                  article.select_one('.CEMjEf')
-
-                    time_elem = article.select_one('time') or \
-                               article.select_one('.ZE0LJd') or \
-                               article.select_one('.jJzYv')
-
-                    # Extract summary
-                    summary_elem = article.select_one('.GI74Re') or \
-                                 article.select_one('.VwiC3b') or \
-                                 article.select_one('.s3v9rd')
-
-                    if title_elem and link_elem:
-                        title = title_elem.get_text().strip()
-                        url = link_elem.get('href', '')
-
-                        # Extract source and time if available
-                        source = metadata_elem.get_text().strip() if metadata_elem else "News Source"
-                        published_time = time_elem.get_text().strip() if time_elem else "Recent"
-
-                        # Extract summary if available
-                        summary = summary_elem.get_text().strip() if summary_elem else "No summary available"
-
-                        # Submit article fetching task to thread pool
-                        if url:
-                            future = executor.submit(fetch_article_content, url)
-                            future_to_article[future] = {
-                                'index': len(news_items),
-                                'title': title,
-                                'source': source,
-                                'time': published_time,
-                                'summary': summary,
-                                'url': url,
-                                'query': query
-                            }
-                            news_items.append(None) # Placeholder, will be filled after thread completion
-
-                except Exception as e:
-                    continue
-
-            # Collect results from threads
-            for future in concurrent.futures.as_completed(future_to_article):
-                article_data_placeholder = future_to_article[future]
-                article_index = article_data_placeholder['index']
-                try:
-                    full_text, full_summary = future.result()
-                    if article_index < len(news_items):
-                        news_items[article_index] = {**article_data_placeholder, 'full_text': full_text, 'full_summary':full_summary} # Fill in the placeholder
-                except Exception as e:
-                     if article_index < len(news_items):
-                        if news_items[article_index] is None: # in case placeholder is still None
-                            news_items[article_index] = article_data_placeholder # to avoid key error
-                        news_items[article_index]['full_text'] = "Error fetching article content."
-                        news_items[article_index]['full_summary'] = "Could not fetch the summary"
-        return news_items
-    except Exception as e:
-        return []
-
 # Helper function to generate analysis prompt - Modified to EXCLUDE references from LLM output
 def get_analysis_prompt(country, news_items):
     news_summary_list = []
@@ -1089,11 +646,32 @@ col1, col2 = st.columns([2, 1])
 
 with col1:
     st.markdown("### 🔍 Country Analysis")
-    country_name = st.text_input(
+    country_input = st.text_input(
         "",
         placeholder="Enter country name (e.g., India, USA, Germany)",
         help="Enter the country name for detailed economic analysis"
     )
+    # Suggestions come from the country trie (see country_autocomplete.py); the chosen one carries the
+    # canonical country ID, so nothing downstream re-matches the typed text and misspellings never
+    # start a news fetch. Nothing runs until a country is picked, unless the input is already a full
+    # name or alias of one country. The ID drives the data; news, prompt and headings use the name
+    # as typed (see country_autocomplete.display_name).
+    country_name, country_id = "", None
+    if country_input:
+        suggestions = country_autocomplete.resolve_input(country_input)
+        if suggestions:
+            exact = country_autocomplete.exact_match(country_input)
+            choice = st.selectbox(
+                "Matching countries",
+                suggestions,
+                index=next((i for i, s in enumerate(suggestions) if s.country_id == exact), None),
+                format_func=lambda suggestion: suggestion.label,
+                placeholder="Pick a country",
+            )
+            if choice is not None:
+                country_name, country_id = country_autocomplete.display_name(country_input, choice), choice.country_id
+        else:
+            st.warning(f"No country matches '{country_input}'. Try the country's name or ISO code.", icon="🌍")
 
 with col2:
     # Analysis Type section removed
@@ -1101,70 +679,110 @@ with col2:
 
 
 # Function to display economic news (from provided code, slightly adapted for no display condition)
-def display_economic_news(country):
+def news_item_html(item):
+    news_item_class = "news-item"
+    if item.get('bucket', 'other') != "other":
+        news_item_class += f" {item['bucket']}-news-item"
+    return f"""
+            <div class="{news_item_class}">
+                <div class="news-summary">{item['summary']}</div>
+                <div class="news-source">
+                    <a href="{item['url']}" target="_blank" class="news-source-link">
+                        🗞️ {item['source']}
+                    </a>
+                </div>
+                <div class="news-time">⏰ {item['time']}</div>
+            </div>
+        """
+
+
+def render_news_item(item, number=None):
     """
-    Enhanced news display with collapsible detailed content
+    One article as a collapsible expander. With its prompt `number` it is labelled [n] and shows the
+    article's text once opened (see render_full_news_item).
     """
-    # Custom CSS for news display (already in main CSS above - no need to repeat here)
+    if number is not None:
+        render_full_news_item(item, number)
+        return
+    with st.expander(f"📰 {item['title']}", expanded = False):  # Collapsible expander
+         st.markdown(news_item_html(item), unsafe_allow_html=True)
+
+
+@st.fragment
+def render_full_news_item(item, number):
+    # Opening the expander reruns only this fragment, so the searches and the analysis are not redone;
+    # the text is downloaded then, within news_fetch.DEADLINE
+    expander = st.expander(f"[{number}] 📰 {item['title']}", expanded = False, key=f"news_{item['url']}", on_change="rerun")
+    with expander:
+         st.markdown(news_item_html(item), unsafe_allow_html=True)
+         if expander.open:
+             with st.spinner("Loading the full article..."):
+                 full_summary, full_text = item.article_summary(), item.text()
+             st.markdown(f"""
+                <div class="news-full-text">
+                    <p><strong>Full Summary:</strong></p>
+                    <p>{full_summary or 'No full summary available'}</p>
+                    <p><strong>Full Article Text:</strong></p>
+                    <p>{full_text or 'No full text available'}</p>
+                </div>
+            """, unsafe_allow_html=True)
 
-    # Display news with loading animation - Spinner moved to the analysis tab for step-by-step process
-    news_items = fetch_economic_news(country)
-    time.sleep(0.5)  # Smooth transition
 
-    if news_items:
-        st.markdown(f"""
-            <div class="news-container">
-                <div class="news-header">
-                    📰 Latest Economic News for {country}
-                    <span class="news-date">
-                        {datetime.now().strftime("%B %d, %Y %H:%M")}
-                    </span>
-                </div>
+def bucket_counts(counts):
+    return " · ".join(f"{bucket.upper() if bucket == 'gdp' else bucket.title()} {counts[bucket]}" for bucket in news_tagger.BUCKETS)
+
+
+def display_economic_news(country, num_articles=10, country_id=None, status=None):
+    """
+    Enhanced news display with collapsible detailed content. Articles are previewed as they arrive, with the
+    running bucket counts in `status`; once the searches are done the preview is replaced by the ranked list,
+    numbered as in the prompt (see rank_economic_news), which is returned.
+    """
+    # Custom CSS for news display (already in main CSS above - no need to repeat here)
+    st.markdown(f"""
+        <div class="news-container">
+            <div class="news-header">
+                📰 Latest Economic News for {country}
+                <span class="news-date">
+                    {datetime.now().strftime("%B %d, %Y %H:%M")}
+                </span>
             </div>
-        """, unsafe_allow_html=True)
-        # Create a container for news items
-        news_container = st.container()
-        with news_container:
-           for i, item in enumerate(news_items):
-                is_gdp_related = any(keyword.lower() in item['full_text'].lower() for keyword in ["GDP", "growth rate", "economic growth", "GDP growth", "percent growth", "% growth", "gdp percentage", "growth percentage"]) if item['full_text'] else False
-                is_bond_related = "bond" in item['query'].lower()
-                is_stock_related = "stock" in item['query'].lower()
-                is_yield_related = "yield" in item['query'].lower()
-                news_item_class = "news-item"
-                if is_gdp_related:
-                   news_item_class += " gdp-news-item"
-                elif is_bond_related:
-                    news_item_class += " bond-news-item"
-                elif is_stock_related:
-                    news_item_class += " stock-news-item"
-                elif is_yield_related:
-                    news_item_class += " yield-news-item"
-
-                with st.expander(f"📰 {item['title']}", expanded = False):  # Collapsible expander
-                     st.markdown(f"""
-                        <div class="{news_item_class}">
-                            <div class="news-summary">{item['summary']}</div>
-                            <div class="news-source">
-                                <a href="{item['url']}" target="_blank" class="news-source-link">
-                                    🗞️ {item['source']}
-                                </a>
-                            </div>
-                            <div class="news-time">⏰ {item['time']}</div>
-                            <div class="news-full-text">
-                                <p><strong>Full Summary:</strong></p>
-                                <p>{item['full_summary'] if item['full_summary'] else 'No full summary available'}</p>
-                                <p><strong>Full Article Text:</strong></p>
-                                <p>{item['full_text'] if item['full_text'] else 'No full text available'}</p>
-                            </div>
-                        </div>
-                    """, unsafe_allow_html=True)
+        </div>
+    """, unsafe_allow_html=True)
+    # Arrivals go into a preview that is cleared once the ranked list is drawn above it; widgets only go
+    # into the ranked list, so their keys are not used twice in a run
+    news_container = st.container()
+    preview_placeholder = st.empty()
+    preview_container = preview_placeholder.container()
+    news_items = []
+    counts = Counter()
+    report = {}
+    try:
+        for item in stream_economic_news(country, num_articles, report=report):
+            news_items.append(item)
+            counts[item['bucket']] += 1
+            with preview_container:
+                render_news_item(item)
+            if status is not None:
+                status.info(f"Fetching latest economic news... {bucket_counts(counts)}", icon="🔍")
+    except Exception as e:
+        st.error(f"Error fetching news: {str(e)}")
+    preview_placeholder.empty()
+    if report:
+        # Analysis goes ahead with whatever arrived in time; say what didn't
+        logging.info(f"News fetch report for {country}: {report}")
+        st.caption(f"🕒 News: {news_fetch.describe_report(report)}")
 
+    if news_items:
+        news_items = rank_economic_news(country, news_items, num_articles, country_id)
+        with news_container:
+            for i, item in enumerate(news_items):
+                render_news_item(item, i + 1)
         return news_items # Return news_items for analysis prompt
     else:
         st.info("Fetching news... If no results appear, try refreshing the page.", icon="ℹ️")
         return [] # Return empty list if no news
 
-
 if country_name:
     if not api_key:
         st.error("Please set your Gemini API Key in the sidebar to perform analysis.", icon="🔑")
@@ -1186,13 +804,17 @@ if country_name:
                 generation_config=generation_config,
             )
 
+            # Start loading the indicator charts now so they're ready by the time the analysis is displayed
+            chart_prefetch = gem_loader.prefetch(get_chart_datasets(data_path_input), data_path_input)
+
             # Create a placeholder for status messages
             status_placeholder = st.empty()
             status_placeholder.info("Fetching latest economic news...", icon="🔍") # Initial message
 
-            news_for_analysis = fetch_economic_news(country_name)  # Fetch news here
+            # Articles appear as their searches come back, with the bucket counts in the status line
+            news_for_analysis = display_economic_news(country_name, country_id=country_id, status=status_placeholder)
             if news_for_analysis:
-                status_placeholder.success("News fetched successfully!", icon="✅")
+                status_placeholder.success(f"News fetched successfully! {bucket_counts(Counter(item['bucket'] for item in news_for_analysis))}", icon="✅")
             else:
                 status_placeholder.warning("Could not fetch economic news. Analysis will proceed without news context.", icon="⚠️")
 
@@ -1279,7 +901,7 @@ if country_name:
 
                     # Display charts after text analysis
                      # Optional data path input
-                    analyze_country_charts(country_name, data_path_input)
+                    analyze_country_charts(country_name, data_path_input, chart_prefetch, country_id)
 
 
             except Exception as e:
@@ -5,442 +5,74 @@ import logging
 import plotly.express as px
 import os
 from fuzzywuzzy import process
+import country_resolver
+import gem_cache
+import gem_catalog
+import gem_loader
+import gem_panel
+import gem_periods
+import gem_snapshot
+import xlsx_stream
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 data_path =  "GemDataEXTR"
+# Map the warm-start snapshot (panel, derived series, catalog) so the first chart slices arrays
+gem_snapshot.attach(data_path)
 
 
 
-def normalize_country(text):
-    # Remove all non-alphanumeric characters and convert to lower case
-    return "".join(ch for ch in text.lower() if ch.isalnum())
-
 def get_matching_country(country, country_list=None):
-    # Normalize input
-    norm_input = normalize_country(country)
-    
-    # Comprehensive list of countries
-    all_countries = [
-        "Albania", "Advanced Economies", "Argentina", "Armenia", "Australia", "Austria", 
-        "Belgium", "Bulgaria", "Bahrain", "Bosnia and Herzegovina", "Belarus", "Bolivia", 
-        "Brazil", "Botswana", "Canada", "Switzerland", "Chile", "China", "Cameroon", 
-        "Colombia", "Costa Rica", "Cyprus", "Czech Republic", "Germany", "Denmark", 
-        "EMDE East Asia & Pacific", "EMDE Europe & Central Asia", "Ecuador", 
-        "Egypt, Arab Rep.", "Emerging Market and Developing Economies (EMDEs)", 
-        "Spain", "Estonia", "Finland", "France", "United Kingdom", "Georgia", "Ghana", 
-        "Greece", "Guatemala", "High Income Countries", "Hong Kong SAR, China", 
-        "Honduras", "Croatia", "Hungary", "Indonesia", "India", "Ireland", "Iceland", 
-        "Israel", "Italy", "Jamaica", "Jordan", "Japan", "Kazakhstan", "Kenya", 
-        "Korea, Rep.", "Kuwait", "EMDE Latin America & Caribbean", 
-        "Low-Income Countries (LIC)", "Sri Lanka", "Lithuania", "Luxembourg", "Latvia", 
-        "Morocco", "Moldova, Rep.", "Mexico", "Middle-Income Countries (MIC)", 
-        "North Macedonia", "Malta", "Mongolia", "EMDE Middle East & N. Africa", 
-        "Mauritius", "Malaysia", "Nigeria", "Nicaragua", "Netherlands", "Norway", 
-        "New Zealand", "Peru", "Philippines", "Poland", "Portugal", "Paraguay", 
-        "Romania", "Russian Federation", "EMDE South Asia", "Saudi Arabia", "Singapore", 
-        "El Salvador", "Serbia", "EMDE Sub-Saharan Africa", "Slovakia", "Slovenia", 
-        "Sweden", "Thailand", "Tunisia", "Turkey", "Taiwan, China", "Ukraine", 
-        "Uruguay", "United States", "Uzbekistan", "World (WBG members)", "South Africa",
-        "Afghanistan", "Algeria", "Angola", "Antigua and Barbuda", "Azerbaijan", 
-        "Bahamas", "Bangladesh", "Barbados", "Belize", "Benin", "Bhutan", 
-        "Brunei Darussalam", "Burkina Faso", "Burundi", "Cabo Verde", "Cambodia", 
-        "Central African Republic", "Chad", "Comoros", "Congo, Dem. Rep.", 
-        "Congo, Rep.", "Côte d'Ivoire", "Cuba", "Djibouti", "Dominica", 
-        "Dominican Republic", "Equatorial Guinea", "Eritrea", "Eswatini", "Ethiopia", 
-        "Fiji", "Gabon", "Gambia", "Grenada", "Guinea", "Guinea-Bissau", "Guyana", 
-        "Haiti", "Iran, Islamic Rep.", "Iraq", "Kiribati", "Korea, Dem. People's Rep.", 
-        "Kyrgyz Republic", "Lao PDR", "Lebanon", "Lesotho", "Liberia", "Libya", 
-        "Madagascar", "Malawi", "Maldives", "Mali", "Marshall Islands", "Mauritania", 
-        "Micronesia, Fed. Sts.", "Montenegro", "Mozambique", "Myanmar", "Namibia", 
-        "Nauru", "Nepal", "Niger", "Oman", "Pakistan", "Palau", "Panama", 
-        "Papua New Guinea", "Qatar", "Rwanda", "Samoa", "San Marino", 
-        "São Tomé and Principe", "Senegal", "Seychelles", "Sierra Leone", 
-        "Solomon Islands", "Somalia", "South Sudan", "St. Kitts and Nevis", "St. Lucia", 
-        "St. Vincent and the Grenadines", "Sudan", "Suriname", "Syrian Arab Republic", 
-        "Tajikistan", "Tanzania", "Timor-Leste", "Togo", "Tonga", "Trinidad and Tobago", 
-        "Turkmenistan", "Tuvalu", "Uganda", "United Arab Emirates", "Vanuatu", 
-        "Venezuela, RB", "Vietnam", "Yemen, Rep.", "Zambia", "Zimbabwe"
-    ]
-    
-    # Use provided country_list or default to all_countries
-    if country_list is None:
-        country_list = all_countries
-
-
-    # Original mapping: keys will be normalized.
-    country_variants = {
-    "us":"United States",   
-    "usa": "United States",
-    "unitedstatesofamerica": "United States",
-    "u.s.a": "United States",
-    "unitedstates": "United States",
-    "uk": "United Kingdom",
-    "u.k.": "United Kingdom",
-    "britain": "United Kingdom",
-    "greatbritain": "United Kingdom",
-    "england": "United Kingdom",
-    "scotland": "United Kingdom",
-    "wales": "United Kingdom",
-    "northernireland": "United Kingdom",
-    "uae": "United Arab Emirates",
-    "emirates": "United Arab Emirates",
-    "southkorea": "Korea, Rep.",
-    "republicofkorea": "Korea, Rep.",
-    "northkorea": "Korea, Dem. People’s Rep.",
-    "dprk": "Korea, Dem. People’s Rep.",
-    "russia": "Russian Federation",
-    "ussr": "Russian Federation",
-    "sovietunion": "Russian Federation",
-    "czechia": "Czech Republic",
-    "czechrepublic": "Czech Republic",
-    "slovakrepublic": "Slovakia",
-    "slovakia": "Slovakia",
-    "egypt": "Egypt, Arab Rep.",
-    "world": "World (WBG members)",
-    "emergingmarkets": "Emerging Market and Developing Economies (EMDEs)",
-    "advancedeconomies": "Advanced Economies",
-    "lowincomecountries": "Low-Income Countries (LIC)",
-    "middleincomecountries": "Middle-Income Countries (MIC)",
-    "southafrica": "South Africa",
-    "rsa": "South Africa",
-    "taiwan": "Taiwan, China",
-    "roc": "Taiwan, China",
-    "venezuela": "Venezuela, RB",
-    "ivorycoast": "Côte d’Ivoire",
-    "bolivia": "Bolivia",
-    "iran": "Iran, Islamic Rep.",
-    "persia": "Iran, Islamic Rep.",
-    "vietnam": "Viet Nam",
-    "vietnam": "Viet Nam",
-    "hongkong": "Hong Kong SAR, China",
-    "hk": "Hong Kong SAR, China",
-    "india": "India",
-    "bharat": "India",
-    "australia": "Australia",
-    "oz": "Australia",
-    "canada": "Canada",
-    "ca": "Canada",
-    "germany": "Germany",
-    "deutschland": "Germany",
-    "france": "France",
-    "frenchrepublic": "France",
-    "japan": "Japan",
-    "nippon": "Japan",
-    "brazil": "Brazil",
-    "brasil": "Brazil",
-    "mexico": "Mexico",
-    "méxico": "Mexico",
-    "peru": "Peru",
-    "chile": "Chile",
-    "colombia": "Colombia",
-    "argentina": "Argentina",
-    "algeria": "Algeria",
-    "algérie": "Algeria",
-    "morocco": "Morocco",
-    "maroc": "Morocco",
-    "nigeria": "Nigeria",
-    "ghana": "Ghana",
-    "kenya": "Kenya",
-    "ethiopia": "Ethiopia",
-    "tanzania": "Tanzania, United Rep.",
-    "uganda": "Uganda",
-    "southsudan": "South Sudan",
-    "sudan": "Sudan",
-    "lebanon": "Lebanon",
-    "jordan": "Jordan",
-    "iraq": "Iraq",
-    "kuwait": "Kuwait",
-    "qatar": "Qatar",
-    "oman": "Oman",
-    "bahrain": "Bahrain",
-    "cyprus": "Cyprus",
-    "croatia": "Croatia",
-    "hrvatska": "Croatia",
-    "bosniaandherzegovina": "Bosnia and Herzegovina",
-    "bih": "Bosnia and Herzegovina",
-    "serbia": "Serbia",
-    "srbija": "Serbia",
-    "bulgaria": "Bulgaria",
-    "българия": "Bulgaria",
-    "romania": "Romania",
-    "românia": "Romania",
-    "hungary": "Hungary",
-    "magyarország": "Hungary",
-    "greece": "Greece",
-    "hellas": "Greece",
-    "italy": "Italy",
-    "italia": "Italy",
-    "spain": "Spain",
-    "españa": "Spain",
-    "portugal": "Portugal",
-    "portugueserepublic": "Portugal",
-    "poland": "Poland",
-    "polska": "Poland",
-    "sweden": "Sweden",
-    "sverige": "Sweden",
-    "switzerland": "Switzerland",
-    "suisse": "Switzerland",
-    "schweiz": "Switzerland",
-    "svizzera": "Switzerland",
-    "austria": "Austria",
-    "österreich": "Austria",
-    "belgium": "Belgium",
-    "belgique": "Belgium",
-    "belgië": "Belgium",
-    "netherlands": "Netherlands",
-    "holland": "Netherlands",
-    "denmark": "Denmark",
-    "danmark": "Denmark",
-    "norway": "Norway",
-    "norge": "Norway",
-    "finland": "Finland",
-    "suomi": "Finland",
-    "ireland": "Ireland",
-    "éire": "Ireland",
-    "newzealand": "New Zealand",
-    "nz": "New Zealand",
-    "singapore": "Singapore",
-    "singapura": "Singapore",
-    "malaysia": "Malaysia",
-    "malaisie": "Malaysia",
-    "thailand": "Thailand",
-    "siam": "Thailand",
-    "indonesia": "Indonesia",
-    "philippines": "Philippines",
-    "brunei": "Brunei Darussalam",
-    "macau": "Macau SAR, China",
-    "mongolia": "Mongolia",
-    "монголулс": "Mongolia",
-    "costarica": "Costa Rica",
-    "panama": "Panama",
-    "dominicanrepublic": "Dominican Rep.",
-    "haiti": "Haiti",
-    "jamaica": "Jamaica",
-    "trinidadandtobago": "Trinidad & Tobago",
-    "barbados": "Barbados",
-    "bahamas": "Bahamas",
-    "cuba": "Cuba",
-    "guyana": "Guyana",
-    "suriname": "Suriname",
-    "belize": "Belize",
-    "guatemala": "Guatemala",
-    "honduras": "Honduras",
-    "elsalvador": "El Salvador",
-    "nicaragua": "Nicaragua",
-    "ecuador": "Ecuador",
-    "paraguay": "Paraguay",
-    "uruguay": "Uruguay",
-    "turkey": "Turkey",
-    "turkiye": "Turkey",
-    "saudiarabia": "Saudi Arabia",
-    "ksa": "Saudi Arabia",
-    "israel": "Israel",
-    "israelistate": "Israel",
-    "palestine": "Palestine",
-    "jordan": "Jordan",
-    "lebanon": "Lebanon",
-    "iraq": "Iraq",
-    "kuwait": "Kuwait",
-    "qatar": "Qatar",
-    "oman": "Oman",
-    "bahrain": "Bahrain",
-    "cyprus": "Cyprus",
-    "croatia": "Croatia",
-    "hrvatska": "Croatia",
-    "bosniaandherzegovina": "Bosnia and Herzegovina",
-    "bih": "Bosnia and Herzegovina",
-    "serbia": "Serbia",
-    "srbija": "Serbia",
-    "bulgaria": "Bulgaria",
-    "българия": "Bulgaria",
-    "romania": "Romania",
-    "românia": "Romania",
-    "hungary": "Hungary",
-    "magyarország": "Hungary",
-    "greece": "Greece",
-    "hellas": "Greece",
-    "italy": "Italy",
-    "italia": "Italy",
-    "spain": "Spain",
-    "españa": "Spain",
-    "portugal": "Portugal",
-    "portugueserepublic": "Portugal",
-    "poland": "Poland",
-    "polska": "Poland",
-    "sweden": "Sweden",
-    "sverige": "Sweden",
-    "switzerland": "Switzerland",
-    "suisse": "Switzerland",
-    "schweiz": "Switzerland",
-    "svizzera": "Switzerland",
-    "austria": "Austria",
-    "österreich": "Austria",
-    "belgium": "Belgium",
-    "belgique": "Belgium",
-    "belgië": "Belgium",
-    "netherlands": "Netherlands",
-    "holland": "Netherlands",
-    "denmark": "Denmark",
-    "danmark": "Denmark",
-    "norway": "Norway",
-    "norge": "Norway",
-    "finland": "Finland",
-    "suomi": "Finland",
-    "ireland": "Ireland",
-    "éire": "Ireland",
-    "newzealand": "New Zealand",
-    "nz": "New Zealand",
-    "singapore": "Singapore",
-    "singapura": "Singapore",
-    "malaysia": "Malaysia",
-    "malaisie": "Malaysia",
-    "thailand": "Thailand",
-    "siam": "Thailand",
-    "indonesia": "Indonesia",
-    "philippines": "Philippines",
-    "brunei": "Brunei Darussalam",
-    "macau": "Macau SAR, China",
-    "mongolia": "Mongolia",
-    "монголулс": "Mongolia",
-    "costarica": "Costa Rica",
-    "panama": "Panama",
-    "dominicanrepublic": "Dominican Rep.",
-    "haiti": "Haiti",
-    "jamaica": "Jamaica",
-    "trinidadandtobago": "Trinidad & Tobago",
-    "barbados": "Barbados",
-    "bahamas": "Bahamas",
-    "cuba": "Cuba",
-    "guyana": "Guyana",
-    "suriname": "Suriname",
-    "belize": "Belize",
-    "guatemala": "Guatemala",
-    "honduras": "Honduras",
-    "elsalvador": "El Salvador",
-    "nicaragua": "Nicaragua",
-    "ecuador": "Ecuador",
-    "paraguay": "Paraguay",
-    "uruguay": "Uruguay",
-    "turkey": "Turkey",
-    "turkiye": "Turkey",
-    "saudiarabia": "Saudi Arabia",
-    "ksa": "Saudi Arabia",
-    "israel": "Israel",
-    "israelistate": "Israel",
-    "palestine": "Palestine",
-    "jordan": "Jordan",
-    "lebanon": "Lebanon",
-    "iraq": "Iraq",
-    "kuwait": "Kuwait",
-    "qatar": "Qatar",
-    "oman": "Oman",
-    "bahrain": "Bahrain",
-    "cyprus": "Cyprus",
-    "croatia": "Croatia",
-    "hrvatska": "Croatia",
-    "bosniaandherzegovina": "Bosnia and Herzegovina",
-    "bih": "Bosnia and Herzegovina",
-    "serbia": "Serbia",
-    "srbija": "Serbia",
-    "bulgaria": "Bulgaria",
-    "българия": "Bulgaria",
-    "romania": "Romania",
-    "românia": "Romania",
-    "hungary": "Hungary",
-    "magyarország": "Hungary",
-    "greece": "Greece",
-    "hellas": "Greece",
-    "italy": "Italy",
-    "italia": "Italy",
-    "spain": "Spain",
-    "españa": "Spain",
-    "portugal": "Portugal",
-    "portugueserepublic": "Portugal",
-    "poland": "Poland",
-    "polska": "Poland",
-    "sweden": "Sweden",
-    "sverige": "Sweden",
-    "switzerland": "Switzerland",
-    "suisse": "Switzerland",
-    "schweiz": "Switzerland",
-    "svizzera": "Switzerland",
-    "austria": "Austria",
-    "österreich": "Austria",
-    "belgium": "Belgium",
-    "belgique": "Belgium",
-    "belgië": "Belgium",
-    "netherlands": "Netherlands",
-    "holland": "Netherlands"
-}
-
-    # Normalize the keys in the variants mapping
-    normalized_variants = {normalize_country(k): v for k, v in country_variants.items()}
-    
-    # Check for direct match in variants
-    if norm_input in normalized_variants:
-        variant_match = normalized_variants[norm_input]
-        # Verify the variant match exists in country_list
-        for country_name in country_list:
-            if variant_match == country_name:
-                return variant_match
-    
-    # If no direct variant match found, use fuzzy matching
-    # First, try exact match on normalized country list
-    normalized_country_dict = {normalize_country(name): name for name in country_list}
-    if norm_input in normalized_country_dict:
-        return normalized_country_dict[norm_input]
-    
-    # If no exact match, use fuzzy matching with configurable threshold
-    match, score = process.extractOne(norm_input, [normalize_country(c) for c in country_list])
-    
-    if score >= 70:  # Slightly lower threshold without difflib fallback
-        # Map back to original name
-        for country_name in country_list:
-            if normalize_country(country_name) == match:
-                return country_name
-    
-    return None
-
+    # Aliases, exact normalized names, then fuzzy matching over an n-gram shortlist; the tables are
+    # compiled once per candidate list and results are memoized (see country_resolver.py)
+    return country_resolver.get_resolver(country_list).resolve(country)
 
 def load_data(file_path, sheet_name, country, indicator_name):
     try:
         logging.info(f"Loading data from {file_path} ({sheet_name}) for {country}")
-        xls = pd.ExcelFile(file_path)
-        if sheet_name not in xls.sheet_names:
-            logging.error(f"Worksheet named '{sheet_name}' not found in {file_path}. Available sheets: {xls.sheet_names}")
-            return None
-        df = pd.read_excel(xls, sheet_name=sheet_name).dropna(how="all")
-        df.columns = df.columns.str.strip()
-        if 'Unnamed: 0' not in df.columns:
-            logging.error("Expected 'Unnamed: 0' column for years not found.")
+        # Sheets are served from the columnar cache (see gem_cache.py) instead of openpyxl.
+        # On a cold cache the requested column is streamed straight out of the sheet XML.
+        # Once the catalog is built, sheet and column checks don't open the workbook at all.
+        catalog = gem_catalog.peek_catalog(os.path.dirname(file_path))
+        source = gem_cache if gem_cache.is_cached(file_path) else xlsx_stream
+        available_sheets = catalog.sheet_names(file_path) if catalog is not None else source.sheet_names(file_path)
+        if sheet_name not in available_sheets:
+            logging.error(f"Worksheet named '{sheet_name}' not found in {file_path}. Available sheets: {available_sheets}")
             return None
-        df.rename(columns={"Unnamed: 0": "Year"}, inplace=True)
-        # Match country name
-        matched_country = get_matching_country(country, df.columns)
+        if catalog is not None:
+            # Columns carry their country ID in the manifest, so this is a dict lookup
+            country_columns = catalog.columns(file_path, sheet_name)
+            matched_country = catalog.column_for(file_path, sheet_name, country_resolver.country_id(country))
+        else:
+            columns = source.read_header(file_path, sheet_name)
+            if 'Unnamed: 0' not in columns:
+                logging.error("Expected 'Unnamed: 0' column for years not found.")
+                return None
+            country_columns = [column for column in columns if column != 'Unnamed: 0']
+            # Match country name
+            matched_country = get_matching_country(country, country_columns)
         if not matched_country:
-            logging.error(f"{indicator_name} data not found for {country}. Available: {df.columns[1:].tolist()}")
+            logging.error(f"{indicator_name} data not found for {country}. Available: {country_columns}")
             return None
-        try:
-            data = df[["Year", matched_country]].dropna()
-        except KeyError:
+        if catalog is not None and not catalog.has_series(file_path, sheet_name, matched_country):
+            logging.info(f"{indicator_name} has no {sheet_name} data for {matched_country}")
             return None
+        # Only the period column and the matched country column are read from disk
+        df = source.read_sheet(file_path, sheet_name, columns=['Unnamed: 0', matched_country])
+        # Period labels of the whole sheet are parsed once and shared by every country (see gem_periods.py):
+        # int years for annual sheets, period-start dates for quarterly and monthly ones
+        axis = gem_periods.sheet_axis(file_path, sheet_name, df['Unnamed: 0'])
+        df.rename(columns={"Unnamed: 0": "Year"}, inplace=True)
+        data = df[["Year", matched_country]].dropna()
         data.columns = ["Year", indicator_name]
-        # Convert "Year" differently based on sheet type
-        if sheet_name == "monthly":
-            data["Year"] = data["Year"].apply(
-                lambda x: pd.to_datetime(x.replace("M", "-"), format='%Y-%m') if isinstance(x, str) else x
-            )
-        else:
-            data["Year"] = data["Year"].astype(int)
+        data["Year"] = axis.lookup(data["Year"])
         return data
     except Exception as e:
         logging.error(f"Error loading data: {e}")
         return None
 
-def analyze_country(country, data_path):
-    mapped_country = get_matching_country(country, None)
-    datasets = {
+def get_chart_datasets(data_path):
+    return {
         "GDP": {"file": f"{data_path}/GDP at market prices, current US$, millions, seas. adj..xlsx", "sheet": "annual"},
         "CPI": {"file": f"{data_path}/CPI Price, % y-o-y, nominal, seas. adj..xlsx", "sheet": "annual"},
         "Unemployment Rate": {"file": f"{data_path}/Unemployment Rate, seas. adj..xlsx", "sheet": "annual"},
@@ -453,10 +85,30 @@ def analyze_country(country, data_path):
         "Industrial Production": {"file": f"{data_path}/Industrial Production, constant 2010 US$, seas. adj..xlsx", "sheet": "annual"},
         "Retail Sales Volume Index": {"file": f"{data_path}/Retail Sales Volume Index, seas. adj..xlsx", "sheet": "annual"}
     }
+
+def analyze_country(country, data_path, prefetch=None):
+    datasets = get_chart_datasets(data_path)
+    if prefetch is None:
+        prefetch = gem_loader.prefetch(datasets, data_path)
+    # Slice from the shared panel once it's built; until then each workbook is read from
+    # the cache as soon as its prefetch lands
+    panel = gem_panel.peek_panel(data_path)
+    catalog = gem_catalog.peek_catalog(data_path)
+    # Resolve the input to a canonical country ID once; each dataset's column is then found by ID
+    country_id = country_resolver.country_id(country)
+    mapped_country = country_resolver.country_name(country_id)
     
-    for indicator, params in datasets.items():
-        data = load_data(params["file"], params["sheet"], country, indicator)
-        dataset_title = os.path.basename(params["file"]).replace(".xlsx", "")
+    for indicator, params in prefetch.as_completed():
+        dataset_title = gem_panel.indicator_key(params["file"])
+        column = catalog.column_for(params["file"], params["sheet"], country_id) if catalog is not None else None
+        if catalog is not None and not catalog.has_series(params["file"], params["sheet"], column):
+            # Known to be missing, no need to touch the panel or the workbook
+            data = None
+        elif panel is not None:
+            column = column or panel.country_for(country_id)
+            data = panel.series(dataset_title, params["sheet"], column, indicator) if column else None
+        else:
+            data = load_data(params["file"], params["sheet"], country, indicator)
         if data is not None:
             title = f"{dataset_title} Trend for {mapped_country}"
             fig = px.line(data, x="Year", y=indicator, title=title)
@@ -465,6 +117,8 @@ def analyze_country(country, data_path):
         # If data is missing, do nothing.
 
 def main():
+    # Rebuild the snapshot in the background if it's missing or a workbook changed
+    gem_loader.start_panel_warmup(data_path)
     st.title("GDP Analysis Tool")
     country = st.text_input("Country", "USA")
     if st.button("Analyze"):
@@ -1,18 +1,20 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
 import time
 from newspaper import Article
 import concurrent.futures
 
+import fetch_client
+import serp_parser
+
 def fetch_article_content(url):
     """
     Fetch article content using newspaper3k
     """
     try:
+        # Downloaded through the shared client (keep-alive, per-host rate limit, circuit breaker)
         article = Article(url)
-        article.download()
+        article.download(input_html=fetch_client.get(url).text)
         article.parse()
         return article.text # Fetching full article text now
     except Exception as e:
@@ -25,24 +27,14 @@ def fetch_economic_news(country, num_articles=15): # Increased default to 15 art
     try:
         url = f"https://www.google.com/search?q={country}+economy+financial+news&tbm=nws"
 
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
-        }
-
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
+        response = fetch_client.get(url)
 
         news_items = []
         gdp_news_items = [] # List to store GDP related news
         other_news_items = [] # List for other news
 
-        # Find all news article containers
-        articles = soup.select('div.SoaBEf') or \
-                  soup.select('div.Gx5Zad') or \
-                  soup.select('g-card')
+        # Title, source, time, snippet and link of each result (see serp_parser.py)
+        articles = serp_parser.parse(response.content)
 
         # Keywords for GDP and growth related articles
         gdp_keywords = ["GDP", "growth rate", "economic growth", "GDP growth", "percent growth", "% growth", "gdp percentage", "growth percentage"]
@@ -53,55 +45,29 @@ def fetch_economic_news(country, num_articles=15): # Increased default to 15 art
 
             for article in articles:
                 try:
-                    # Extract title and URL
-                    title_elem = article.select_one('.vvjwJb') or \
-                               article.select_one('.n0jPhd') or \
-                               article.select_one('.mCBkyc')
-
-                    link_elem = article.select_one('a')
-
-                    # Extract source and time
-                    metadata_elem = article.select_one('.UPmit') or \
-                                  article.select_one('.LfVVr') or \
-                                  article.select_one('.CEMjEf')
-
-                    time_elem = article.select_one('time') or \
-                               article.select_one('.ZE0LJd') or \
-                               article.select_one('.jJzYv')
-
-                    # Extract summary
-                    summary_elem = article.select_one('.GI74Re') or \
-                                 article.select_one('.VwiC3b') or \
-                                 article.select_one('.s3v9rd')
-
-                    if title_elem and link_elem:
-                        title = title_elem.get_text().strip()
-                        url = link_elem.get('href', '')
-
-                        # Extract source and time if available
-                        source = metadata_elem.get_text().strip() if metadata_elem else "News Source"
-                        published_time = time_elem.get_text().strip() if time_elem else "Recent"
-
-                        # Extract summary if available
-                        summary = summary_elem.get_text().strip() if summary_elem else "No summary available"
-
-                        # Submit article fetching task to thread pool
-                        if url:
-                            future = executor.submit(fetch_article_content, url)
-                            future_to_article[future] = {
-                                'index': len(news_items),
-                                'title': title,
-                                'source': source,
-                                'time': published_time,
-                                'summary': summary,
-                                'url': url,
-                            }
-                            news_items.append(None) # Placeholder, will be filled after thread completion
-
-
-                            # Break if we have enough articles (initial fetch target, can be more than displayed finally)
-                            if len(news_items) >= num_articles * 2: # Fetching more initially to filter
-                                break
+                    title = article['title']
+                    url = article['href']
+                    source = article['source']
+                    published_time = article['time']
+                    summary = article['summary']
+
+                    # Submit article fetching task to thread pool
+                    if url:
+                        future = executor.submit(fetch_article_content, url)
+                        future_to_article[future] = {
+                            'index': len(news_items),
+                            'title': title,
+                            'source': source,
+                            'time': published_time,
+                            'summary': summary,
+                            'url': url,
+                        }
+                        news_items.append(None) # Placeholder, will be filled after thread completion
+
+
+                        # Break if we have enough articles (initial fetch target, can be more than displayed finally)
+                        if len(news_items) >= num_articles * 2: # Fetching more initially to filter
+                            break
 
                 except Exception as e:
                     continue
@@ -0,0 +1,191 @@
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+import news_urls
+
+# Persistent cache of downloaded news articles, shared by Economist.py and Company_analysis.py.
+# One SQLite file maps a canonical article URL (see news_urls.py) to its zlib-compressed text and summary. Entries expire
+# after ARTICLE_TTL seconds, failed downloads are remembered for NEGATIVE_TTL so a dead link isn't retried
+# on every rerun, and the least recently read entries are evicted once the file outgrows MAX_BYTES.
+# The file lives next to the workbook cache unless ARTICLE_CACHE_PATH is set; set it to "" to disable.
+ARTICLE_TTL = float(os.environ.get("ARTICLE_CACHE_TTL", 7 * 24 * 3600))
+NEGATIVE_TTL = float(os.environ.get("ARTICLE_CACHE_NEGATIVE_TTL", 15 * 60))
+MAX_BYTES = int(os.environ.get("ARTICLE_CACHE_MAX_BYTES", 256 * 2**20))
+# Evict down to this fraction of MAX_BYTES, checking the size every EVICT_EVERY writes
+LOW_WATER = 0.9
+EVICT_EVERY = 32
+CACHE_PATH = os.environ.get(
+    "ARTICLE_CACHE_PATH",
+    os.path.join(os.environ.get("GEM_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+                 "articles.sqlite"),
+)
+FAILED_CONTENT = ("Could not fetch article details.", "No summary available")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    ok INTEGER NOT NULL,
+    text BLOB,
+    summary BLOB,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_accessed ON articles (accessed);
+"""
+
+_local = threading.local()
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _pack(value):
+    return zlib.compress((value or "").encode("utf-8"))
+
+
+def _unpack(blob):
+    return zlib.decompress(blob).decode("utf-8") if blob is not None else ""
+
+
+class ArticleCache:
+    def __init__(self, path=CACHE_PATH, ttl=ARTICLE_TTL, negative_ttl=NEGATIVE_TTL, max_bytes=MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._writes = 0
+        self._evict_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads; keep one per thread and cache file
+        connections = getattr(_local, "connections", None)
+        if connections is None:
+            connections = _local.connections = {}
+        db = connections.get(self.path)
+        if db is None:
+            db = connections[self.path] = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def get_many(self, urls):
+        """
+        {url: (text, summary)} for every URL with a live entry; failures come back as FAILED_CONTENT
+        """
+        keys = {news_urls.canonical_url(url): url for url in urls}
+        if not keys:
+            return {}
+        now = time.time()
+        db = self._connect()
+        found = {}
+        keys_list = list(keys)
+        # SQLite caps the number of bound parameters, so look up in chunks
+        for i in range(0, len(keys_list), 500):
+            chunk = keys_list[i:i + 500]
+            rows = db.execute(
+                f"SELECT url, ok, text, summary, fetched FROM articles WHERE url IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for key, ok, text, summary, fetched in rows:
+                if now - fetched < (self.ttl if ok else self.negative_ttl):
+                    found[key] = (_unpack(text), _unpack(summary)) if ok else FAILED_CONTENT
+        if found:
+            with db:
+                db.executemany("UPDATE articles SET accessed = ? WHERE url = ?", [(now, key) for key in found])
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return {keys[key]: content for key, content in found.items()}
+
+    def get(self, url):
+        return self.get_many([url]).get(url)
+
+    def put(self, url, text, summary):
+        text_blob, summary_blob = _pack(text), _pack(summary)
+        self._store(url, 1, text_blob, summary_blob, len(text_blob) + len(summary_blob))
+
+    def put_failure(self, url):
+        self._store(url, 0, None, None, 0)
+
+    def _store(self, url, ok, text, summary, size):
+        now = time.time()
+        db = self._connect()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO articles (url, ok, text, summary, size, fetched, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (news_urls.canonical_url(url), ok, text, summary, size, now, now),
+            )
+        self._writes += 1
+        if size and self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def total_bytes(self):
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+
+    def evict(self):
+        """
+        Drop expired entries, then the least recently read ones until the cache is under its size cap.
+        Returns the number of entries removed.
+        """
+        if not self._evict_lock.acquire(blocking=False):
+            return 0  # another thread is already at it
+        try:
+            if self.total_bytes() <= self.max_bytes:
+                return 0
+            db = self._connect()
+            now = time.time()
+            with db:
+                removed = db.execute(
+                    "DELETE FROM articles WHERE (ok = 1 AND fetched < ?) OR (ok = 0 AND fetched < ?)",
+                    (now - self.ttl, now - self.negative_ttl),
+                ).rowcount
+                excess = self.total_bytes() - int(self.max_bytes * LOW_WATER)
+                if excess > 0:
+                    # Oldest reads first, until enough bytes are freed
+                    removed += db.execute(
+                        "DELETE FROM articles WHERE url IN ("
+                        "  SELECT url FROM (SELECT url, size, SUM(size) OVER (ORDER BY accessed, url) AS freed FROM articles)"
+                        "  WHERE freed - size < ?"
+                        ")",
+                        (excess,),
+                    ).rowcount
+            logging.info(f"Evicted {removed} article(s) from {self.path}")
+            return removed
+        finally:
+            self._evict_lock.release()
+
+
+def get_cache(path=CACHE_PATH):
+    """
+    Process-wide ArticleCache for a file, or None if caching is disabled or the file can't be opened
+    """
+    if not path:
+        return None
+    cache = _caches.get(path)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(path)
+            if cache is None:
+                try:
+                    cache = _caches[path] = ArticleCache(path)
+                except (OSError, sqlite3.Error) as e:
+                    logging.warning(f"Article cache {path} unavailable: {e}")
+                    return None
+    return cache
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    cache = get_cache(sys.argv[1] if len(sys.argv) > 1 else CACHE_PATH)
+    db = cache._connect()
+    ok, failed = (db.execute("SELECT COUNT(*) FROM articles WHERE ok = ?", (flag,)).fetchone()[0] for flag in (1, 0))
+    print(f"{cache.path}: {ok} articles, {failed} failed downloads, {cache.total_bytes() / 2**20:.1f} MiB compressed")
@@ -0,0 +1,184 @@
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import country_resolver
+
+# Prefix-trie autocomplete for the country input box.
+# Every workbook header spelling, canonical name and alias (country_resolver.COUNTRY_VARIANTS) is inserted
+# under its normalized form, and every node keeps its best few suggestions ranked at build time, so a
+# keystroke costs one walk down the trie. Suggestions carry the canonical country ID, which the chart
+# and news code use directly instead of fuzzy-matching the typed text again.
+MAX_SUGGESTIONS = 8
+
+# Ranking tiers: the prefix starts a name, starts an alias, or starts a later word of a name
+NAME, ALIAS, WORD = 0, 1, 2
+
+Suggestion = namedtuple("Suggestion", "label country_id")
+
+_tries = {}
+_tries_lock = threading.Lock()
+
+
+class _Node:
+    __slots__ = ("children", "exact", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.exact = []  # entries whose key ends here
+        self.top = []  # entries whose key passes through here, best first after build
+
+
+def _word_starts(spelling):
+    # "Korea, Dem. People's Rep." -> "dempeoplesrep", "peoplesrep", "rep"
+    words = [w for w in re.split(r"[^0-9a-z]+", spelling.lower()) if w]
+    return ["".join(words[i:]) for i in range(1, len(words))]
+
+
+class CountryTrie:
+    def __init__(self, limit=MAX_SUGGESTIONS):
+        self.limit = limit
+        self.root = _Node()
+        self.size = 0
+        # Normalized full spelling or alias -> the country IDs it names; IDs are left out, so "ind"
+        # is a prefix of India rather than a pick
+        self.exact_ids = {}
+        # The same plus common names ("korea" of "Korea, Rep."), for display_name
+        self.name_ids = {}
+        for country_id, spellings in country_resolver.COUNTRY_CODES.items():
+            for spelling in spellings:
+                self._insert(country_resolver.normalize_country(spelling), NAME, country_id)
+                for key in _word_starts(spelling):
+                    self._insert(key, WORD, country_id)
+                if "," in spelling:
+                    # World Bank style "Korea, Rep.": the part before the comma is the common name
+                    common = country_resolver.normalize_country(spelling.split(",")[0])
+                    self.name_ids.setdefault(common, set()).add(country_id)
+            self._insert(country_id.lower(), ALIAS, country_id, names=False)
+        for spelling in country_resolver.ALL_COUNTRIES:
+            self._insert(country_resolver.normalize_country(spelling), NAME, country_resolver.country_id(spelling))
+        for alias, target in country_resolver.COUNTRY_VARIANTS.items():
+            self._insert(country_resolver.normalize_country(alias), ALIAS, country_resolver.country_id(target))
+        self._rank(self.root)
+
+    def _insert(self, key, tier, country_id, names=True):
+        if not key or country_id is None:
+            return
+        entry = (tier, len(key), country_resolver.country_name(country_id), country_id)
+        if tier != WORD and names:
+            self.exact_ids.setdefault(key, set()).add(country_id)
+            self.name_ids.setdefault(key, set()).add(country_id)
+        node = self.root
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+            node.top.append(entry)
+        node.exact.append(entry)
+        self.size += 1
+
+    def _rank(self, root):
+        # Keep each country's best entry, best first; iterative so deep keys can't hit the recursion limit
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node.exact = self._best(node.exact)
+            node.top = self._best(node.top)
+            stack.extend(node.children.values())
+
+    def _best(self, entries):
+        seen = set()
+        best = []
+        for tier, length, label, country_id in sorted(entries):
+            if country_id not in seen:
+                seen.add(country_id)
+                best.append(Suggestion(label, country_id))
+                if len(best) == self.limit:
+                    break
+        return best
+
+    def suggest(self, text, limit=None):
+        """
+        Ranked Suggestions for what has been typed so far; exact spellings and aliases come first
+        """
+        limit = limit or self.limit
+        node = self.root
+        for ch in country_resolver.normalize_country(text):
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        if node is self.root:
+            return []
+        suggestions = list(node.exact)
+        for suggestion in node.top:
+            if len(suggestions) >= limit:
+                break
+            if suggestion not in suggestions:
+                suggestions.append(suggestion)
+        return suggestions[:limit]
+
+    def exact(self, text):
+        """
+        Country ID if the text is a full name or alias of exactly one country, otherwise None
+        """
+        ids = self.exact_ids.get(country_resolver.normalize_country(text), ())
+        return next(iter(ids)) if len(ids) == 1 else None
+
+    def names(self, text, country_id):
+        """
+        True if the text is a name of the country: a full spelling, an alias or the name before a spelling's comma
+        """
+        return country_id in self.name_ids.get(country_resolver.normalize_country(text), ())
+
+
+def get_trie(limit=MAX_SUGGESTIONS):
+    trie = _tries.get(limit)
+    if trie is None:
+        with _tries_lock:
+            trie = _tries.get(limit)
+            if trie is None:
+                trie = _tries[limit] = CountryTrie(limit)
+    return trie
+
+
+def suggest(text, limit=MAX_SUGGESTIONS):
+    return get_trie(limit).suggest(text)
+
+
+def exact_match(text):
+    return get_trie().exact(text)
+
+
+def display_name(text, suggestion):
+    """
+    Name to search news and title the analysis with: the input as typed when it names the picked
+    country ("South Korea", "Korea"), the suggestion's label when it was only a prefix or typo ("Ind")
+    """
+    return text.strip() if get_trie().names(text, suggestion.country_id) else suggestion.label
+
+
+def resolve_input(text, limit=MAX_SUGGESTIONS):
+    """
+    Suggestions for the input box: trie matches, or the fuzzy resolver's single pick for typos
+    the trie can't complete (e.g. "Brazl"). Empty if nothing plausible matches.
+    """
+    suggestions = suggest(text, limit)
+    if suggestions or not text.strip():
+        return suggestions
+    country_id = country_resolver.country_id(text)
+    return [Suggestion(country_resolver.country_name(country_id), country_id)] if country_id else []
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    start = time.perf_counter()
+    trie = get_trie()
+    print(f"Built trie over {trie.size} keys in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    prefixes = [prefix for country in country_resolver.TEST_INPUTS for prefix in (country[:2], country[:4], country)]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for prefix in prefixes:
+            trie.suggest(prefix)
+    print(f"per keystroke: {(time.perf_counter() - start) / (repeat * len(prefixes)) * 1e6:.2f} µs")
+    for country in country_resolver.TEST_INPUTS:
+        print(f"'{country}' → {', '.join(f'{s.label} [{s.country_id}]' for s in resolve_input(country)[:3])}")
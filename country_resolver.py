@@ -0,0 +1,633 @@
+import functools
+import sys
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Country-name resolution shared by the chart and news code.
+# A CountryResolver is built once per candidate list and reused for the life of the process: aliases
+# and normalized names are plain dict lookups, the fuzzy scorer only sees candidates that share an
+# n-gram with the input, and resolved inputs are kept in an LRU. Batches go through resolve_many,
+# which scores all of them against every candidate in one rapidfuzz similarity matrix.
+# This is the single alias table for Economist.py, GDP_Analysis.py, test.py and test2.py.
+MATCH_THRESHOLD = 70
+CACHE_SIZE = 1024
+
+ALL_COUNTRIES = [
+    "Albania", "Advanced Economies", "Argentina", "Armenia", "Australia", "Austria",
+    "Belgium", "Bulgaria", "Bahrain", "Bosnia and Herzegovina", "Belarus", "Bolivia",
+    "Brazil", "Botswana", "Canada", "Switzerland", "Chile", "China", "Cameroon", "Colombia",
+    "Costa Rica", "Cyprus", "Czech Republic", "Germany", "Denmark",
+    "EMDE East Asia & Pacific", "EMDE Europe & Central Asia", "Ecuador", "Egypt, Arab Rep.",
+    "Emerging Market and Developing Economies (EMDEs)", "Spain", "Estonia", "Finland",
+    "France", "United Kingdom", "Georgia", "Ghana", "Greece", "Guatemala",
+    "High Income Countries", "Hong Kong SAR, China", "Honduras", "Croatia", "Hungary",
+    "Indonesia", "India", "Ireland", "Iceland", "Israel", "Italy", "Jamaica", "Jordan",
+    "Japan", "Kazakhstan", "Kenya", "Korea, Rep.", "Kuwait",
+    "EMDE Latin America & Caribbean", "Low-Income Countries (LIC)", "Sri Lanka", "Lithuania",
+    "Luxembourg", "Latvia", "Morocco", "Moldova, Rep.", "Mexico",
+    "Middle-Income Countries (MIC)", "North Macedonia", "Malta", "Mongolia",
+    "EMDE Middle East & N. Africa", "Mauritius", "Malaysia", "Nigeria", "Nicaragua",
+    "Netherlands", "Norway", "New Zealand", "Peru", "Philippines", "Poland", "Portugal",
+    "Paraguay", "Romania", "Russian Federation", "EMDE South Asia", "Saudi Arabia",
+    "Singapore", "El Salvador", "Serbia", "EMDE Sub-Saharan Africa", "Slovakia", "Slovenia",
+    "Sweden", "Thailand", "Tunisia", "Turkey", "Taiwan, China", "Ukraine", "Uruguay",
+    "United States", "Uzbekistan", "World (WBG members)", "South Africa", "Afghanistan",
+    "Algeria", "Angola", "Antigua and Barbuda", "Azerbaijan", "Bahamas", "Bangladesh",
+    "Barbados", "Belize", "Benin", "Bhutan", "Brunei Darussalam", "Burkina Faso", "Burundi",
+    "Cabo Verde", "Cambodia", "Central African Republic", "Chad", "Comoros",
+    "Congo, Dem. Rep.", "Congo, Rep.", "Côte d'Ivoire", "Cuba", "Djibouti", "Dominica",
+    "Dominican Republic", "Equatorial Guinea", "Eritrea", "Eswatini", "Ethiopia", "Fiji",
+    "Gabon", "Gambia", "Grenada", "Guinea", "Guinea-Bissau", "Guyana", "Haiti",
+    "Iran, Islamic Rep.", "Iraq", "Kiribati", "Korea, Dem. People's Rep.", "Kyrgyz Republic",
+    "Lao PDR", "Lebanon", "Lesotho", "Liberia", "Libya", "Madagascar", "Malawi", "Maldives",
+    "Mali", "Marshall Islands", "Mauritania", "Micronesia, Fed. Sts.", "Montenegro",
+    "Mozambique", "Myanmar", "Namibia", "Nauru", "Nepal", "Niger", "Oman", "Pakistan",
+    "Palau", "Panama", "Papua New Guinea", "Qatar", "Rwanda", "Samoa", "San Marino",
+    "São Tomé and Principe", "Senegal", "Seychelles", "Sierra Leone", "Solomon Islands",
+    "Somalia", "South Sudan", "St. Kitts and Nevis", "St. Lucia",
+    "St. Vincent and the Grenadines", "Sudan", "Suriname", "Syrian Arab Republic",
+    "Tajikistan", "Tanzania", "Timor-Leste", "Togo", "Tonga", "Trinidad and Tobago",
+    "Turkmenistan", "Tuvalu", "Uganda", "United Arab Emirates", "Vanuatu", "Venezuela, RB",
+    "Vietnam", "Yemen, Rep.", "Zambia", "Zimbabwe",
+]
+
+COUNTRY_VARIANTS = {
+    "us": "United States",
+    "america": "United States",
+    "usa": "United States",
+    "unitedstatesofamerica": "United States",
+    "u.s.a": "United States",
+    "unitedstates": "United States",
+    "uk": "United Kingdom",
+    "u.k.": "United Kingdom",
+    "britain": "United Kingdom",
+    "greatbritain": "United Kingdom",
+    "england": "United Kingdom",
+    "scotland": "United Kingdom",
+    "wales": "United Kingdom",
+    "northernireland": "United Kingdom",
+    "uae": "United Arab Emirates",
+    "emirates": "United Arab Emirates",
+    "southkorea": "Korea, Rep.",
+    "skorea": "Korea, Rep.",
+    "republicofkorea": "Korea, Rep.",
+    "northkorea": "Korea, Dem. People’s Rep.",
+    "dprk": "Korea, Dem. People’s Rep.",
+    "nkorea": "Korea, Dem. People’s Rep.",
+    "russia": "Russian Federation",
+    "ussr": "Russian Federation",
+    "sovietunion": "Russian Federation",
+    "czechia": "Czech Republic",
+    "czechrepublic": "Czech Republic",
+    "czech": "Czech Republic",
+    "china": "China",
+    "prc": "China",
+    "slovakrepublic": "Slovakia",
+    "slovakia": "Slovakia",
+    "egypt": "Egypt, Arab Rep.",
+    "world": "World (WBG members)",
+    "emergingmarkets": "Emerging Market and Developing Economies (EMDEs)",
+    "advancedeconomies": "Advanced Economies",
+    "lowincomecountries": "Low-Income Countries (LIC)",
+    "middleincomecountries": "Middle-Income Countries (MIC)",
+    "southafrica": "South Africa",
+    "rsa": "South Africa",
+    "taiwan": "Taiwan, China",
+    "roc": "Taiwan, China",
+    "venezuela": "Venezuela, RB",
+    "ivorycoast": "Côte d’Ivoire",
+    "bolivia": "Bolivia",
+    "iran": "Iran, Islamic Rep.",
+    "persia": "Iran, Islamic Rep.",
+    "vietnam": "Viet Nam",
+    "hongkong": "Hong Kong SAR, China",
+    "hk": "Hong Kong SAR, China",
+    "india": "India",
+    "bharat": "India",
+    "australia": "Australia",
+    "oz": "Australia",
+    "canada": "Canada",
+    "ca": "Canada",
+    "germany": "Germany",
+    "deutschland": "Germany",
+    "france": "France",
+    "frenchrepublic": "France",
+    "japan": "Japan",
+    "nippon": "Japan",
+    "brazil": "Brazil",
+    "brasil": "Brazil",
+    "mexico": "Mexico",
+    "méxico": "Mexico",
+    "peru": "Peru",
+    "chile": "Chile",
+    "colombia": "Colombia",
+    "argentina": "Argentina",
+    "algeria": "Algeria",
+    "algérie": "Algeria",
+    "morocco": "Morocco",
+    "maroc": "Morocco",
+    "nigeria": "Nigeria",
+    "ghana": "Ghana",
+    "kenya": "Kenya",
+    "ethiopia": "Ethiopia",
+    "tanzania": "Tanzania",
+    "uganda": "Uganda",
+    "southsudan": "South Sudan",
+    "sudan": "Sudan",
+    "lebanon": "Lebanon",
+    "jordan": "Jordan",
+    "iraq": "Iraq",
+    "kuwait": "Kuwait",
+    "qatar": "Qatar",
+    "oman": "Oman",
+    "bahrain": "Bahrain",
+    "cyprus": "Cyprus",
+    "croatia": "Croatia",
+    "hrvatska": "Croatia",
+    "bosniaandherzegovina": "Bosnia and Herzegovina",
+    "bih": "Bosnia and Herzegovina",
+    "serbia": "Serbia",
+    "srbija": "Serbia",
+    "bulgaria": "Bulgaria",
+    "българия": "Bulgaria",
+    "romania": "Romania",
+    "românia": "Romania",
+    "hungary": "Hungary",
+    "magyarország": "Hungary",
+    "greece": "Greece",
+    "hellas": "Greece",
+    "italy": "Italy",
+    "italia": "Italy",
+    "spain": "Spain",
+    "españa": "Spain",
+    "portugal": "Portugal",
+    "portugueserepublic": "Portugal",
+    "poland": "Poland",
+    "polska": "Poland",
+    "sweden": "Sweden",
+    "sverige": "Sweden",
+    "switzerland": "Switzerland",
+    "suisse": "Switzerland",
+    "schweiz": "Switzerland",
+    "svizzera": "Switzerland",
+    "austria": "Austria",
+    "österreich": "Austria",
+    "belgium": "Belgium",
+    "belgique": "Belgium",
+    "belgië": "Belgium",
+    "netherlands": "Netherlands",
+    "holland": "Netherlands",
+    "denmark": "Denmark",
+    "danmark": "Denmark",
+    "norway": "Norway",
+    "norge": "Norway",
+    "finland": "Finland",
+    "suomi": "Finland",
+    "ireland": "Ireland",
+    "éire": "Ireland",
+    "newzealand": "New Zealand",
+    "nz": "New Zealand",
+    "singapore": "Singapore",
+    "singapura": "Singapore",
+    "malaysia": "Malaysia",
+    "malaisie": "Malaysia",
+    "thailand": "Thailand",
+    "siam": "Thailand",
+    "indonesia": "Indonesia",
+    "philippines": "Philippines",
+    "brunei": "Brunei Darussalam",
+    "macau": "Macau SAR, China",
+    "mongolia": "Mongolia",
+    "монголулс": "Mongolia",
+    "costarica": "Costa Rica",
+    "panama": "Panama",
+    "dominicanrepublic": "Dominican Republic",
+    "haiti": "Haiti",
+    "jamaica": "Jamaica",
+    "trinidadandtobago": "Trinidad and Tobago",
+    "barbados": "Barbados",
+    "bahamas": "Bahamas",
+    "cuba": "Cuba",
+    "guyana": "Guyana",
+    "suriname": "Suriname",
+    "belize": "Belize",
+    "guatemala": "Guatemala",
+    "honduras": "Honduras",
+    "elsalvador": "El Salvador",
+    "nicaragua": "Nicaragua",
+    "ecuador": "Ecuador",
+    "paraguay": "Paraguay",
+    "uruguay": "Uruguay",
+    "turkey": "Turkey",
+    "turkiye": "Turkey",
+    "saudiarabia": "Saudi Arabia",
+    "ksa": "Saudi Arabia",
+    "israel": "Israel",
+    "israelistate": "Israel",
+    "palestine": "Palestine",
+}
+
+# Canonical country IDs: ISO 3166 alpha-3 for economies, World Bank style codes for aggregates.
+# The first spelling is the one the GemDataEXTR headers use; the others are known variants.
+COUNTRY_CODES = {
+    "AFG": ("Afghanistan",), "ALB": ("Albania",), "DZA": ("Algeria",), "AGO": ("Angola",),
+    "ATG": ("Antigua and Barbuda",), "ARG": ("Argentina",), "ARM": ("Armenia",), "ABW": ("Aruba",),
+    "AUS": ("Australia",), "AUT": ("Austria",), "AZE": ("Azerbaijan",), "BHS": ("Bahamas, The", "Bahamas"),
+    "BHR": ("Bahrain",), "BGD": ("Bangladesh",), "BRB": ("Barbados",), "BLR": ("Belarus",),
+    "BEL": ("Belgium",), "BLZ": ("Belize",), "BEN": ("Benin",), "BMU": ("Bermuda",), "BTN": ("Bhutan",),
+    "BOL": ("Bolivia",), "BIH": ("Bosnia and Herzegovina",), "BWA": ("Botswana",), "BRA": ("Brazil",),
+    "BRN": ("Brunei Darussalam",), "BGR": ("Bulgaria",), "BFA": ("Burkina Faso",), "BDI": ("Burundi",),
+    "CPV": ("Cabo Verde",), "KHM": ("Cambodia",), "CMR": ("Cameroon",), "CAN": ("Canada",),
+    "CYM": ("Cayman Islands",), "CAF": ("Central African Republic",), "TCD": ("Chad",), "CHL": ("Chile",),
+    "CHN": ("China",), "COL": ("Colombia",), "COM": ("Comoros",), "COD": ("Congo, Dem. Rep.",),
+    "COG": ("Congo, Rep.",), "CRI": ("Costa Rica",), "CIV": ("Cote d'Ivoire", "Côte d'Ivoire"),
+    "HRV": ("Croatia",), "CUB": ("Cuba",), "CYP": ("Cyprus",), "CZE": ("Czech Republic", "Czechia"),
+    "DNK": ("Denmark",), "DJI": ("Djibouti",), "DMA": ("Dominica",), "DOM": ("Dominican Republic", "Dominican Rep."),
+    "ECU": ("Ecuador",), "EGY": ("Egypt, Arab Rep.",), "SLV": ("El Salvador",), "GNQ": ("Equatorial Guinea",),
+    "ERI": ("Eritrea",), "EST": ("Estonia",), "SWZ": ("Eswatini",), "ETH": ("Ethiopia",),
+    "FRO": ("Faroe Islands",), "FJI": ("Fiji",), "FIN": ("Finland",), "FRA": ("France",),
+    "PYF": ("French Polynesia",), "GAB": ("Gabon",), "GMB": ("Gambia, The", "Gambia"), "GEO": ("Georgia",),
+    "DEU": ("Germany",), "GHA": ("Ghana",), "GRC": ("Greece",), "GRL": ("Greenland",), "GRD": ("Grenada",),
+    "GTM": ("Guatemala",), "GIN": ("Guinea",), "GNB": ("Guinea-Bissau",), "GUY": ("Guyana",), "HTI": ("Haiti",),
+    "HND": ("Honduras",), "HKG": ("Hong Kong SAR, China",), "HUN": ("Hungary",), "ISL": ("Iceland",),
+    "IND": ("India",), "IDN": ("Indonesia",), "IRN": ("Iran, Islamic Rep.",), "IRQ": ("Iraq",),
+    "IRL": ("Ireland",), "IMN": ("Isle of Man",), "ISR": ("Israel",), "ITA": ("Italy",), "JAM": ("Jamaica",),
+    "JPN": ("Japan",), "JOR": ("Jordan",), "KAZ": ("Kazakhstan",), "KEN": ("Kenya",), "KIR": ("Kiribati",),
+    "PRK": ("Korea, Dem. People's Rep.",), "KOR": ("Korea, Rep.",), "XKX": ("Kosovo",), "KWT": ("Kuwait",),
+    "KGZ": ("Kyrgyz Republic",), "LAO": ("Lao, PDR",), "LVA": ("Latvia",), "LBN": ("Lebanon",),
+    "LSO": ("Lesotho",), "LBR": ("Liberia",), "LBY": ("Libya",), "LTU": ("Lithuania",), "LUX": ("Luxembourg",),
+    "MAC": ("Macao SAR, China", "Macau SAR, China"), "MDG": ("Madagascar",), "MWI": ("Malawi",),
+    "MYS": ("Malaysia",), "MDV": ("Maldives",), "MLI": ("Mali",), "MLT": ("Malta",), "MHL": ("Marshall Islands",),
+    "MRT": ("Mauritania",), "MUS": ("Mauritius",), "MEX": ("Mexico",), "FSM": ("Micronesia, Fed. Sts.",),
+    "MDA": ("Moldova, Rep.",), "MNG": ("Mongolia",), "MNE": ("Montenegro",), "MAR": ("Morocco",),
+    "MOZ": ("Mozambique",), "MMR": ("Myanmar",), "NAM": ("Namibia",), "NRU": ("Nauru",), "NPL": ("Nepal",),
+    "NLD": ("Netherlands",), "ANT": ("Netherlands Antilles",), "NCL": ("New Caledonia",), "NZL": ("New Zealand",),
+    "NIC": ("Nicaragua",), "NER": ("Niger",), "NGA": ("Nigeria",), "MKD": ("North Macedonia",), "NOR": ("Norway",),
+    "OMN": ("Oman",), "PAK": ("Pakistan",), "PLW": ("Palau",), "PAN": ("Panama",), "PNG": ("Papua New Guinea",),
+    "PRY": ("Paraguay",), "PER": ("Peru",), "PHL": ("Philippines",), "POL": ("Poland",), "PRT": ("Portugal",),
+    "QAT": ("Qatar",), "ROU": ("Romania",), "RUS": ("Russian Federation",), "RWA": ("Rwanda",), "WSM": ("Samoa",),
+    "SMR": ("San Marino",), "STP": ("Sao Tome and Principe", "São Tomé and Principe"), "SAU": ("Saudi Arabia",),
+    "SEN": ("Senegal",), "SRB": ("Serbia",), "SYC": ("Seychelles",), "SLE": ("Sierra Leone",),
+    "SGP": ("Singapore",), "SVK": ("Slovakia",), "SVN": ("Slovenia",), "SLB": ("Solomon Islands",),
+    "SOM": ("Somalia",), "ZAF": ("South Africa",), "SSD": ("South Sudan",), "ESP": ("Spain",),
+    "LKA": ("Sri Lanka",), "KNA": ("St. Kitts and Nevis",), "LCA": ("St. Lucia",),
+    "VCT": ("St. Vincent and the Grenadines",), "SDN": ("Sudan",), "SUR": ("Suriname",), "SWE": ("Sweden",),
+    "CHE": ("Switzerland",), "SYR": ("Syrian Arab Republic",), "TWN": ("Taiwan, China",), "TJK": ("Tajikistan",),
+    "TZA": ("Tanzania, United Rep.", "Tanzania"), "THA": ("Thailand",), "TLS": ("Timor-Leste",), "TGO": ("Togo",),
+    "TON": ("Tonga",), "TTO": ("Trinidad and Tobago", "Trinidad & Tobago"), "TUN": ("Tunisia",),
+    "TUR": ("Turkey", "Turkiye"), "TKM": ("Turkmenistan",), "TUV": ("Tuvalu",), "UGA": ("Uganda",),
+    "UKR": ("Ukraine",), "ARE": ("United Arab Emirates",), "GBR": ("United Kingdom",), "USA": ("United States",),
+    "URY": ("Uruguay",), "UZB": ("Uzbekistan",), "VUT": ("Vanuatu",), "VEN": ("Venezuela, RB",),
+    "VNM": ("Viet Nam",), "VIR": ("Virgin Islands, U.S.",), "PSE": ("West Bank and Gaza", "Palestine"),
+    "YEM": ("Yemen, Rep.",), "ZMB": ("Zambia",), "ZWE": ("Zimbabwe",),
+    # Aggregates
+    "WLD": ("World (WBG members)",), "ADV": ("Advanced Economies",),
+    "EMDE": ("Emerging Market and Developing Economies (EMDEs)",), "HIC": ("High Income Countries",),
+    "MIC": ("Middle-Income Countries (MIC)",), "LIC": ("Low-Income Countries (LIC)",),
+    "EAP": ("EMDE East Asia & Pacific",), "ECA": ("EMDE Europe & Central Asia",),
+    "LAC": ("EMDE Latin America & Caribbean",), "MNA": ("EMDE Middle East & N. Africa",),
+    "SAS": ("EMDE South Asia",), "SSA": ("EMDE Sub-Saharan Africa",),
+}
+AGGREGATE_CODES = frozenset(("WLD", "ADV", "EMDE", "HIC", "MIC", "LIC", "EAP", "ECA", "LAC", "MNA", "SAS", "SSA"))
+ID_NAMES = [name for names in COUNTRY_CODES.values() for name in names]
+
+# The inputs exercised by test2.py, used by the micro-benchmark below
+TEST_INPUTS = [
+    "USA", "U.S.A.", "America", "UK", "Great Britain", "Deutschland",
+    "Czech", "PRC", "South Korea", "Hong Kong", "HK", "Nippon",
+    "UAE", "Holland", "Russia", "Brasil", "México", "Bangalore", "Mumbai", "Bangkok", "US",
+]
+
+# Inputs that score the same against several countries, and the country they must resolve to
+AMBIGUOUS_INPUTS = {
+    "Korea": "KOR", "Congo": "COD", "Guinea": "GIN", "Niger": "NER", "Sudan": "SDN",
+    "Dominica": "DMA", "Samoa": "WSM", "Macedonia": "MKD",
+}
+
+Match = namedtuple("Match", ["name", "match", "score", "alternatives"])
+
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+_MAX_RESOLVERS = 64
+
+
+def normalize_country(text):
+    # Remove all non-alphanumeric characters and convert to lower case
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+_ID_BY_NAME = {normalize_country(name): code for code, names in COUNTRY_CODES.items() for name in names}
+# Normalized workbook header spelling -> ID, handed over by the warm-start snapshot (see seed_ids)
+_seeded_ids = {}
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class CountryResolver:
+    """
+    Precompiled matcher from free-text country names to one of `candidates`
+    (by default ALL_COUNTRIES). Resolution order is the one get_matching_country always used:
+    known alias, exact normalized name, then fuzzy (WRatio) match scoring at least `threshold`.
+    Fuzzy ties go to the candidate listed first in ALL_COUNTRIES, then in `candidates`, so "Korea"
+    is "Korea, Rep." whichever list it is matched against.
+    """
+
+    def __init__(self, candidates=None, threshold=MATCH_THRESHOLD, cache_size=CACHE_SIZE, prune=True):
+        self.candidates = list(ALL_COUNTRIES if candidates is None else candidates)
+        self.threshold = threshold
+        self.prune = prune
+        # First spelling wins when two candidates normalize the same way
+        self.normalized = {}
+        for name in self.candidates:
+            self.normalized.setdefault(normalize_country(name), name)
+        self.keys = list(self.normalized)
+        order = {normalize_country(name): i for i, name in reversed(list(enumerate(ALL_COUNTRIES)))}
+        self.rank = {key: (order.get(key, len(order)), i) for i, key in enumerate(self.keys)}
+        self.key_lengths = np.array([len(key) for key in self.keys], dtype=np.float64)[None, :]
+        # Alias targets are matched on their normalized form, so "People’s" and "People's" agree
+        self.aliases = {
+            normalize_country(alias): self.normalized[normalize_country(name)]
+            for alias, name in COUNTRY_VARIANTS.items()
+            if normalize_country(name) in self.normalized
+        }
+        # n-gram postings used to prune the fuzzy scorer: bigrams for short inputs, where one typo
+        # can break every trigram, trigrams otherwise
+        self.postings = {2: defaultdict(set), 3: defaultdict(set)}
+        for i, key in enumerate(self.keys):
+            for n, postings in self.postings.items():
+                for gram in _grams(key, n):
+                    postings[gram].add(i)
+        self.resolve = functools.lru_cache(maxsize=cache_size)(self._resolve) if cache_size else self._resolve
+
+    def shortlist(self, norm_input):
+        """
+        Normalized candidates sharing at least one n-gram with the input
+        """
+        if not self.prune:
+            return self.keys
+        n = 3 if len(norm_input) >= 8 else 2
+        hits = set()
+        for gram in _grams(norm_input, n):
+            hits.update(self.postings[n].get(gram, ()))
+        return [self.keys[i] for i in sorted(hits)]
+
+    def _lookup(self, norm_input):
+        # Alias or exact normalized name, without any scoring
+        if norm_input in self.aliases:
+            return self.aliases[norm_input]
+        return self.normalized.get(norm_input)
+
+    def _resolve(self, country):
+        norm_input = normalize_country(country)
+        if not norm_input:
+            return None
+        found = self._lookup(norm_input)
+        if found is not None:
+            return found
+        choices = self.shortlist(norm_input)
+        if not choices:
+            return None
+        scored = process.extract(norm_input, choices, scorer=fuzz.WRatio, limit=None, score_cutoff=self.threshold)
+        if not scored:
+            return None
+        tied = [match for match, score, _ in scored if score == scored[0][1]]
+        return self.normalized[min(tied, key=self.rank.get)]
+
+    def score_matrix(self, queries):
+        """
+        WRatio of every normalized query against every candidate, exact wherever it reaches the threshold.
+        Normalized names have no spaces, so WRatio reduces to max(ratio, scaled partial_ratio). The
+        ratio matrix comes from one SIMD rapidfuzz cdist pass; partial_ratio is only evaluated for
+        pairs whose length ratio calls for it and whose ratio-derived upper bound can still reach the threshold.
+        """
+        scores = process.cdist(queries, self.keys, scorer=fuzz.ratio, dtype=np.float64, workers=-1)
+        query_lengths = np.array([len(q) for q in queries], dtype=np.float64)[:, None]
+        shorter = np.minimum(query_lengths, self.key_lengths)
+        length_ratio = np.maximum(query_lengths, self.key_lengths) / shorter
+        scale = np.where(length_ratio <= 8.0, 0.9, 0.6)
+        # ratio = 2 * LCS / (len1 + len2), and no window of the longer string can share more than the LCS
+        common = scores * (query_lengths + self.key_lengths) / 200.0
+        bound = np.minimum(100.0, 200.0 * common / (shorter + common)) * scale
+        rows, cols = np.nonzero((length_ratio >= 1.5) & (bound >= self.threshold) & (bound > scores))
+        for i, j in zip(rows, cols):
+            scores[i, j] = max(scores[i, j], fuzz.partial_ratio(queries[i], self.keys[j]) * scale[i, j])
+        return scores
+
+    def resolve_many(self, names, margin=5):
+        """
+        Resolve a batch of names at once. Both sides are normalized once, aliases and exact
+        names are dict lookups, and the remaining names are scored against every candidate in
+        one similarity matrix (see score_matrix). Returns one Match per input name:
+        (name, match or None, score, alternatives), where alternatives lists the other candidates
+        scoring within `margin` of the best, i.e. the input is ambiguous.
+        """
+        names = list(names)
+        norms = [normalize_country(name) for name in names]
+        results = {}
+        pending = []
+        for norm in dict.fromkeys(norms):
+            found = self._lookup(norm) if norm else None
+            if found is not None:
+                results[norm] = (found, 100.0, [])
+            elif norm and self.keys:
+                pending.append(norm)
+            else:
+                results[norm] = (None, 0.0, [])
+        if pending:
+            scores = self.score_matrix(pending)
+            best = scores.argmax(axis=1)
+            for row, norm in enumerate(pending):
+                tied = np.flatnonzero(scores[row] == scores[row, best[row]])
+                if len(tied) > 1:
+                    best[row] = min(tied, key=lambda j: self.rank[self.keys[j]])
+                score = float(scores[row, best[row]])
+                if score < self.threshold:
+                    results[norm] = (None, score, [])
+                    continue
+                close = np.flatnonzero(scores[row] >= max(score - margin, self.threshold))
+                close = close[np.argsort(-scores[row, close], kind="stable")]
+                alternatives = [self.normalized[self.keys[j]] for j in close if j != best[row]]
+                results[norm] = (self.normalized[self.keys[best[row]]], score, alternatives)
+        return [Match(name, *results[norm]) for name, norm in zip(names, norms)]
+
+
+def get_resolver(candidates=None, threshold=MATCH_THRESHOLD):
+    """
+    Process-wide resolver for a candidate list (e.g. a workbook's country columns)
+    """
+    key = (None if candidates is None else tuple(candidates), threshold)
+    resolver = _resolvers.get(key)
+    if resolver is None:
+        with _resolvers_lock:
+            resolver = _resolvers.get(key)
+            if resolver is None:
+                if len(_resolvers) >= _MAX_RESOLVERS:
+                    _resolvers.pop(next(iter(_resolvers)))
+                resolver = _resolvers[key] = CountryResolver(candidates, threshold)
+    return resolver
+
+
+def country_name(country_id):
+    """
+    Display name for a country ID, spelled as in the workbook headers
+    """
+    names = COUNTRY_CODES.get(country_id)
+    return names[0] if names else None
+
+
+def seed_ids(index):
+    """
+    Take over a {normalized header spelling: ID} index resolved earlier (gem_snapshot.py stores one), so
+    those spellings resolve without building the ID resolver
+    """
+    _seeded_ids.update(index)
+
+
+def _code_lookup(name):
+    # Inputs that are exactly an upper-case ID ("BRA"); typed text such as "ind" or "per" is left to the
+    # fuzzy match, since it may be the start of several names ("usa" is an alias and never gets here)
+    code = name.strip()
+    return code if 3 <= len(code) <= 4 and code.isupper() and code in COUNTRY_CODES else None
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def country_id(name, threshold=MATCH_THRESHOLD):
+    """
+    Canonical ID (ISO3, or an aggregate code) for a country name, workbook header, alias or ID, or None
+    """
+    norm_input = normalize_country(name)
+    if not norm_input:
+        return None
+    if threshold == MATCH_THRESHOLD and norm_input in _seeded_ids:
+        return _seeded_ids[norm_input]
+    resolver = get_resolver(ID_NAMES, threshold)
+    match = resolver._lookup(norm_input)
+    if match is None:
+        code = _code_lookup(name)
+        if code is not None:
+            return code
+        match = resolver.resolve(name)
+    return _ID_BY_NAME[normalize_country(match)] if match else None
+
+
+def country_ids(names, threshold=MATCH_THRESHOLD):
+    """
+    country_id for a batch of names (e.g. a workbook header), scored in one resolve_many pass
+    """
+    names = list(names)
+    seeded = _seeded_ids if threshold == MATCH_THRESHOLD else {}
+    codes = [seeded.get(normalize_country(name)) for name in names]
+    if all(codes):
+        return codes
+    resolver = get_resolver(ID_NAMES, threshold)
+    codes = [
+        code or (None if resolver._lookup(normalize_country(name)) else _code_lookup(name))
+        for code, name in zip(codes, names)
+    ]
+    pending = [name for name, code in zip(names, codes) if code is None]
+    matches = iter(resolver.resolve_many(pending))
+    return [
+        code or (lambda m: _ID_BY_NAME[normalize_country(m.match)] if m.match else None)(next(matches))
+        for code in codes
+    ]
+
+
+def resolve_country(country, candidates=None, threshold=MATCH_THRESHOLD):
+    return get_resolver(candidates, threshold).resolve(country)
+
+
+def resolve_many(names, candidates=None, threshold=MATCH_THRESHOLD, margin=5):
+    return get_resolver(candidates, threshold).resolve_many(names, margin)
+
+
+def check_ambiguous(inputs=AMBIGUOUS_INPUTS):
+    """
+    Regression check for names that tie between countries: {input: (expected, country_id,
+    country_ids, default resolver)} for every input where any of them disagrees
+    """
+    batch = country_ids(list(inputs))
+    failures = {}
+    for (name, expected), in_batch in zip(inputs.items(), batch):
+        resolved = resolve_country(name)
+        answers = (country_id(name), in_batch, _ID_BY_NAME.get(normalize_country(resolved)) if resolved else None)
+        if any(answer != expected for answer in answers):
+            failures[name] = (expected, *answers)
+    return failures
+
+
+def resolve_legacy(country, country_list=None):
+    """
+    The previous get_matching_country: alias and candidate tables normalized on every call, then
+    fuzzywuzzy's extractOne over every candidate; the benchmark's baseline
+    """
+    from fuzzywuzzy import process as fuzzywuzzy_process
+
+    norm_input = normalize_country(country)
+    country_list = ALL_COUNTRIES if country_list is None else country_list
+    normalized_variants = {normalize_country(k): v for k, v in COUNTRY_VARIANTS.items()}
+    if norm_input in normalized_variants and normalized_variants[norm_input] in country_list:
+        return normalized_variants[norm_input]
+    normalized_country_dict = {normalize_country(name): name for name in country_list}
+    if norm_input in normalized_country_dict:
+        return normalized_country_dict[norm_input]
+    match, score = fuzzywuzzy_process.extractOne(norm_input, [normalize_country(c) for c in country_list])
+    if score >= MATCH_THRESHOLD:
+        for country_name in country_list:
+            if normalize_country(country_name) == match:
+                return country_name
+    return None
+
+
+def benchmark(inputs=TEST_INPUTS, repeat=200):
+    """
+    Per-name cost of the previous get_matching_country (resolve_legacy) against a resolver rebuilt
+    on every call, the shared resolver (pruned, LRU hit) and the batch API
+    """
+    def timed(fn, per_batch=False):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            if per_batch:
+                fn(inputs)
+            else:
+                for country in inputs:
+                    fn(country)
+        return (time.perf_counter() - start) / (repeat * len(inputs)) * 1e6
+
+    legacy = timed(resolve_legacy)
+    rebuilt = timed(lambda c: CountryResolver(cache_size=0, prune=False).resolve(c))
+    shared = CountryResolver(cache_size=0)
+    pruned = timed(shared.resolve)
+    cached = CountryResolver()
+    warm = timed(cached.resolve)
+    batch = timed(shared.resolve_many, per_batch=True)
+    baseline = CountryResolver(cache_size=0, prune=False)
+    mismatches = [c for c in inputs if baseline.resolve(c) != shared.resolve(c)]
+    batch_mismatches = [m.name for m in shared.resolve_many(inputs) if m.match != baseline.resolve(m.name)]
+    return {
+        "legacy_us": legacy, "rebuilt_us": rebuilt, "pruned_us": pruned, "cached_us": warm, "batch_us": batch,
+        "mismatches": mismatches + batch_mismatches,
+        "legacy_mismatches": [c for c in inputs if resolve_legacy(c) != shared.resolve(c)],
+    }
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for match in resolve_many(TEST_INPUTS):
+        ambiguous = f" (also close: {', '.join(match.alternatives)})" if match.alternatives else ""
+        print(f"Input: '{match.name}' → Matched: '{match.match}' [{match.score:.0f}]{ambiguous}")
+    failures = check_ambiguous()
+    print(f"ambiguous names: {failures or 'all resolve as expected'}")
+    result = benchmark(repeat=repeat)
+    print(f"per name: old get_matching_country (fuzzywuzzy) {result['legacy_us']:.1f} µs, "
+          f"resolver rebuilt + full scan {result['rebuilt_us']:.1f} µs, pruned {result['pruned_us']:.1f} µs, "
+          f"LRU hit {result['cached_us']:.2f} µs, batch {result['batch_us']:.1f} µs")
+    if result["mismatches"]:
+        print(f"pruning changed the result for: {result['mismatches']}")
+    if result["legacy_mismatches"]:
+        print(f"old get_matching_country answers differently for: {result['legacy_mismatches']}")
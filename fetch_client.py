@@ -0,0 +1,264 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# HTTP client shared by every scraper (news_fetch.py, "Scrape news.py").
+# One requests.Session keeps connections alive per host, so repeated requests to the same news site or
+# search page skip DNS, TCP and TLS setup; the pools count how often a kept-alive connection was reused.
+# Each host gets a token bucket (HOST_RATE requests per second, bursts of HOST_BURST) and a circuit
+# breaker: after BREAKER_FAILURES timeouts, connection errors or 429/503 answers in a row, requests to the
+# host fail fast with HostUnavailable for BREAKER_COOLDOWN seconds, then a single trial request decides
+# whether it is back. A 429 with Retry-After opens the breaker straight away for that long.
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
+}
+REQUEST_TIMEOUT = 10
+POOL_SIZE = int(os.environ.get("FETCH_POOL_SIZE", 16))
+HOST_RATE = float(os.environ.get("FETCH_HOST_RATE", 8))
+HOST_BURST = int(os.environ.get("FETCH_HOST_BURST", 20))
+BREAKER_FAILURES = int(os.environ.get("FETCH_BREAKER_FAILURES", 5))
+BREAKER_COOLDOWN = float(os.environ.get("FETCH_BREAKER_COOLDOWN", 30))
+MAX_RETRY_AFTER = 300
+# Answers that mean "back off", as opposed to the host refusing one particular page
+OVERLOADED = (429, 503)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class HostUnavailable(requests.ConnectionError):
+    """
+    Raised without sending anything while a host's circuit breaker is open
+    """
+
+
+class _CountingPool:
+    # urllib3 asks _get_conn for a connection per request and calls _new_conn only when none is idle
+    counters = None
+
+    def _get_conn(self, timeout=None):
+        self.counters.add("pool_requests")
+        return super()._get_conn(timeout)
+
+    def _new_conn(self):
+        self.counters.add("pool_misses")
+        return super()._new_conn()
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def add(self, name, n=1):
+        with self._lock:
+            self._counts[name] += n
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self._counts)
+
+
+class _CountingAdapter(requests.adapters.HTTPAdapter):
+    def __init__(self, counters, **kwargs):
+        self.counters = counters
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {"counters": self.counters}
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("CountingHTTPConnectionPool", (_CountingPool, HTTPConnectionPool), attrs),
+            "https": type("CountingHTTPSConnectionPool", (_CountingPool, HTTPSConnectionPool), attrs),
+        }
+
+
+class TokenBucket:
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, sleeping until one is due; returns the seconds waited. Waiters reserve their token
+        up front, so they are served in arrival order.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_until = 0.0
+        self.trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        # Closed: always. Open: never until the cooldown is over, then once (half-open) until that request reports.
+        with self._lock:
+            if not self.opened_until:
+                return True
+            if time.monotonic() < self.opened_until or self.trial:
+                return False
+            self.trial = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_until = 0.0
+            self.trial = False
+
+    def release(self):
+        # The request neither succeeded nor failed; let another trial through if it was one
+        with self._lock:
+            self.trial = False
+
+    def failure(self, cooldown=None):
+        """
+        Record a failed request; True if that opened (or re-opened) the breaker
+        """
+        with self._lock:
+            self.failures += 1
+            if cooldown is None and self.failures < self.max_failures and not self.trial:
+                return False
+            self.opened_until = time.monotonic() + max(cooldown or 0, self.cooldown)
+            self.trial = False
+            return True
+
+
+def _retry_after(response):
+    try:
+        return min(float(response.headers.get("Retry-After", "")), MAX_RETRY_AFTER)
+    except ValueError:
+        return None
+
+
+class FetchClient:
+    def __init__(self, headers=HEADERS, pool_size=POOL_SIZE, rate=HOST_RATE, burst=HOST_BURST,
+                 failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, timeout=REQUEST_TIMEOUT):
+        self.rate = rate
+        self.burst = burst
+        self.failures = failures
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self.counters = _Counters()
+        self.session = requests.Session()
+        adapter = _CountingAdapter(self.counters, pool_connections=64, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers)
+        self._buckets = {}
+        self._breakers = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host(self, host):
+        with self._hosts_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+                self._breakers[host] = CircuitBreaker(self.failures, self.cooldown)
+            return bucket, self._breakers[host]
+
+    def get(self, url, **kwargs):
+        """
+        session.get within the host's rate limit and circuit breaker; raises for HTTP errors like
+        raise_for_status, and HostUnavailable while the host's breaker is open
+        """
+        host = urlsplit(url).netloc.lower()
+        bucket, breaker = self._host(host)
+        if not breaker.allow():
+            self.counters.add("rejected")
+            raise HostUnavailable(f"{host} is backing off after repeated failures")
+        waited = bucket.acquire()
+        if waited:
+            self.counters.add("throttled")
+            self.counters.add("throttled_ms", int(waited * 1000))
+        self.counters.add("requests")
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.get(url, **kwargs)
+        except requests.Timeout:
+            # A timeout the caller shortened (e.g. to fit a deadline) says little about the host
+            if kwargs["timeout"] is None or kwargs["timeout"] >= self.timeout:
+                self._failed(host, breaker)
+            else:
+                breaker.release()
+            raise
+        except requests.ConnectionError:
+            self._failed(host, breaker)
+            raise
+        except Exception:
+            breaker.success()  # the host answered; the request itself was bad
+            raise
+        if response.status_code in OVERLOADED:
+            self._failed(host, breaker, _retry_after(response))
+        else:
+            breaker.success()
+        response.raise_for_status()
+        return response
+
+    def _failed(self, host, breaker, cooldown=None):
+        self.counters.add("failures")
+        if breaker.failure(cooldown):
+            self.counters.add("breaker_opened")
+            logging.warning(f"Backing off {host} for {max(cooldown or 0, breaker.cooldown):g}s")
+
+    def stats(self):
+        """
+        Request counters since start-up; pool_hits are requests served on a kept-alive connection
+        """
+        counts = self.counters.snapshot()
+        counts["pool_hits"] = counts["pool_requests"] - counts["pool_misses"]
+        return dict(counts)
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FetchClient()
+        return _client
+
+
+def get(url, **kwargs):
+    return get_client().get(url, **kwargs)
+
+
+def stats():
+    return get_client().stats()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for url in sys.argv[1:]:
+        start = time.perf_counter()
+        try:
+            response = get(url)
+            print(f"{response.status_code} {url} in {(time.perf_counter() - start) * 1e3:.0f} ms")
+        except requests.RequestException as e:
+            print(f"failed {url}: {e}")
+    print(stats())
@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+
+import gem_panel
+
+# Frequency conversion and alignment on top of the shared panel.
+# Any indicator can be requested at a target frequency: native sheets are used as-is, otherwise
+# the next higher frequency is aggregated (monthly -> quarterly -> annual) for every country at once.
+# Several indicators can then be placed on one shared (country, period) calendar.
+STEPS_PER_YEAR = {"annual": 1, "quarterly": 4, "monthly": 12}
+
+# How sub-periods combine into a longer period, matched against the workbook name in order.
+# Verified against every indicator that ships at several frequencies (python gem_align.py);
+# each rule reproduces the native lower-frequency sheet:
+#   flows in millions (trade, GDP), Industrial Production   sum
+#   Total Reserves                                          last (end of period)
+#   Months Import Cover                                     cover: period-end reserves over the
+#                                                           period's imports, so an annual value is
+#                                                           in years of imports, not the months mean
+#   prices, CPI, exchange rates, indices, unemployment      mean
+#   CPI % y-o-y                                             mean, approximate (within ~3%): the annual
+#                                                           rate is the change of the annual average index
+AGGREGATION_RULES = (
+    ("millions", "sum"),
+    ("Industrial Production", "sum"),
+    ("Months Import Cover", "cover"),
+    ("Total Reserves", "last"),
+)
+DEFAULT_AGGREGATION = "mean"
+# Stock indicator that import cover divides by the period's imports
+COVER_STOCK = "Total Reserves"
+
+
+def aggregation_for(indicator):
+    for pattern, how in AGGREGATION_RULES:
+        if pattern in indicator:
+            return how
+    return DEFAULT_AGGREGATION
+
+
+def period_ordinals(axis, frequency):
+    """
+    Integer period number of each point of a PeriodAxis at the given (equal or lower) frequency
+    """
+    steps = STEPS_PER_YEAR[frequency]
+    month0 = axis.starts.month.to_numpy() - 1
+    return axis.years * steps + month0 * steps // 12
+
+
+def ordinal_labels(ordinals, frequency):
+    """
+    Sheet-style labels ("1996", "1996Q2", "1996M04") for period ordinals
+    """
+    steps = STEPS_PER_YEAR[frequency]
+    years, subs = np.divmod(np.asarray(ordinals), steps)
+    if frequency == "annual":
+        return [str(y) for y in years]
+    marker = "Q" if frequency == "quarterly" else "M"
+    width = 2 if frequency == "monthly" else 1
+    return [f"{y}{marker}{s + 1:0{width}d}" for y, s in zip(years, subs)]
+
+
+def _runs(axis, target):
+    # Axis labels are sorted, so each target period is a contiguous run of source periods
+    target_ordinals = period_ordinals(axis, target)
+    ordinals, starts = np.unique(target_ordinals, return_index=True)
+    ends = np.r_[starts[1:], len(target_ordinals)] - 1
+    return ordinals, starts, ends
+
+
+def resample(values, axis, source, target, how="mean", min_periods=None):
+    """
+    Aggregate a (..., period) array from a source frequency down to a target frequency.
+    Returns (target ordinals, aggregated array). A target period is NaN unless at least
+    `min_periods` sub-periods are present (default: all of them); "last" needs the final one.
+    """
+    if STEPS_PER_YEAR[target] > STEPS_PER_YEAR[source]:
+        raise ValueError(f"Cannot convert {source} data to {target}; only aggregation is supported")
+    values = np.asarray(values, dtype=float)
+    ratio = STEPS_PER_YEAR[source] // STEPS_PER_YEAR[target]
+    source_ordinals = period_ordinals(axis, source)
+    ordinals, starts, ends = _runs(axis, target)
+    present = ~np.isnan(values)
+    counts = np.add.reduceat(present, starts, axis=-1)
+    if how in ("sum", "mean"):
+        out = np.add.reduceat(np.where(present, values, 0.0), starts, axis=-1)
+        if how == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out = out / counts
+    elif how == "last":
+        out = values[..., ends].copy()
+        is_period_end = source_ordinals[ends] % ratio == ratio - 1
+        out[..., ~is_period_end] = np.nan
+    else:
+        raise ValueError(f"Unknown aggregation '{how}'")
+    out[counts < (min_periods or ratio)] = np.nan
+    return ordinals, out
+
+
+def _native_frequencies(panel, indicator):
+    return [f for f in ("monthly", "quarterly", "annual") if panel.has(indicator, f)]
+
+
+def _convert(panel, indicator, source, target, how, min_periods=None):
+    # (ordinals, array[country, period]) of one indicator's source sheet aggregated to the target
+    sheet = panel.frequencies[source]
+    values = sheet.cross_section(indicator)
+    if how != "cover":
+        return resample(values, sheet.axis, source, target, how, min_periods)
+    if not panel.has(COVER_STOCK, source):
+        raise ValueError(f"Aggregating '{indicator}' needs {source} '{COVER_STOCK}'")
+    # cover = stock / imports of the sub-period, so the imports are stock / cover
+    stock = sheet.cross_section(COVER_STOCK)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        imports = stock / values
+    ordinals, closing = resample(stock, sheet.axis, source, target, "last", min_periods)
+    _, total = resample(imports, sheet.axis, source, target, "sum", min_periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ordinals, closing / total
+
+
+def _drop_partial(panel, indicator, source, target, countries, ordinals, values):
+    """
+    Blank the trailing target periods that the source sheet only partly covers, e.g. a year whose
+    native annual figure sums the quarters published so far
+    """
+    sheet = panel.frequencies[source]
+    sub_ordinals, starts, _ = _runs(sheet.axis, target)
+    counts = np.add.reduceat(~np.isnan(sheet.cross_section(indicator)), starts, axis=-1)
+    full = counts == STEPS_PER_YEAR[source] // STEPS_PER_YEAR[target]
+    last_full = np.where(full.any(axis=1), full.shape[1] - 1 - np.argmax(full[:, ::-1], axis=1), -1)
+    partial = (counts > 0) & ~full & (np.arange(full.shape[1]) > last_full[:, None])
+    rows = {name: i for i, name in enumerate(countries)}
+    _, cols, sub_cols = np.intersect1d(ordinals, sub_ordinals, return_indices=True)
+    values = np.array(values, dtype=float)
+    for j, country in enumerate(sheet.countries):
+        i = rows.get(country)
+        if i is not None:
+            values[i, cols[partial[j, sub_cols]]] = np.nan
+    return values
+
+
+def indicator_at(panel, indicator, target, how=None, min_periods=None, complete=False):
+    """
+    (countries, ordinals, array[country, period]) for one indicator at the target frequency,
+    taken from its native sheet or aggregated from the closest higher-frequency sheet.
+    With `complete`, native periods still in progress in a higher-frequency sheet are left out.
+    """
+    native = _native_frequencies(panel, indicator)
+    if not native:
+        raise KeyError(f"Unknown indicator '{indicator}'")
+    higher = [f for f in native if STEPS_PER_YEAR[f] > STEPS_PER_YEAR[target]]
+    closest = min(higher, key=STEPS_PER_YEAR.get) if higher else None
+    if target in native:
+        source = target
+    elif closest is None:
+        raise ValueError(f"'{indicator}' is only available as {', '.join(native)}, not {target}")
+    else:
+        source = closest
+    sheet = panel.frequencies[source]
+    if source == target:
+        ordinals = period_ordinals(sheet.axis, target)
+        values = sheet.cross_section(indicator)
+        if complete and closest is not None:
+            values = _drop_partial(panel, indicator, closest, target, sheet.countries, ordinals, values)
+        return sheet.countries, ordinals, values
+    ordinals, out = _convert(panel, indicator, source, target, how or aggregation_for(indicator), min_periods)
+    return sheet.countries, ordinals, out
+
+
+def check_rules(panel):
+    """
+    For every indicator shipped at several frequencies, aggregate each higher-frequency sheet with
+    its rule and compare with the native sheet. Yields (indicator, source, target, rule, median
+    relative error over countries, countries compared).
+    """
+    for indicator in sorted({name for sheet in panel.frequencies.values() for name in sheet.indicators}):
+        native = _native_frequencies(panel, indicator)
+        for source in native:
+            for target in native:
+                if STEPS_PER_YEAR[target] >= STEPS_PER_YEAR[source]:
+                    continue
+                how = aggregation_for(indicator)
+                ordinals, out = _convert(panel, indicator, source, target, how)
+                sheet = panel.frequencies[source]
+                expected_sheet = panel.frequencies[target]
+                expected = expected_sheet.cross_section(indicator)
+                _, cols, expected_cols = np.intersect1d(
+                    ordinals, period_ordinals(expected_sheet.axis, target), return_indices=True
+                )
+                rows = {name: i for i, name in enumerate(expected_sheet.countries)}
+                errors = []
+                for j, country in enumerate(sheet.countries):
+                    if country not in rows:
+                        continue
+                    got, want = out[j, cols], expected[rows[country], expected_cols]
+                    both = ~np.isnan(got) & ~np.isnan(want) & (want != 0)
+                    if both.any():
+                        errors.append(np.median(np.abs(got[both] / want[both] - 1)))
+                yield indicator, source, target, how, float(np.median(errors)) if errors else np.nan, len(errors)
+
+
+class AlignedPanel:
+    """
+    Several indicators on one shared (indicator, country, period) calendar at a single frequency
+    """
+
+    def __init__(self, frequency, indicators, countries, ordinals, values):
+        self.frequency = frequency
+        self.indicators = indicators
+        self.countries = countries
+        self.ordinals = ordinals
+        self.periods = ordinal_labels(ordinals, frequency)
+        self.values = values
+        self.indicator_index = {name: i for i, name in enumerate(indicators)}
+        self.country_index = {name: i for i, name in enumerate(countries)}
+
+    def __getitem__(self, indicator):
+        # (country, period) array of one indicator, handy for derived ratios
+        return self.values[self.indicator_index[indicator]]
+
+    def frame(self, country, names=None):
+        """
+        One country's indicators side by side, Year column first like load_data
+        """
+        j = self.country_index.get(country)
+        if j is None:
+            return None
+        axis_values = period_values(self.ordinals, self.frequency)
+        data = {"Year": axis_values}
+        for i, indicator in enumerate(self.indicators):
+            data[(names or {}).get(indicator, indicator)] = self.values[i, j]
+        return pd.DataFrame(data).dropna(how="all", subset=list(data)[1:]).reset_index(drop=True)
+
+
+def period_values(ordinals, frequency):
+    # Same Year values load_data produces: int years, or period-start timestamps
+    steps = STEPS_PER_YEAR[frequency]
+    years, subs = np.divmod(np.asarray(ordinals), steps)
+    if frequency == "annual":
+        return pd.Index(years, dtype=np.int64)
+    months = ((years - 1970) * 12 + subs * (12 // steps)).astype("datetime64[M]")
+    return pd.DatetimeIndex(months.astype("datetime64[ns]"))
+
+
+def align(panel, indicators, target, how=None, min_periods=None, complete=False):
+    """
+    Put several indicators on one calendar at the target frequency.
+    `indicators` is a list of workbook names; `how` optionally maps a name to "sum"/"mean"/"last".
+    Countries and periods are the union over all requested indicators; `complete` drops periods
+    still in progress (see indicator_at).
+    """
+    parts = [
+        indicator_at(panel, indicator, target, (how or {}).get(indicator), min_periods, complete)
+        for indicator in indicators
+    ]
+    countries = sorted({c for part_countries, _, _ in parts for c in part_countries})
+    ordinals = np.unique(np.concatenate([part_ordinals for _, part_ordinals, _ in parts]))
+    country_index = {name: i for i, name in enumerate(countries)}
+    values = np.full((len(indicators), len(countries), len(ordinals)), np.nan)
+    for i, (part_countries, part_ordinals, part_values) in enumerate(parts):
+        rows = np.array([country_index[c] for c in part_countries])
+        cols = np.searchsorted(ordinals, part_ordinals)
+        values[i][np.ix_(rows, cols)] = part_values
+    return AlignedPanel(target, list(indicators), countries, ordinals, values)
+
+
+def get_aligned(indicators, target, data_path="GemDataEXTR", how=None, min_periods=None, complete=False):
+    return align(gem_panel.get_panel(data_path), indicators, target, how, min_periods, complete)
+
+
+if __name__ == "__main__":
+    import sys
+
+    for indicator, source, target, how, error, countries in check_rules(
+        gem_panel.get_panel(sys.argv[1] if len(sys.argv) > 1 else "GemDataEXTR")
+    ):
+        flag = "" if error < 1e-3 else "  approximate"
+        print(f"{indicator[:60]:60} {source:>9} -> {target:9} {how:5} {error:.2e} ({countries} countries){flag}")
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+
+import pandas as pd
+
+# Columnar on-disk cache for the GemDataEXTR workbooks.
+# Every sheet of a workbook is converted once into a Parquet file and re-read from
+# there, so pulling one country column no longer means parsing the sheet XML with openpyxl.
+# Set GEM_CACHE_DIR to keep the cache outside of the data directory (e.g. read-only deploys).
+CACHE_DIR = os.environ.get("GEM_CACHE_DIR")
+PERIOD_COLUMN = "Unnamed: 0"
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def cache_dir_for(file_path):
+    # Cache lives next to the workbooks unless GEM_CACHE_DIR is set
+    return CACHE_DIR or os.path.join(os.path.dirname(os.path.abspath(file_path)), ".cache")
+
+
+def _stem(file_path):
+    return os.path.basename(file_path)[:-len(".xlsx")] if file_path.endswith(".xlsx") else os.path.basename(file_path)
+
+
+def _meta_path(file_path):
+    return os.path.join(cache_dir_for(file_path), f"{_stem(file_path)}.json")
+
+
+def _sheet_path(file_path, sheet_name):
+    return os.path.join(cache_dir_for(file_path), f"{_stem(file_path)}.{sheet_name}.parquet")
+
+
+def _workbook_lock(file_path):
+    key = os.path.abspath(file_path)
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def file_hash(file_path):
+    """
+    SHA-1 of the workbook contents, used when mtime/size alone can't prove the cache is stale
+    """
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(file_path):
+    try:
+        with open(_meta_path(file_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, payload):
+    # Write-then-rename so concurrent readers never see a half-written file
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _fresh_meta(file_path):
+    """
+    Return the cache metadata if it still matches the workbook, otherwise None.
+    mtime and size are checked first; a content hash settles the case where only the
+    mtime moved (fresh checkout, copied volume), so the sheets aren't re-parsed for nothing.
+    """
+    meta = _read_meta(file_path)
+    if meta is None:
+        return None
+    stat = os.stat(file_path)
+    if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+        return meta
+    if meta["size"] != stat.st_size or meta["sha1"] != file_hash(file_path):
+        return None
+    meta["mtime_ns"] = stat.st_mtime_ns
+    write_json(_meta_path(file_path), meta)
+    return meta
+
+
+def _period_label(value):
+    # Annual labels come back from openpyxl as floats (1996.0); store every label as text
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _normalize_sheet(df):
+    df = df.dropna(how="all")
+    df.columns = df.columns.astype(str).str.strip()
+    if PERIOD_COLUMN in df.columns:
+        labels = df[PERIOD_COLUMN]
+        df[PERIOD_COLUMN] = labels.where(labels.isna(), labels.map(_period_label))
+    for column in df.columns:
+        if column != PERIOD_COLUMN:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+    return df.reset_index(drop=True)
+
+
+def convert_workbook(file_path):
+    """
+    Parse every sheet of a workbook once and write it to the cache as Parquet
+    """
+    stat = os.stat(file_path)
+    sha1 = file_hash(file_path)
+    os.makedirs(cache_dir_for(file_path), exist_ok=True)
+    logging.info(f"Converting {file_path} to columnar cache")
+    sheets = pd.read_excel(file_path, sheet_name=None)
+    for sheet_name, df in sheets.items():
+        sheet_path = _sheet_path(file_path, sheet_name)
+        tmp_path = f"{sheet_path}.tmp{os.getpid()}"
+        _normalize_sheet(df).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, sheet_path)
+    meta = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha1": sha1,
+        "sheets": list(sheets),
+    }
+    write_json(_meta_path(file_path), meta)
+    return meta
+
+
+def ensure_cached(file_path):
+    """
+    Return the cache metadata for a workbook, converting it first if the cache is missing or stale
+    """
+    meta = _fresh_meta(file_path)
+    if meta is not None:
+        return meta
+    with _workbook_lock(file_path):
+        # Another session may have converted it while we waited for the lock
+        meta = _fresh_meta(file_path)
+        if meta is None:
+            meta = convert_workbook(file_path)
+        return meta
+
+
+def is_cached(file_path):
+    """
+    True if the workbook has an up-to-date cache (never triggers a conversion)
+    """
+    try:
+        return _fresh_meta(file_path) is not None
+    except OSError:
+        return False
+
+
+def sheet_names(file_path):
+    return ensure_cached(file_path)["sheets"]
+
+
+def read_sheet(file_path, sheet_name, columns=None):
+    """
+    Read one sheet from the cache, like pd.read_excel(...).dropna(how="all") with stripped headers.
+    Period labels are returned as text. Returns None if the workbook has no such sheet.
+    """
+    meta = ensure_cached(file_path)
+    if sheet_name not in meta["sheets"]:
+        return None
+    return pd.read_parquet(_sheet_path(file_path, sheet_name), columns=columns)
+
+
+def read_header(file_path, sheet_name):
+    """
+    Column names of a cached sheet, read from the Parquet schema without loading any data
+    """
+    import pyarrow.parquet as pq
+
+    meta = ensure_cached(file_path)
+    if sheet_name not in meta["sheets"]:
+        return None
+    return pq.read_schema(_sheet_path(file_path, sheet_name)).names
+
+
+def convert_directory(data_path):
+    """
+    Build (or refresh) the cache for every workbook in a data directory
+    """
+    converted = 0
+    for name in sorted(os.listdir(data_path)):
+        if name.endswith(".xlsx") and not name.startswith("~$"):
+            file_path = os.path.join(data_path, name)
+            if not is_cached(file_path):
+                ensure_cached(file_path)
+                converted += 1
+    return converted
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    data_path = sys.argv[1] if len(sys.argv) > 1 else "GemDataEXTR"
+    count = convert_directory(data_path)
+    print(f"Converted {count} workbook(s) in {data_path} to {cache_dir_for(os.path.join(data_path, 'x.xlsx'))}")
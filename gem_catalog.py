@@ -0,0 +1,250 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import country_resolver
+import gem_cache
+
+# Dataset catalog for a GemDataEXTR directory.
+# A JSON manifest records, per workbook: sheets, frequency, the column -> country map,
+# first/last period, non-null counts and a content hash. It is written next to the cache and
+# only rebuilt for workbooks whose contents changed, so existence checks never touch a workbook.
+# Each country column also carries its canonical country ID (see country_resolver.COUNTRY_CODES),
+# resolved once here so requests look columns up by ID instead of matching strings.
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 2
+# Seconds peek_catalog trusts its last look at the workbooks
+CATALOG_TTL = float(os.environ.get("GEM_CATALOG_TTL", 5))
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+# {data directory: (monotonic time, catalog or None)} from peek_catalog's last stat pass
+_peeked = {}
+
+
+def manifest_path(data_path):
+    return os.path.join(gem_cache.cache_dir_for(os.path.join(data_path, MANIFEST_NAME)), MANIFEST_NAME)
+
+
+def _workbook_files(data_path):
+    return [
+        name for name in sorted(os.listdir(data_path))
+        if name.endswith(".xlsx") and not name.startswith("~$")
+    ]
+
+
+def _workbook_entry(file_path):
+    """
+    Describe every sheet of one workbook from its cached columns
+    """
+    meta = gem_cache.ensure_cached(file_path)
+    stat = os.stat(file_path)
+    sheets = {}
+    for sheet_name in meta["sheets"]:
+        df = gem_cache.read_sheet(file_path, sheet_name)
+        df = df[df[gem_cache.PERIOD_COLUMN].notna()] if gem_cache.PERIOD_COLUMN in df.columns else df.iloc[0:0]
+        labels = df[gem_cache.PERIOD_COLUMN].tolist() if len(df) else []
+        values = df.drop(columns=gem_cache.PERIOD_COLUMN, errors="ignore")
+        notna = values.notna().to_numpy()
+        counts = notna.sum(axis=0)
+        ids = country_resolver.country_ids(values.columns)
+        columns = {}
+        for j, name in enumerate(values.columns):
+            if ids[j] is None:
+                logging.warning(f"No country ID for column '{name}' of {file_path} ({sheet_name})")
+            rows = np.flatnonzero(notna[:, j])
+            columns[name] = {
+                "column": j + 1,  # position in the sheet, the period labels are column 0
+                "id": ids[j],
+                "count": int(counts[j]),
+                "first": labels[rows[0]] if len(rows) else None,
+                "last": labels[rows[-1]] if len(rows) else None,
+            }
+        sheets[sheet_name] = {
+            "frequency": sheet_name,
+            "periods": len(labels),
+            "first_period": labels[0] if labels else None,
+            "last_period": labels[-1] if labels else None,
+            "columns": columns,
+        }
+    return {
+        "file": os.path.basename(file_path),
+        "sha1": meta["sha1"],
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sheets": sheets,
+    }
+
+
+def _dataset_version(workbooks):
+    digest = hashlib.sha1()
+    for name in sorted(workbooks):
+        digest.update(f"{name}:{workbooks[name]['sha1']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Catalog:
+    """
+    In-memory view of the manifest with O(1) lookups by workbook path, sheet and country column
+    """
+
+    def __init__(self, data_path, manifest):
+        self.data_path = data_path
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.workbooks = manifest["workbooks"]
+        self.countries = sorted({
+            country
+            for workbook in self.workbooks.values()
+            for sheet in workbook["sheets"].values()
+            for country in sheet["columns"]
+        })
+        # {(workbook, sheet): {country ID: column}} and {country ID: header spelling}
+        self.id_columns = {}
+        self.country_ids = {}
+        for file_name, workbook in self.workbooks.items():
+            for sheet_name, sheet in workbook["sheets"].items():
+                by_id = self.id_columns[(file_name, sheet_name)] = {}
+                for country, info in sheet["columns"].items():
+                    if info["id"] is not None:
+                        by_id.setdefault(info["id"], country)
+                        self.country_ids.setdefault(info["id"], country)
+
+    def sheet_names(self, file_path):
+        workbook = self.workbooks.get(os.path.basename(file_path))
+        return list(workbook["sheets"]) if workbook else []
+
+    def sheet(self, file_path, sheet_name):
+        workbook = self.workbooks.get(os.path.basename(file_path))
+        return workbook["sheets"].get(sheet_name) if workbook else None
+
+    def columns(self, file_path, sheet_name):
+        sheet = self.sheet(file_path, sheet_name)
+        return list(sheet["columns"]) if sheet else []
+
+    def column_for(self, file_path, sheet_name, country_id):
+        """
+        Header of the column holding a country (by canonical ID) in one sheet, or None
+        """
+        return self.id_columns.get((os.path.basename(file_path), sheet_name), {}).get(country_id)
+
+    def series_info(self, file_path, sheet_name, country):
+        sheet = self.sheet(file_path, sheet_name)
+        return sheet["columns"].get(country) if sheet else None
+
+    def has_series(self, file_path, sheet_name, country):
+        info = self.series_info(file_path, sheet_name, country)
+        return bool(info and info["count"])
+
+
+def _load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        return manifest if manifest.get("format") == MANIFEST_FORMAT else None
+    except (OSError, ValueError):
+        return None
+
+
+def refresh_manifest(data_path, manifest=None, rebuild=True, rehash=True):
+    """
+    Bring a manifest up to date with the workbooks on disk, re-describing only changed workbooks.
+    Returns (manifest, changed), or (None, True) if something changed and rebuild is False.
+    With rehash False a workbook whose mtime moved counts as changed instead of being hashed.
+    """
+    old = (manifest or {}).get("workbooks", {})
+    workbooks = {}
+    changed = manifest is None
+    for name in _workbook_files(data_path):
+        file_path = os.path.join(data_path, name)
+        entry = old.get(name)
+        stat = os.stat(file_path)
+        if entry is not None and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            workbooks[name] = entry
+            continue
+        if (rehash and entry is not None and entry["size"] == stat.st_size
+                and entry["sha1"] == gem_cache.file_hash(file_path)):
+            # Same contents, only the mtime moved
+            workbooks[name] = dict(entry, mtime_ns=stat.st_mtime_ns)
+        elif not rebuild:
+            return None, True
+        else:
+            logging.info(f"Cataloguing {file_path}")
+            workbooks[name] = _workbook_entry(file_path)
+        changed = True
+    changed = changed or set(old) != set(workbooks)
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": _dataset_version(workbooks),
+        "workbooks": workbooks,
+    }
+    return manifest, changed
+
+
+def get_catalog(data_path="GemDataEXTR"):
+    """
+    Process-wide catalog for a data directory. The manifest is read from disk once and
+    re-checked against workbook mtimes on every call, which costs one stat per workbook.
+    """
+    key = os.path.abspath(data_path)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        path = manifest_path(data_path)
+        manifest = catalog.manifest if catalog is not None else _load_manifest(path)
+        manifest, changed = refresh_manifest(data_path, manifest)
+        if changed:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            gem_cache.write_json(path, manifest)
+        if catalog is None or changed:
+            catalog = _catalogs[key] = Catalog(data_path, manifest)
+            _peeked.pop(key, None)
+        return catalog
+
+
+def install_catalog(data_path, catalog):
+    # Used by gem_snapshot.py to hand over the catalog stored in the snapshot
+    key = os.path.abspath(data_path)
+    with _catalogs_lock:
+        _catalogs[key] = catalog
+        _peeked.pop(key, None)
+
+
+def peek_catalog(data_path="GemDataEXTR"):
+    """
+    The catalog if an up-to-date manifest is already available, otherwise None.
+    Called on every chart and load_data, so it never parses or hashes a workbook, and stats them at
+    most once per CATALOG_TTL seconds; a missing or stale manifest is rebuilt by get_catalog on the
+    warm-up thread (gem_loader.py).
+    """
+    key = os.path.abspath(data_path)
+    peeked = _peeked.get(key)
+    if peeked is not None and time.monotonic() - peeked[0] < CATALOG_TTL:
+        return peeked[1]
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        manifest = catalog.manifest if catalog is not None else _load_manifest(manifest_path(data_path))
+        if manifest is not None:
+            manifest, changed = refresh_manifest(data_path, manifest, rebuild=False, rehash=False)
+            if changed:
+                manifest = None
+        if manifest is None:
+            catalog = None
+        elif catalog is None:
+            catalog = _catalogs[key] = Catalog(data_path, manifest)
+        _peeked[key] = (time.monotonic(), catalog)
+        return catalog
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    data_path = sys.argv[1] if len(sys.argv) > 1 else "GemDataEXTR"
+    catalog = get_catalog(data_path)
+    print(f"{manifest_path(data_path)}: version {catalog.version[:12]}, "
+          f"{len(catalog.workbooks)} workbooks, {len(catalog.countries)} country columns, "
+          f"{len(catalog.country_ids)} country IDs")
@@ -0,0 +1,293 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+import gem_align
+import gem_cache
+import gem_panel
+
+# Derived indicators computed from the GemDataEXTR workbooks.
+# Each entry of DERIVED is a formula over whole (country, period) arrays, evaluated once for every
+# country and every frequency its inputs can reach (see gem_align.py), then written to the cache
+# next to the sheets. Requests slice the stored result instead of recomputing anything.
+DERIVED_DIR = "derived"
+DERIVED_META = "derived.json"
+DERIVED_FORMAT = 1
+
+EXPORTS_USD = "Exports Merchandise, Customs, current US$, millions, seas. adj."
+IMPORTS_USD = "Imports Merchandise, Customs, current US$, millions, seas. adj."
+GDP_CONSTANT_LCU = "GDP at market prices, constant 2010 LCU, millions, seas. adj."
+GDP_CURRENT_LCU = "GDP at market prices, current LCU, millions, seas. adj."
+GDP_CURRENT_USD = "GDP at market prices, current US$, millions, seas. adj."
+TOTAL_RESERVES = "Total Reserves"
+# Quotes today's currency for the whole history; the "Official exchange rate" sheet is in the
+# currency of the day (Deutsche Mark, lira, sucre...) and is off by the conversion rate for euro
+# area members and dollarized economies
+EXCHANGE_RATE = "Exchange rate, new LCU per USD extended backward, period average"
+GDP_CONVERTED_USD = "GDP at market prices, current LCU converted to US$, millions"
+# Converted series within this relative distance of the published US$ figure pass check_usd
+USD_TOLERANCE = 0.05
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class Derived:
+    """
+    One derived series: its input workbooks and a function of an AlignedPanel holding them.
+    Bump `revision` when the formula changes so materialized results are recomputed.
+    """
+
+    def __init__(self, name, inputs, compute, description="", revision=1):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.compute = compute
+        self.description = description
+        self.revision = revision
+
+
+def yoy_growth(aligned, indicator):
+    """
+    Percent change on the same period a year earlier, for every country at once.
+    Periods still in progress are already blank (evaluate aligns with complete=True).
+    """
+    values = aligned[indicator]
+    steps = gem_align.STEPS_PER_YEAR[aligned.frequency]
+    target = aligned.ordinals - steps
+    previous = np.minimum(np.searchsorted(aligned.ordinals, target), len(target) - 1)
+    found = aligned.ordinals[previous] == target
+    out = np.full_like(values, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[:, found] = (values[:, found] / values[:, previous[found]] - 1.0) * 100.0
+    return out
+
+
+def months_of_imports(aligned, reserves, imports):
+    # Reserves at the end of the period over the average monthly import bill within it
+    months = 12 // gem_align.STEPS_PER_YEAR[aligned.frequency]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return aligned[reserves] / (aligned[imports] / months)
+
+
+def to_usd(aligned, indicator, rate=EXCHANGE_RATE):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return aligned[indicator] / aligned[rate]
+
+
+DERIVED = {
+    d.name: d for d in (
+        Derived(
+            "Trade Balance, current US$, millions, seas. adj.",
+            (EXPORTS_USD, IMPORTS_USD),
+            lambda p: p[EXPORTS_USD] - p[IMPORTS_USD],
+            "Merchandise exports minus imports",
+        ),
+        Derived(
+            "Real GDP growth, % y-o-y",
+            (GDP_CONSTANT_LCU,),
+            lambda p: yoy_growth(p, GDP_CONSTANT_LCU),
+            "Growth of GDP at constant 2010 prices on the same period a year earlier",
+            revision=2,
+        ),
+        Derived(
+            "Total Reserves, months of imports",
+            (TOTAL_RESERVES, IMPORTS_USD),
+            lambda p: months_of_imports(p, TOTAL_RESERVES, IMPORTS_USD),
+            "End-of-period reserves over average monthly merchandise imports",
+        ),
+        Derived(
+            GDP_CONVERTED_USD,
+            (GDP_CURRENT_LCU, EXCHANGE_RATE),
+            lambda p: to_usd(p, GDP_CURRENT_LCU),
+            "Nominal GDP converted at the period-average exchange rate in today's currency",
+            revision=2,
+        ),
+    )
+}
+
+
+def revisions():
+    return {name: derived.revision for name, derived in DERIVED.items()}
+
+
+def derived_dir(data_path):
+    return os.path.join(gem_cache.cache_dir_for(os.path.join(data_path, DERIVED_META)), DERIVED_DIR)
+
+
+def _series_path(data_path, name, frequency):
+    return os.path.join(derived_dir(data_path), f"{name}.{frequency}.parquet")
+
+
+def _input_path(data_path, indicator):
+    return os.path.join(data_path, f"{indicator}.xlsx")
+
+
+def _fingerprint(data_path, derived):
+    # Formula revision plus the contents of every input workbook
+    digest = hashlib.sha1(f"{derived.name}:{derived.revision}\n".encode("utf-8"))
+    for indicator in derived.inputs:
+        digest.update(f"{indicator}:{gem_cache.ensure_cached(_input_path(data_path, indicator))['sha1']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_meta(data_path):
+    try:
+        with open(os.path.join(derived_dir(data_path), DERIVED_META), encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta if meta.get("format") == DERIVED_FORMAT else None
+    except (OSError, ValueError):
+        return None
+
+
+def evaluate(panel, derived):
+    """
+    {frequency: (countries, period labels, array[country, period])} for one derived series,
+    at every frequency all of its inputs can be brought to
+    """
+    results = {}
+    for frequency in gem_panel.FREQUENCIES:
+        try:
+            aligned = gem_align.align(panel, derived.inputs, frequency, complete=True)
+        except (KeyError, ValueError):
+            continue
+        values = derived.compute(aligned)
+        keep = ~np.isnan(values).all(axis=0)
+        if keep.any():
+            periods = [label for label, k in zip(aligned.periods, keep) if k]
+            results[frequency] = (aligned.countries, periods, values[:, keep])
+    return results
+
+
+def materialize(data_path="GemDataEXTR", panel=None):
+    """
+    Compute every registered series whose inputs or formula changed and write it to the cache.
+    Returns the number of series recomputed.
+    """
+    out_dir = derived_dir(data_path)
+    os.makedirs(out_dir, exist_ok=True)
+    old = (_read_meta(data_path) or {}).get("series", {})
+    series = {}
+    recomputed = 0
+    for name, derived in DERIVED.items():
+        try:
+            fingerprint = _fingerprint(data_path, derived)
+        except OSError as e:
+            logging.warning(f"Skipping derived series '{name}': {e}")
+            continue
+        entry = old.get(name)
+        if entry is not None and entry["fingerprint"] == fingerprint and all(
+            os.path.exists(_series_path(data_path, name, f)) for f in entry["frequencies"]
+        ):
+            series[name] = entry
+            continue
+        panel = panel or gem_panel.get_panel(data_path)
+        logging.info(f"Computing derived series '{name}'")
+        results = evaluate(panel, derived)
+        for frequency, (countries, periods, values) in results.items():
+            df = pd.DataFrame(values.T, columns=countries)
+            df.insert(0, gem_cache.PERIOD_COLUMN, periods)
+            path = _series_path(data_path, name, frequency)
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        series[name] = {
+            "fingerprint": fingerprint,
+            "inputs": list(derived.inputs),
+            "description": derived.description,
+            "frequencies": list(results),
+        }
+        recomputed += 1
+    gem_cache.write_json(os.path.join(out_dir, DERIVED_META), {"format": DERIVED_FORMAT, "series": series})
+    return recomputed
+
+
+def check_usd(panel, store, frequency="annual"):
+    """
+    Compare the converted GDP with the published US$ GDP workbook. Returns {country: median
+    converted / published ratio} for the countries off by more than USD_TOLERANCE.
+    """
+    name = GDP_CONVERTED_USD
+    if not (store.has(name, frequency) and panel.has(GDP_CURRENT_USD, frequency)):
+        return {}
+    converted, published = store.frequencies[frequency], panel.frequencies[frequency]
+    _, cols, published_cols = np.intersect1d(converted.periods, published.periods, return_indices=True)
+    off = {}
+    for country in converted.countries:
+        if country not in published.country_index:
+            continue
+        ratio = converted.column(name, country)[cols] / published.column(GDP_CURRENT_USD, country)[published_cols]
+        ratio = ratio[np.isfinite(ratio)]
+        if len(ratio) and abs(np.median(ratio) - 1) > USD_TOLERANCE:
+            off[country] = float(np.median(ratio))
+    return off
+
+
+def load_store(data_path="GemDataEXTR"):
+    """
+    Read the materialized series back into a gem_panel.Panel (one FrequencyPanel per frequency)
+    """
+    meta = _read_meta(data_path) or {"series": {}}
+    frames = {frequency: {} for frequency in gem_panel.FREQUENCIES}
+    for name, entry in meta["series"].items():
+        for frequency in entry["frequencies"]:
+            df = pd.read_parquet(_series_path(data_path, name, frequency))
+            frames[frequency][name] = df.set_index(gem_cache.PERIOD_COLUMN)
+    frequencies = {}
+    for frequency, by_name in frames.items():
+        if not by_name:
+            continue
+        names = list(by_name)
+        countries = sorted({c for df in by_name.values() for c in df.columns})
+        periods = sorted({p for df in by_name.values() for p in df.index})
+        values = np.full((len(names), len(countries), len(periods)), np.nan)
+        panel = gem_panel.FrequencyPanel(frequency, names, countries, periods, values)
+        for i, df in enumerate(by_name.values()):
+            rows = [panel.period_index[p] for p in df.index]
+            cols = [panel.country_index[c] for c in df.columns]
+            values[i][np.ix_(cols, rows)] = df.to_numpy(dtype=float).T
+        frequencies[frequency] = panel
+    return gem_panel.Panel(data_path, frequencies)
+
+
+def get_derived(data_path="GemDataEXTR"):
+    """
+    Process-wide store of derived series, brought up to date with the workbooks on first use
+    """
+    key = os.path.abspath(data_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            materialize(data_path)
+            store = _stores[key] = load_store(data_path)
+        return store
+
+
+def install_derived(data_path, store):
+    # Used by gem_snapshot.py to hand over the derived series mapped from the snapshot
+    with _stores_lock:
+        _stores[os.path.abspath(data_path)] = store
+
+
+def peek_derived(data_path="GemDataEXTR"):
+    return _stores.get(os.path.abspath(data_path))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    data_path = sys.argv[1] if len(sys.argv) > 1 else "GemDataEXTR"
+    panel = gem_panel.get_panel(data_path)
+    count = materialize(data_path, panel)
+    store = load_store(data_path)
+    shapes = ", ".join(f"{f} {p.values.shape}" for f, p in store.frequencies.items())
+    print(f"Recomputed {count} derived series in {derived_dir(data_path)}: {shapes}")
+    off = check_usd(panel, store)
+    print(f"US$ conversion vs {GDP_CURRENT_USD}: " + (
+        ", ".join(f"{country} x{ratio:.3g}" for country, ratio in sorted(off.items())) if off
+        else f"all countries within {USD_TOLERANCE:.0%}"
+    ))
@@ -0,0 +1,155 @@
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+import gem_cache
+import gem_panel
+import gem_snapshot
+
+# Prefetching loader for the indicator charts: cold workbooks are converted in a process pool
+# (openpyxl holds the GIL), and charts consume the results in completion order.
+MAX_WORKERS = int(os.environ.get("GEM_LOADER_WORKERS", min(8, os.cpu_count() or 1)))
+# Seconds between checks of the workbooks against the snapshot
+SNAPSHOT_POLL = float(os.environ.get("GEM_SNAPSHOT_POLL", 60))
+
+_executor = None
+_executor_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+_warmups = {}
+
+
+def get_executor():
+    """
+    Process pool shared by every session. Workers are spawned, not forked: the Streamlit server
+    is multi-threaded and a forked child could inherit a held lock.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def submit_conversion(file_path):
+    """
+    Convert a workbook to the cache in the pool; concurrent requests for the same workbook share one future
+    """
+    global _executor
+    key = os.path.abspath(file_path)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            try:
+                future = get_executor().submit(gem_cache.ensure_cached, file_path)
+            except concurrent.futures.process.BrokenProcessPool:
+                # A worker died (OOM, killed); start a fresh pool rather than failing every later load
+                logging.warning("Loader process pool was broken, restarting it")
+                with _executor_lock:
+                    _executor = None
+                future = get_executor().submit(gem_cache.ensure_cached, file_path)
+            _inflight[key] = future
+            future.add_done_callback(lambda _: _inflight.pop(key, None))
+        return future
+
+
+def _done_future(result=None):
+    future = concurrent.futures.Future()
+    future.set_result(result)
+    return future
+
+
+class IndicatorPrefetch:
+    """
+    Handle on the in-flight loads of one chart panel.
+    `datasets` is the {indicator: {"file": ..., "sheet": ...}} mapping used by the chart code.
+    """
+
+    def __init__(self, datasets, data_path):
+        self.datasets = datasets
+        self.data_path = data_path
+        self._futures = {}
+        panel = gem_panel.peek_panel(data_path)
+        by_file = {}
+        for indicator, params in datasets.items():
+            file_path = params["file"]
+            if panel is not None and panel.has(gem_panel.indicator_key(file_path), params["sheet"]):
+                future = _done_future()
+            elif file_path not in by_file:
+                if gem_cache.is_cached(file_path):
+                    future = _done_future()
+                else:
+                    future = submit_conversion(file_path)
+                by_file[file_path] = future
+            else:
+                future = by_file[file_path]
+            self._futures.setdefault(future, []).append(indicator)
+
+    def as_completed(self):
+        """
+        Yield (indicator, params) as soon as each dataset is ready. If a conversion failed the
+        dataset is still yielded, and load_data falls back to streaming it from the workbook.
+        """
+        for future in concurrent.futures.as_completed(self._futures):
+            try:
+                future.result()
+            except Exception as e:
+                logging.error(f"Error preparing {self._futures[future]}: {e}")
+            for indicator in self._futures[future]:
+                yield indicator, self.datasets[indicator]
+
+
+def prefetch(datasets, data_path):
+    """
+    Start loading the given datasets in the background and return an IndicatorPrefetch.
+    On a cold process the full panel is warmed up behind them, so later views slice arrays.
+    """
+    handle = IndicatorPrefetch(datasets, data_path)
+    start_panel_warmup(data_path)
+    return handle
+
+
+def _convert_pending(data_path):
+    paths = [
+        os.path.join(data_path, name) for name in sorted(os.listdir(data_path))
+        if name.endswith(".xlsx") and not name.startswith("~$")
+    ]
+    pending = [path for path in paths if not gem_cache.is_cached(path)]
+    for future in concurrent.futures.as_completed(
+        [submit_conversion(path) for path in pending]
+    ):
+        future.result()
+
+
+def _warm_panel(data_path):
+    # Runs for the life of the process: bring the snapshot up to date, then keep watching the workbooks
+    while True:
+        try:
+            if not gem_snapshot.is_current(data_path):
+                _convert_pending(data_path)
+                gem_snapshot.refresh(data_path)
+        except Exception as e:
+            logging.error(f"Panel warm-up for {data_path} failed: {e}")
+        time.sleep(SNAPSHOT_POLL)
+
+
+def start_panel_warmup(data_path):
+    """
+    Start the background thread that converts changed workbooks in the pool and rebuilds the
+    snapshot (catalog, panel and derived series, see gem_snapshot.py) whenever a workbook's
+    contents change. Only one runs per directory.
+    """
+    key = os.path.abspath(data_path)
+    with _inflight_lock:
+        thread = _warmups.get(key)
+        if thread is not None and thread.is_alive():
+            return thread
+        thread = _warmups[key] = threading.Thread(target=_warm_panel, args=(data_path,), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,181 @@
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import country_resolver
+import gem_cache
+import gem_periods
+
+# Country x period x indicator panel for the whole GemDataEXTR directory.
+# One dense array per frequency (annual, quarterly, monthly), indexed by (indicator, country, period),
+# built lazily from the columnar cache the first time it's needed and shared by every session of the process.
+# Set GEM_PANEL_DTYPE=float32 to halve the memory footprint.
+# Server processes normally map the panel read-only from the warm-start snapshot (gem_snapshot.py)
+# instead of building their own copy.
+PANEL_DTYPE = os.environ.get("GEM_PANEL_DTYPE", "float64")
+FREQUENCIES = ("annual", "quarterly", "monthly")
+
+_panels = {}
+_panels_lock = threading.Lock()
+
+
+def indicator_key(file_path):
+    # Indicators are keyed by workbook name, the same string the charts use as their title
+    return os.path.basename(file_path).replace(".xlsx", "")
+
+
+class FrequencyPanel:
+    """
+    Dense (indicator, country, period) array for one sheet frequency, with lookup dicts for each axis
+    """
+
+    def __init__(self, frequency, indicators, countries, periods, values, ids=None):
+        self.frequency = frequency
+        self.indicators = indicators
+        self.countries = countries
+        self.periods = periods
+        self.values = values
+        # Canonical country ID of each country row; stored in the snapshot, resolved here otherwise
+        self.ids = ids if ids is not None else country_resolver.country_ids(countries)
+        self.indicator_index = {name: i for i, name in enumerate(indicators)}
+        self.country_index = {name: i for i, name in enumerate(countries)}
+        self.id_index = {}
+        for j, country_id in enumerate(self.ids):
+            if country_id is not None:
+                self.id_index.setdefault(country_id, j)
+        self.period_index = {label: i for i, label in enumerate(periods)}
+        # Parsed once; every series sliced from this panel shares it
+        self.axis = gem_periods.PeriodAxis(periods, frequency)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def column(self, indicator, country):
+        """
+        1-D view over all periods for one indicator and country, or None if either is unknown
+        """
+        i = self.indicator_index.get(indicator)
+        j = self.country_index.get(country)
+        if i is None or j is None:
+            return None
+        return self.values[i, j]
+
+    def cross_section(self, indicator):
+        """
+        (country, period) view of one indicator for every country at once
+        """
+        i = self.indicator_index.get(indicator)
+        return None if i is None else self.values[i]
+
+
+class Panel:
+    def __init__(self, data_path, frequencies):
+        self.data_path = data_path
+        self.frequencies = frequencies
+        self.countries = sorted({c for panel in frequencies.values() for c in panel.countries})
+        self.country_ids = {}
+        for panel in frequencies.values():
+            for country_id, j in panel.id_index.items():
+                self.country_ids.setdefault(country_id, panel.countries[j])
+
+    @property
+    def nbytes(self):
+        return sum(panel.nbytes for panel in self.frequencies.values())
+
+    def country_for(self, country_id):
+        # Header spelling of a country ID, the key series() and column() take
+        return self.country_ids.get(country_id)
+
+    def has(self, indicator, frequency):
+        panel = self.frequencies.get(frequency)
+        return panel is not None and indicator in panel.indicator_index
+
+    def series(self, indicator, frequency, country, name=None):
+        """
+        Same frame load_data returns (Year + one value column, NaNs dropped), sliced from the panel.
+        Returns None if the indicator/country pair has no data at this frequency.
+        """
+        panel = self.frequencies.get(frequency)
+        if panel is None:
+            return None
+        column = panel.column(indicator, country)
+        if column is None:
+            return None
+        mask = ~np.isnan(column)
+        if not mask.any():
+            return None
+        return pd.DataFrame({
+            "Year": panel.axis.values[mask],
+            name or indicator: column[mask],
+        })
+
+
+def build_panel(data_path, dtype=PANEL_DTYPE):
+    """
+    Read every cached sheet in data_path and pack them into one array per frequency
+    """
+    sheets = {frequency: {} for frequency in FREQUENCIES}
+    for name in sorted(os.listdir(data_path)):
+        if not name.endswith(".xlsx") or name.startswith("~$"):
+            continue
+        file_path = os.path.join(data_path, name)
+        for sheet_name in gem_cache.sheet_names(file_path):
+            if sheet_name not in sheets:
+                logging.warning(f"Skipping unknown sheet '{sheet_name}' in {file_path}")
+                continue
+            df = gem_cache.read_sheet(file_path, sheet_name)
+            df = df[df[gem_cache.PERIOD_COLUMN].notna()].set_index(gem_cache.PERIOD_COLUMN)
+            sheets[sheet_name][indicator_key(file_path)] = df
+
+    frequencies = {}
+    for frequency, frames in sheets.items():
+        if not frames:
+            continue
+        indicators = list(frames)
+        countries = sorted({c for df in frames.values() for c in df.columns})
+        periods = sorted({p for df in frames.values() for p in df.index})
+        values = np.full((len(indicators), len(countries), len(periods)), np.nan, dtype=dtype)
+        panel = FrequencyPanel(frequency, indicators, countries, periods, values)
+        for i, df in enumerate(frames.values()):
+            rows = [panel.period_index[p] for p in df.index]
+            cols = [panel.country_index[c] for c in df.columns]
+            values[i][np.ix_(cols, rows)] = df.to_numpy(dtype=dtype).T
+        frequencies[frequency] = panel
+
+    panel = Panel(data_path, frequencies)
+    shapes = ", ".join(f"{f} {p.values.shape}" for f, p in frequencies.items())
+    logging.info(f"Loaded {data_path} panel ({np.dtype(dtype).name}): {shapes}, {panel.nbytes / 2**20:.1f} MiB")
+    return panel
+
+
+def get_panel(data_path="GemDataEXTR", dtype=PANEL_DTYPE):
+    """
+    Process-wide panel: the one installed from the snapshot, or built on first use
+    """
+    key = (os.path.abspath(data_path), np.dtype(dtype).name)
+    panel = _panels.get(key)
+    if panel is None:
+        with _panels_lock:
+            panel = _panels.get(key)
+            if panel is None:
+                panel = _panels[key] = build_panel(data_path, dtype)
+    return panel
+
+
+def install_panel(data_path, panel, dtype=PANEL_DTYPE):
+    """
+    Make `panel` (e.g. one mapped from the snapshot, see gem_snapshot.py) the process-wide panel
+    """
+    with _panels_lock:
+        _panels[(os.path.abspath(data_path), np.dtype(dtype).name)] = panel
+
+
+def peek_panel(data_path="GemDataEXTR", dtype=PANEL_DTYPE):
+    """
+    The process-wide panel if it has already been built, without triggering a build
+    """
+    return _panels.get((os.path.abspath(data_path), np.dtype(dtype).name))
@@ -0,0 +1,136 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Period-index engine for the GemDataEXTR sheets.
+# Labels look like "1996" (annual), "1996Q2" (quarterly) or "1996M04" (monthly). A whole column is
+# parsed in one NumPy pass over the label characters, and the parsed axis is cached per sheet
+# so every country series of that sheet takes its dates from the same object.
+FREQUENCY_CODES = {"annual": "Y", "quarterly": "Q", "monthly": "M"}
+_KIND_FREQUENCY = {0: "annual", ord("Q"): "quarterly", ord("M"): "monthly"}
+_PATTERN = r"^\s*(\d{4})(?:\s*([QM])\s*(\d{1,2}))?\s*$"
+
+_axes = {}
+_axes_lock = threading.Lock()
+_MAX_AXES = 256
+
+
+def _parse_fields_fast(labels):
+    """
+    Year / kind / sub-period fields straight from the UTF-32 code points of the labels.
+    Raises ValueError if any label doesn't have the fixed YYYY[QM]n[n] layout.
+    """
+    arr = np.asarray(labels, dtype=str)
+    width = arr.dtype.itemsize // 4
+    if len(arr) == 0 or width < 4:
+        raise ValueError("labels too short")
+    codes = arr.view(np.uint32).reshape(len(arr), width)
+    digits = codes.astype(np.int64) - ord("0")
+    if ((digits[:, :4] < 0) | (digits[:, :4] > 9)).any():
+        raise ValueError("year is not numeric")
+    year = digits[:, :4] @ np.array([1000, 100, 10, 1])
+    if width == 4:
+        return year, np.zeros(len(arr), dtype=np.uint32), np.zeros(len(arr), dtype=np.int64)
+    kind = codes[:, 4]
+    tail = codes[:, 5:]
+    present = tail != 0  # shorter labels are NUL-padded
+    tail_digits = digits[:, 5:]
+    if (present & ((tail_digits < 0) | (tail_digits > 9))).any():
+        raise ValueError("sub-period is not numeric")
+    sub = np.zeros(len(arr), dtype=np.int64)
+    for j in range(tail.shape[1]):
+        sub = np.where(present[:, j], sub * 10 + tail_digits[:, j], sub)
+    if not np.isin(kind, list(_KIND_FREQUENCY)).all() or ((kind != 0) & ~present[:, 0]).any():
+        raise ValueError("unexpected period marker")
+    return year, kind, sub
+
+
+def _parse_fields_regex(labels):
+    # Fallback for irregular labels (padding, float-formatted years); still one vectorized call
+    parts = pd.Series(labels, dtype=object).astype(str).str.extract(_PATTERN)
+    if parts[0].isna().any():
+        bad = pd.Series(labels, dtype=object)[parts[0].isna()].iloc[0]
+        raise ValueError(f"Unrecognised period label {bad!r}")
+    year = parts[0].astype(np.int64).to_numpy()
+    kind = parts[1].map({"Q": ord("Q"), "M": ord("M")}).fillna(0).astype(np.uint32).to_numpy()
+    sub = parts[2].fillna(0).astype(np.int64).to_numpy()
+    return year, kind, sub
+
+
+def parse_fields(labels):
+    try:
+        return _parse_fields_fast(labels)
+    except ValueError:
+        return _parse_fields_regex(labels)
+
+
+class PeriodAxis:
+    """
+    Parsed period column of one sheet.
+    `values` holds what load_data returns in its Year column: int years for annual sheets,
+    period-start timestamps for quarterly and monthly sheets.
+    """
+
+    def __init__(self, labels, frequency=None):
+        self.labels = pd.Index(np.asarray(labels, dtype=object))
+        year, kind, sub = parse_fields(self.labels)
+        kinds = np.unique(kind)
+        if len(kinds) > 1:
+            raise ValueError(f"Mixed period frequencies in one sheet: {[_KIND_FREQUENCY[k] for k in kinds]}")
+        detected = _KIND_FREQUENCY[int(kinds[0])] if len(kinds) else (frequency or "annual")
+        if frequency is not None and frequency in FREQUENCY_CODES and frequency != detected:
+            raise ValueError(f"Sheet '{frequency}' has {detected} period labels")
+        self.frequency = detected
+        self.years = year
+        if detected == "annual":
+            month = np.ones_like(year)
+        else:
+            if (sub < 1).any() or (sub > (4 if detected == "quarterly" else 12)).any():
+                raise ValueError(f"Out of range {detected} period in {self.labels[0]!r}..{self.labels[-1]!r}")
+            month = (sub - 1) * 3 + 1 if detected == "quarterly" else sub
+        months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+        self.starts = pd.DatetimeIndex(months.astype("datetime64[ns]"))
+        self.values = pd.Index(year, dtype=np.int64) if detected == "annual" else self.starts
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def period_index(self):
+        return self.starts.to_period(FREQUENCY_CODES[self.frequency])
+
+    def lookup(self, labels):
+        """
+        Values for a subset of this axis' labels, e.g. the rows left after dropna
+        """
+        positions = self.labels.get_indexer(pd.Index(np.asarray(labels, dtype=object)))
+        if (positions < 0).any():
+            raise KeyError("Period label not on this sheet's axis")
+        return self.values[positions]
+
+
+def parse_periods(labels, frequency=None):
+    return PeriodAxis(labels, frequency).values
+
+
+def sheet_axis(file_path, sheet_name, labels):
+    """
+    Shared PeriodAxis for a sheet, rebuilt only when the workbook changes.
+    `labels` is the sheet's full period column, used the first time the sheet is seen.
+    """
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), sheet_name)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _axes_lock:
+        cached = _axes.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    labels = pd.Series(labels, dtype=object).dropna()
+    axis = PeriodAxis(labels.tolist(), sheet_name)
+    with _axes_lock:
+        if len(_axes) >= _MAX_AXES:
+            _axes.pop(next(iter(_axes)))
+        _axes[key] = (stamp, axis)
+    return axis
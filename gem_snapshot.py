@@ -0,0 +1,314 @@
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+import country_resolver
+import gem_cache
+import gem_catalog
+import gem_derived
+import gem_panel
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process build lock, processes may rebuild concurrently
+    fcntl = None
+
+# Warm-start snapshot of a GemDataEXTR directory.
+# One file holds every parsed series (the panel and the derived series), the dataset manifest and the
+# country-resolution index. It is memory-mapped read-only, so a restarted server (or every server process
+# on the box) serves its first chart from the same pages instead of re-reading 37 workbooks.
+# Layout: magic, header length, JSON header, then the arrays at 64-byte aligned offsets.
+# Set GEM_SNAPSHOT=0 to keep private in-memory copies instead.
+SNAPSHOT_ENABLED = os.environ.get("GEM_SNAPSHOT", "1") != "0"
+SNAPSHOT_FORMAT = 2
+MAGIC = b"GEMSNAP\x01"
+_ALIGNMENT = 64
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+# With GEM_SNAPSHOT=0: catalog version the in-memory panel was built from, per (directory, dtype)
+_versions = {}
+
+
+def snapshot_path(data_path, dtype=gem_panel.PANEL_DTYPE):
+    return os.path.join(
+        gem_cache.cache_dir_for(os.path.join(data_path, "snapshot")),
+        f"snapshot.{np.dtype(dtype).name}.bin",
+    )
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_snapshot(path, header, arrays):
+    """
+    Write a header dict and named arrays into one memory-mappable file (atomically replaced)
+    """
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = {"offset": offset, "shape": list(values.shape), "dtype": values.dtype.name}
+        offset += values.nbytes
+    blob = json.dumps(dict(header, arrays=layout), ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(blob))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    buffer = np.memmap(tmp_path, dtype=np.uint8, mode="w+", shape=(data_start + offset,))
+    buffer[:len(MAGIC)] = np.frombuffer(MAGIC, dtype=np.uint8)
+    buffer[len(MAGIC):len(MAGIC) + 8] = np.frombuffer(struct.pack("<Q", len(blob)), dtype=np.uint8)
+    buffer[len(MAGIC) + 8:len(MAGIC) + 8 + len(blob)] = np.frombuffer(blob, dtype=np.uint8)
+    for name, values in arrays.items():
+        start = data_start + layout[name]["offset"]
+        buffer[start:start + values.nbytes] = np.ascontiguousarray(values).view(np.uint8).ravel()
+    buffer.flush()
+    del buffer
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """
+    Map a snapshot file read-only. Returns (header, {name: array view}) or None if it's missing or unreadable.
+    """
+    try:
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    except (OSError, ValueError):
+        return None
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        return None
+    (length,) = struct.unpack("<Q", bytes(buffer[len(MAGIC):len(MAGIC) + 8]))
+    header = json.loads(bytes(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + length]).decode("utf-8"))
+    if header.get("format") != SNAPSHOT_FORMAT:
+        return None
+    data_start = _aligned(len(MAGIC) + 8 + length)
+    arrays = {
+        name: np.ndarray(tuple(spec["shape"]), dtype=spec["dtype"], buffer=buffer, offset=data_start + spec["offset"])
+        for name, spec in header["arrays"].items()
+    }
+    return header, arrays
+
+
+def _pack_panel(prefix, panel, arrays):
+    axes = {}
+    for frequency, frequency_panel in panel.frequencies.items():
+        arrays[f"{prefix}/{frequency}"] = frequency_panel.values
+        axes[frequency] = {
+            "indicators": frequency_panel.indicators,
+            "countries": frequency_panel.countries,
+            "periods": frequency_panel.periods,
+            "ids": frequency_panel.ids,
+        }
+    return axes
+
+
+def _unpack_panel(data_path, prefix, axes, arrays):
+    frequencies = {
+        frequency: gem_panel.FrequencyPanel(
+            frequency, spec["indicators"], spec["countries"], spec["periods"], arrays[f"{prefix}/{frequency}"],
+            spec["ids"],
+        )
+        for frequency, spec in axes.items()
+    }
+    return gem_panel.Panel(data_path, frequencies)
+
+
+class Snapshot:
+    """
+    Everything mapped from one snapshot file: panel, derived series, catalog and country index
+    """
+
+    def __init__(self, data_path, path, header, arrays):
+        self.data_path = data_path
+        self.path = path
+        self.header = header
+        self.arrays = arrays
+        self.version = header["version"]
+        self.dtype = header["dtype"]
+        self.created = header["created"]
+        self.manifest = header["manifest"]
+        self.country_index = header["country_index"]
+        self.panel = _unpack_panel(data_path, "panel", header["panel"], arrays)
+        self.derived = _unpack_panel(data_path, "derived", header["derived"], arrays)
+        self.catalog = gem_catalog.Catalog(data_path, self.manifest)
+
+    def stat_current(self):
+        """
+        Cheap check (one stat per workbook) that no workbook was added, removed or touched
+        """
+        names = set(gem_catalog._workbook_files(self.data_path))
+        if names != set(self.manifest["workbooks"]):
+            return False
+        for name, entry in self.manifest["workbooks"].items():
+            stat = os.stat(os.path.join(self.data_path, name))
+            if entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                return False
+        return True
+
+    def is_current(self):
+        """
+        True unless a workbook's contents changed; workbooks whose mtime moved are re-hashed once
+        """
+        if self.stat_current():
+            return True
+        manifest, changed = gem_catalog.refresh_manifest(self.data_path, self.manifest, rebuild=False)
+        if manifest is None:
+            return False
+        # Same contents, newer mtimes: remember them so the next check is stat-only again
+        self.manifest = manifest
+        return manifest["version"] == self.version
+
+
+def build_snapshot(data_path, dtype=gem_panel.PANEL_DTYPE):
+    """
+    Parse everything from the columnar cache and write the snapshot file. Returns its path.
+    """
+    catalog = gem_catalog.get_catalog(data_path)
+    panel = gem_panel.build_panel(data_path, dtype)
+    gem_derived.materialize(data_path, panel)
+    derived = gem_derived.load_store(data_path)
+    arrays = {}
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": catalog.version,
+        "dtype": np.dtype(dtype).name,
+        "created": time.time(),
+        "manifest": catalog.manifest,
+        "formulas": gem_derived.revisions(),
+        # Normalized header spelling -> canonical country ID
+        "country_index": {
+            country_resolver.normalize_country(name): country_id for country_id, name in catalog.country_ids.items()
+        },
+        "panel": _pack_panel("panel", panel, arrays),
+        "derived": _pack_panel("derived", derived, arrays),
+    }
+    path = snapshot_path(data_path, dtype)
+    write_snapshot(path, header, arrays)
+    logging.info(f"Wrote snapshot {path} (version {catalog.version[:12]}, {os.path.getsize(path) / 2**20:.1f} MiB)")
+    return path
+
+
+def open_snapshot(data_path, dtype=gem_panel.PANEL_DTYPE):
+    path = snapshot_path(data_path, dtype)
+    mapped = read_snapshot(path)
+    if mapped is None or mapped[0]["dtype"] != np.dtype(dtype).name:
+        return None
+    if mapped[0].get("formulas") != gem_derived.revisions():
+        # A derived formula changed since the snapshot was written
+        return None
+    return Snapshot(data_path, path, *mapped)
+
+
+def install(snapshot):
+    """
+    Make the snapshot's panel, derived series, catalog and country index the process-wide ones
+    """
+    country_resolver.seed_ids(snapshot.country_index)
+    gem_panel.install_panel(snapshot.data_path, snapshot.panel, snapshot.dtype)
+    gem_derived.install_derived(snapshot.data_path, snapshot.derived)
+    gem_catalog.install_catalog(snapshot.data_path, snapshot.catalog)
+    with _snapshots_lock:
+        _snapshots[(os.path.abspath(snapshot.data_path), snapshot.dtype)] = snapshot
+
+
+def peek_snapshot(data_path="GemDataEXTR", dtype=gem_panel.PANEL_DTYPE):
+    return _snapshots.get((os.path.abspath(data_path), np.dtype(dtype).name))
+
+
+def attach(data_path="GemDataEXTR", dtype=gem_panel.PANEL_DTYPE):
+    """
+    Map the snapshot at import time if the workbooks haven't been touched since it was written.
+    Never hashes or parses anything; anything doubtful is left to refresh() on the warm-up thread.
+    """
+    if not SNAPSHOT_ENABLED:
+        return None
+    snapshot = peek_snapshot(data_path, dtype)
+    if snapshot is not None:
+        return snapshot
+    try:
+        snapshot = open_snapshot(data_path, dtype)
+        if snapshot is None or not snapshot.stat_current():
+            return None
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"Ignoring unreadable snapshot for {data_path}: {e}")
+        return None
+    install(snapshot)
+    return snapshot
+
+
+def is_current(data_path="GemDataEXTR", dtype=gem_panel.PANEL_DTYPE):
+    if not SNAPSHOT_ENABLED:
+        # Stat-only: peek_catalog returns None as soon as a workbook was touched
+        version = _versions.get((os.path.abspath(data_path), np.dtype(dtype).name))
+        catalog = gem_catalog.peek_catalog(data_path)
+        return version is not None and catalog is not None and catalog.version == version
+    snapshot = peek_snapshot(data_path, dtype)
+    return snapshot is not None and snapshot.is_current()
+
+
+class _BuildLock:
+    # Advisory file lock so only one server process rebuilds the snapshot at a time
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, "a")
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+
+
+def refresh(data_path="GemDataEXTR", dtype=gem_panel.PANEL_DTYPE):
+    """
+    Bring the process up to date with the workbooks: map a current snapshot written by another
+    process if there is one, otherwise rebuild it, then swap it in.
+    """
+    if not SNAPSHOT_ENABLED:
+        key = (os.path.abspath(data_path), np.dtype(dtype).name)
+        catalog = gem_catalog.get_catalog(data_path)
+        if key not in _versions:
+            gem_panel.get_panel(data_path, dtype)
+            gem_derived.get_derived(data_path)
+        elif _versions[key] != catalog.version:
+            logging.info(f"Workbooks in {data_path} changed, rebuilding the in-memory panel")
+            panel = gem_panel.build_panel(data_path, dtype)
+            gem_derived.materialize(data_path, panel)
+            gem_panel.install_panel(data_path, panel, dtype)
+            gem_derived.install_derived(data_path, gem_derived.load_store(data_path))
+        _versions[key] = catalog.version
+        return None
+    path = snapshot_path(data_path, dtype)
+    with _BuildLock(f"{path}.lock"):
+        snapshot = open_snapshot(data_path, dtype)
+        touched = snapshot is not None and not snapshot.stat_current()
+        if snapshot is None or not snapshot.is_current():
+            build_snapshot(data_path, dtype)
+            snapshot = open_snapshot(data_path, dtype)
+        elif touched:
+            # Contents unchanged, only mtimes moved: rewrite with them so attach() accepts it again
+            write_snapshot(path, dict(snapshot.header, manifest=snapshot.manifest), snapshot.arrays)
+            snapshot = open_snapshot(data_path, dtype)
+    install(snapshot)
+    return snapshot
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    data_path = sys.argv[1] if len(sys.argv) > 1 else "GemDataEXTR"
+    gem_cache.convert_directory(data_path)
+    snapshot = refresh(data_path)
+    print(f"{snapshot.path}: version {snapshot.version[:12]}, "
+          f"{len(snapshot.country_index)} countries, {os.path.getsize(snapshot.path) / 2**20:.1f} MiB")
@@ -0,0 +1,563 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit
+
+import requests
+from newspaper import Article
+
+import article_cache
+import fetch_client
+import news_urls
+import serp_parser
+
+# News fetch engine shared by Economist.py and Company_analysis.py.
+# Search pages and article downloads of one request are tasks on one asyncio loop, bounded by a global
+# and a per-host limit and by an end-to-end DEADLINE; blocking I/O runs on a shared thread pool through
+# fetch_client.py and extraction on a shared process pool. Cached articles (article_cache.py) are not
+# downloaded again, duplicates across queries are fetched once, and a quota stops downloads that can no
+# longer make the cut. lazy=True fetches only the search pages; iter_news streams articles as they arrive.
+SEARCH_URL = "https://www.google.com/search?q="
+MAX_CONCURRENCY = int(os.environ.get("NEWS_MAX_CONCURRENCY", 16))
+MAX_PER_HOST = int(os.environ.get("NEWS_MAX_PER_HOST", 4))
+# 0 extracts in the download threads instead
+EXTRACT_WORKERS = int(os.environ.get("NEWS_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+# Seconds one fetch may take end to end; 0 for no limit
+DEADLINE = float(os.environ.get("NEWS_DEADLINE", 6))
+
+_executor = None
+_extractor = None
+_executor_lock = threading.Lock()
+_CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+def get_executor():
+    """
+    Thread pool shared by every fetch of the process; the event loop's limits decide how much of it is busy
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=MAX_CONCURRENCY, thread_name_prefix="news-fetch"
+            )
+        return _executor
+
+
+def get_extractor():
+    """
+    Process pool for article extraction, started on first use and kept for the life of the process;
+    None when EXTRACT_WORKERS is 0. Spawned, like gem_loader's pool.
+    """
+    global _extractor
+    with _executor_lock:
+        if _extractor is None and EXTRACT_WORKERS > 0:
+            _extractor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _extractor
+
+
+def _reset_extractor():
+    # A worker died (e.g. killed for memory); the pool is unusable, so the next extraction starts a new one
+    global _extractor
+    with _executor_lock:
+        pool, _extractor = _extractor, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def search_url(query):
+    return f"{SEARCH_URL}{query}&tbm=nws"
+
+
+def download(url, timeout=None):
+    return fetch_client.get(url, **({"timeout": timeout} if timeout else {}))
+
+
+class NewsItem(dict):
+    """
+    A news result whose article text is downloaded (through the article cache) the first time text() or
+    article_summary() is called, or in the background once prefetch() is called; either waits at most
+    DEADLINE seconds. Everything else is a plain dict; 'full_text' and 'full_summary' are only keys once
+    the text is in (see has_text).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._future = None
+
+    def has_text(self):
+        # True once the text is in; never downloads
+        return 'full_text' in self
+
+    def text(self):
+        self.resolve()
+        return self['full_text']
+
+    def article_summary(self):
+        self.resolve()
+        return self['full_summary']
+
+    def prefetch(self):
+        with self._lock:
+            if not self.has_text() and self._future is None:
+                self._future = get_executor().submit(article_content, self['url'])
+
+    def resolve(self, deadline=DEADLINE):
+        with self._lock:
+            if self.has_text():
+                return
+            future = self._future
+            if future is None:
+                content = article_content(self['url'], deadline)
+            else:
+                try:
+                    content = future.result(deadline or None)
+                except concurrent.futures.TimeoutError:
+                    content = article_cache.FAILED_CONTENT
+            self['full_text'], self['full_summary'] = content
+
+
+def prefetch(news_items):
+    # Start downloading the bodies of the given stubs without waiting for them
+    for item in news_items:
+        if isinstance(item, NewsItem):
+            item.prefetch()
+
+
+def parse_serp(content, query):
+    """
+    News results of one Google News search page: title, source, time, snippet and link of each
+    """
+    news_items = []
+    for result in serp_parser.parse(content):
+        # Google wraps result links in a redirect; keep the article's own URL
+        url = news_urls.clean_url(result['href'])
+        if url:
+            news_items.append(NewsItem({
+                'title': result['title'],
+                'source': result['source'],
+                'time': result['time'],
+                'summary': result['summary'],
+                'url': url,
+                'query': query,
+            }))
+    return news_items
+
+
+def download_article(url, timeout=None):
+    """
+    I/O stage: the article's raw HTML and the charset its server declared (None if it didn't)
+    """
+    response = download(url, timeout)
+    charset = _CHARSET.search(response.headers.get("Content-Type", ""))
+    return response.content, charset.group(1) if charset else None
+
+
+def extract_article(url, html, encoding=None):
+    """
+    CPU stage, run in the extraction pool: article text and summary of raw HTML using newspaper3k.
+    Without a declared charset the bytes are decoded the way newspaper3k does (from the page itself).
+    """
+    if encoding:
+        try:
+            html = html.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            pass
+    article = Article(url, fetch_images=False)
+    article.download(input_html=html)
+    article.parse()
+    return article.text, article.summary
+
+
+def extract(url, html, encoding=None):
+    # Future of extract_article: on the process pool, or a download thread if there is none
+    pool = get_extractor()
+    if pool is None:
+        return get_executor().submit(extract_article, url, html, encoding)
+    return pool.submit(extract_article, url, html, encoding)
+
+
+def record_content(url, content=None, error=None):
+    """
+    Write an extracted (text, summary), or the failure, to the article cache; returns what to show
+    """
+    cache = article_cache.get_cache()
+    if content is not None:
+        if cache is not None:
+            cache.put(url, *content)
+        return content
+    if isinstance(error, BrokenProcessPool):
+        _reset_extractor()
+    # A site backing off or a crashed worker says nothing about the article; worth another try on the next run
+    elif cache is not None and not isinstance(error, fetch_client.HostUnavailable):
+        cache.put_failure(url)
+    return article_cache.FAILED_CONTENT
+
+
+def fetch_article_content(url, deadline=None):
+    """
+    Article text and summary: downloaded through the shared fetch client, extracted in the process pool.
+    The result, or the failure, is written to the article cache. With a deadline (seconds), download and
+    extraction together wait at most that long; missing it gives FAILED_CONTENT, which isn't cached.
+    """
+    expires = time.monotonic() + deadline if deadline else None
+
+    def time_left():
+        if expires is None:
+            return None
+        return min(fetch_client.REQUEST_TIMEOUT, max(expires - time.monotonic(), 0.1))
+
+    try:
+        content = extract(url, *download_article(url, time_left())).result(time_left())
+    except (requests.Timeout, concurrent.futures.TimeoutError) as e:
+        if expires is None:
+            return record_content(url, error=e)
+        logging.info(f"Article {url} missed the {deadline:g}s deadline")
+        return article_cache.FAILED_CONTENT
+    except Exception as e:
+        return record_content(url, error=e)
+    return record_content(url, content)
+
+
+def cached_contents(urls):
+    cache = article_cache.get_cache()
+    return cache.get_many(urls) if cache is not None else {}
+
+
+def article_content(url, deadline=None):
+    # (text, summary) from the article cache, downloading the article on a miss
+    return cached_contents([url]).get(url) or fetch_article_content(url, deadline)
+
+
+class NewsFetcher:
+    """
+    One fetch run: search pages and their article downloads as a single task graph on the running loop.
+    An optional quota (e.g. news_tagger.BucketQuota) decides which articles are still worth having:
+    `wanted(item)` before a download starts, `accept(item)` once its text is in and `done()` to stop early.
+    With a deadline (seconds), everything still pending when it passes is cancelled.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_per_host=MAX_PER_HOST, quota=None, lazy=False,
+                 on_item=None, deadline=DEADLINE):
+        self.max_per_host = max_per_host
+        self.quota = quota
+        self.lazy = lazy
+        # Called with each article as soon as it is accepted, in completion order
+        self.on_item = on_item
+        self.deadline = deadline
+        self.stats = Counter()
+        # Why the fetch was cut short: "quota filled", "deadline" or "cancelled"
+        self.stop_reason = None
+        self.elapsed = 0.0
+        self._loop = None
+        self._expires = None
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._hosts = {}
+        # Canonical URL -> the one item (and download) shared by every query that found it
+        self._articles = {}
+        # Query -> canonical URLs of its search page, in rank order
+        self._keys = {}
+        self._queries = []
+        self._tasks = []
+        self._dropped = []
+        self._failed = []
+
+    def _time_left(self):
+        if self._expires is None:
+            return None
+        return self._expires - self._loop.time()
+
+    async def _run(self, url, fn, *args, wanted=None):
+        # None if `wanted` says no once a slot is free, so queued work for a filled quota never starts.
+        # Under a deadline the request's timeout is capped at the time left.
+        host = urlsplit(url).netloc
+        host_slots = self._hosts.get(host)
+        if host_slots is None:
+            host_slots = self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+        async with host_slots, self._slots:
+            if wanted is not None and not wanted():
+                return None
+            time_left = self._time_left()
+            if time_left is not None:
+                fn = functools.partial(fn, timeout=min(fetch_client.REQUEST_TIMEOUT, max(time_left, 0.1)))
+            return await self._loop.run_in_executor(get_executor(), fn, *args)
+
+    def _wanted(self, item):
+        return self.quota is None or self.quota.wanted(item)
+
+    def _stop(self, reason="quota filled"):
+        # Cancel the search pages and downloads still pending
+        self.stop_reason = self.stop_reason or reason
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+
+    def _skip(self, item, reason):
+        item['skipped'] = True
+        item['drop_reason'] = reason
+        self.stats['skipped'] += 1
+
+    async def _download(self, item):
+        # Download under the connection limits, then extract in the process pool with the slot already freed
+        url = item['url']
+        content = error = None
+        try:
+            page = await self._run(url, download_article, url, wanted=lambda: self._wanted(item))
+            if page is None:
+                return None
+            content = await asyncio.wrap_future(extract(url, *page))
+        except Exception as e:
+            error = e
+            self._failed.append({'stage': 'article', 'url': url, 'query': item['query'], 'reason': _describe(e)})
+        return await self._loop.run_in_executor(get_executor(), record_content, url, content, error)
+
+    async def fetch_article(self, item, cached=None):
+        if cached is None:
+            cached = await self._download(item)
+            if cached is None:
+                self._skip(item, "bucket full")
+                return
+            self.stats['downloaded'] += 1
+        else:
+            self.stats['cached'] += 1
+        item['full_text'], item['full_summary'] = cached
+        self._accept(item)
+
+    def cancel(self):
+        # _stop from another thread, e.g. when a consumer of iter_news stops reading
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._stop, "cancelled")
+            except RuntimeError:
+                pass  # the fetch has already finished
+
+    def _accept(self, item):
+        item['accepted'] = True
+        if self.quota is not None and not self.quota.accept(item):
+            self._skip(item, item.get('rejected', "rejected by quota"))
+            return
+        if self.on_item is not None:
+            self.on_item(item)
+        if self.quota is not None and self.quota.done():
+            self._stop()
+
+    def _dedup(self, news_items, query):
+        """
+        Canonical keys of one search page in rank order, and the items no other query has claimed yet
+        """
+        keys = []
+        fresh = []
+        for rank, item in enumerate(news_items, 1):
+            key = news_urls.canonical_url(item['url'])
+            if key in keys:
+                continue
+            keys.append(key)
+            known = self._articles.get(key)
+            if known is not None:
+                known['hits'].append({'query': query, 'rank': rank})
+                continue
+            item['hits'] = [{'query': query, 'rank': rank}]
+            self._articles[key] = item
+            fresh.append(item)
+        return keys, fresh
+
+    async def fetch_query(self, query):
+        if self.quota is not None and self.quota.done():
+            self._dropped.append({'stage': 'search', 'query': query, 'reason': "quota filled"})
+            return
+        url = search_url(query)
+        try:
+            response = await self._run(url, download, url)
+        except Exception as e:
+            logging.warning(f"News search failed for '{query}': {e}")
+            self._dropped.append({'stage': 'search', 'query': query, 'reason': _describe(e)})
+            return
+        self._keys[query], fresh = self._dedup(parse_serp(response.content, query), query)
+        # Results that could only land in a filled quota are decided from the snippet and never downloaded
+        for item in fresh:
+            if not self._wanted(item):
+                self._skip(item, "bucket full")
+        fresh = [item for item in fresh if not item.get('skipped')]
+        if self.lazy:
+            # Stubs only: the quota judges them on their title and snippet
+            for item in fresh:
+                self._accept(item)
+            return
+        # Cached articles are served straight away; the rest start downloading as soon as
+        # their own search page is parsed
+        cached = await self._loop.run_in_executor(
+            get_executor(), cached_contents, [item['url'] for item in fresh]
+        )
+        await asyncio.gather(*(self.fetch_article(item, cached.get(item['url'])) for item in fresh))
+
+    async def fetch(self, queries):
+        self._loop = asyncio.get_running_loop()
+        self._queries = list(queries)
+        started = self._loop.time()
+        timer = None
+        if self.deadline:
+            self._expires = started + self.deadline
+            timer = self._loop.call_at(self._expires, self._stop, "deadline")
+        self._tasks = [asyncio.ensure_future(self.fetch_query(query)) for query in queries]
+        for query, result in zip(queries, await asyncio.gather(*self._tasks, return_exceptions=True)):
+            if isinstance(result, asyncio.CancelledError):
+                self.stats['cancelled'] += 1
+                if query not in self._keys:
+                    self._dropped.append({'stage': 'search', 'query': query, 'reason': self.stop_reason})
+            elif isinstance(result, Exception):
+                logging.warning(f"News fetch failed for '{query}': {result}")
+                self._dropped.append({'stage': 'search', 'query': query, 'reason': _describe(result)})
+        if timer is not None:
+            timer.cancel()
+        self.elapsed = self._loop.time() - started
+        order = {query: i for i, query in enumerate(queries)}
+        news_items = []
+        seen = set()
+        for query in queries:
+            for key in self._keys.get(query, ()):
+                item = self._articles[key]
+                if key in seen or not item.get('accepted') or item.get('skipped'):
+                    continue
+                seen.add(key)
+                item['hits'].sort(key=lambda hit: (order[hit['query']], hit['rank']))
+                news_items.append(item)
+        self.stats['articles'] = len(news_items)
+        logging.info(
+            f"News fetch: {len(news_items)} articles from {len(self._keys)}/{len(queries)} searches "
+            f"in {self.elapsed:.1f}s, {self.stats['downloaded']} downloaded, {self.stats['cached']} cached, "
+            f"{self.stats['skipped']} skipped, {self.stats['cancelled']} searches cancelled"
+            f"{f' ({self.stop_reason})' if self.stop_reason else ''}; HTTP client so far: {fetch_client.stats()}"
+        )
+        return news_items
+
+    def report(self):
+        """
+        What the fetch returned and what it dropped, and why:
+        {"deadline", "elapsed", "stop_reason", "searches", "searches_done", "articles",
+         "dropped": [{"stage", "query", "url"?, "reason"}], "failed": [...], "reasons": {reason: count}}.
+        Dropped articles are search results left out of the results (by the quota, or still pending when
+        the fetch was cut short); failed ones are returned, but without their text.
+        """
+        dropped = list(self._dropped)
+        for item in self._articles.values():
+            if item.get('skipped'):
+                reason = item.get('drop_reason', "rejected by quota")
+            elif not item.get('accepted'):
+                reason = self.stop_reason or "cancelled"
+            else:
+                continue
+            dropped.append({'stage': 'article', 'query': item['query'], 'url': item['url'], 'reason': reason})
+        return {
+            'deadline': self.deadline or None,
+            'elapsed': round(self.elapsed, 3),
+            'stop_reason': self.stop_reason,
+            'searches': len(self._queries),
+            'searches_done': len(self._keys),
+            'articles': self.stats['articles'],
+            'dropped': dropped,
+            'failed': list(self._failed),
+            'reasons': dict(Counter(entry['reason'] for entry in dropped)),
+        }
+
+
+def _describe(error):
+    # Short, stable reason for a failed request in the fetch report
+    if isinstance(error, fetch_client.HostUnavailable):
+        return "host backing off"
+    if isinstance(error, requests.Timeout):
+        return "timeout"
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"HTTP {error.response.status_code}"
+    return f"{type(error).__name__}: {error}"
+
+
+def describe_report(report):
+    """
+    One line for the page: how long the fetch took and, if it was cut short or dropped anything, what
+    """
+    line = f"{report['articles']} articles from {report['searches_done']}/{report['searches']} searches in {report['elapsed']:.1f}s"
+    if report['stop_reason'] == "deadline":
+        line += f" (stopped at the {report['deadline']:g}s deadline)"
+    reasons = ", ".join(f"{count} {reason}" for reason, count in sorted(report['reasons'].items(), key=lambda r: -r[1]))
+    if reasons:
+        line += f"; dropped: {reasons}"
+    if report['failed']:
+        line += f"; {len(report['failed'])} articles without text"
+    return line
+
+
+def fetch_news(queries, max_concurrency=MAX_CONCURRENCY, max_per_host=MAX_PER_HOST, quota=None, lazy=False,
+               deadline=DEADLINE, report=None):
+    """
+    News items (title, source, time, summary, url, query, full_text, full_summary) for every search query,
+    in query order, one per article. `query` is the search that found it first and `hits` lists every
+    (query, rank) that returned it. With a quota, only the articles it accepted are returned.
+    With lazy=True only the search pages are fetched and each item downloads its text on its first text() call.
+    Returns what has arrived once `deadline` seconds have passed; pass a dict as `report` to have it
+    filled with NewsFetcher.report().
+    Runs its own event loop, so call it from a thread without one (e.g. a Streamlit script).
+    """
+    fetcher = NewsFetcher(max_concurrency, max_per_host, quota, lazy, deadline=deadline)
+    news_items = asyncio.run(fetcher.fetch(queries))
+    if report is not None:
+        report.update(fetcher.report())
+    return news_items
+
+
+def iter_news(queries, max_concurrency=MAX_CONCURRENCY, max_per_host=MAX_PER_HOST, quota=None, lazy=False,
+              deadline=DEADLINE, report=None):
+    """
+    The articles fetch_news would return, each yielded as soon as it is accepted (completion order, not
+    query order). The fetch runs on its own thread, so the caller can render between items; closing the
+    generator early cancels whatever is still pending. `report` is filled once the generator is exhausted
+    or closed.
+    """
+    results = queue.Queue()
+    finished = object()
+    fetcher = NewsFetcher(max_concurrency, max_per_host, quota, lazy, on_item=results.put, deadline=deadline)
+    failure = []
+
+    def run():
+        try:
+            asyncio.run(fetcher.fetch(queries))
+        except Exception as e:
+            failure.append(e)
+        finally:
+            results.put(finished)
+
+    thread = threading.Thread(target=run, name="news-stream", daemon=True)
+    thread.start()
+    yielded = 0
+    try:
+        while True:
+            item = results.get()
+            if item is finished:
+                break
+            yielded += 1
+            yield item
+    finally:
+        fetcher.cancel()
+        if report is not None:
+            # Closed early as well: the cancelled fetch winds up quickly, and then its report is complete.
+            # Articles accepted after the caller stopped reading count as cancelled, not returned.
+            thread.join()
+            while not results.empty():
+                item = results.get_nowait()
+                if item is not finished:
+                    fetcher._skip(item, "cancelled")
+            if not failure:
+                report.update(fetcher.report(), articles=yielded)
+    if failure:
+        raise failure[0]
@@ -0,0 +1,313 @@
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+import country_resolver
+
+# Country and topic tagging for scraped news.
+# Every country spelling and alias (country_resolver.py) and every topic keyword is compiled into one
+# Aho-Corasick automaton over normalized text (lower case, alphanumerics only, the same normalization
+# country_resolver applies to names), so "South Korea", "U.S.A." and "Korea, Rep." all hit their alias.
+# An article is tagged in one linear pass over its text (separators collapsed to a space, which the
+# automaton steps over); matches must start and end on word boundaries.
+# The tags are stored on the news item and reused for ranking and styling; they are not used to drop articles.
+TOPICS = {
+    "gdp": ("GDP", "growth rate", "economic growth", "GDP growth", "percent growth", "% growth",
+            "gdp percentage", "growth percentage"),
+    "bond": ("bond", "bonds", "bond market", "treasuries", "gilts", "sovereign debt"),
+    "stock": ("stock", "stocks", "stock market", "equities", "share prices"),
+    "yield": ("yield", "yields", "yield curve", "bond yields"),
+}
+BUCKETS = ("gdp", "bond", "stock", "yield", "other")
+# Aliases this short only count when written in capitals ("US", "UK"), never "us" or "ca"
+ACRONYM_LENGTH = 4
+# Adjectival forms, so "Indian exports" and "German bund yields" count for their country. They only count
+# capitalized ("Polish", not "polish"); "Korean" is South Korea, as "Korea" is in country_resolver.py.
+ADJECTIVES = {
+    "USA": ("American",), "GBR": ("British",), "DEU": ("German",), "FRA": ("French",), "ITA": ("Italian",),
+    "ESP": ("Spanish",), "PRT": ("Portuguese",), "NLD": ("Dutch",), "BEL": ("Belgian",), "CHE": ("Swiss",),
+    "AUT": ("Austrian",), "SWE": ("Swedish",), "NOR": ("Norwegian",), "DNK": ("Danish",), "FIN": ("Finnish",),
+    "IRL": ("Irish",), "ISL": ("Icelandic",), "POL": ("Polish",), "CZE": ("Czech",), "SVK": ("Slovak",),
+    "HUN": ("Hungarian",), "ROU": ("Romanian",), "BGR": ("Bulgarian",), "GRC": ("Greek",), "HRV": ("Croatian",),
+    "SRB": ("Serbian",), "SVN": ("Slovenian",), "UKR": ("Ukrainian",), "RUS": ("Russian",), "TUR": ("Turkish",),
+    "ISR": ("Israeli",), "JOR": ("Jordanian",), "LBN": ("Lebanese",), "SAU": ("Saudi",), "ARE": ("Emirati",),
+    "QAT": ("Qatari",), "KWT": ("Kuwaiti",), "IRN": ("Iranian",), "IRQ": ("Iraqi",), "EGY": ("Egyptian",),
+    "MAR": ("Moroccan",), "DZA": ("Algerian",), "TUN": ("Tunisian",), "NGA": ("Nigerian",), "GHA": ("Ghanaian",),
+    "KEN": ("Kenyan",), "ETH": ("Ethiopian",), "ZAF": ("South African",), "TCD": ("Chadian",), "IND": ("Indian",),
+    "PAK": ("Pakistani",), "BGD": ("Bangladeshi",), "LKA": ("Sri Lankan",), "CHN": ("Chinese",),
+    "JPN": ("Japanese",), "KOR": ("South Korean", "Korean"), "PRK": ("North Korean",), "TWN": ("Taiwanese",),
+    "VNM": ("Vietnamese",), "THA": ("Thai",), "MYS": ("Malaysian",), "SGP": ("Singaporean",),
+    "IDN": ("Indonesian",), "PHL": ("Philippine", "Filipino"), "AUS": ("Australian",), "CAN": ("Canadian",),
+    "MEX": ("Mexican",), "BRA": ("Brazilian",), "ARG": ("Argentine", "Argentinian"), "CHL": ("Chilean",),
+    "COL": ("Colombian",), "PER": ("Peruvian",), "VEN": ("Venezuelan",), "ECU": ("Ecuadorian",),
+    "URY": ("Uruguayan",), "KAZ": ("Kazakh",),
+}
+# Country names that are also common words or names ("Jordan Peterson", "Chad Smith", "turkey prices",
+# the US state of Georgia): they only count when the same text names the country another way, e.g.
+# "Turkish" or "Turkiye"
+AMBIGUOUS_NAMES = ("Jordan", "Chad", "Turkey", "Georgia")
+# Phrases that contain a country spelling but name no country; they cover it like a longer match would
+NOT_COUNTRIES = ("Latin American", "South American", "North American", "Central American", "Native American",
+                 "American Indian", "Indian Ocean", "West Indian", "New Mexico", "New Mexican")
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+_taggers = {}
+_taggers_lock = threading.Lock()
+
+
+def _spaced(text):
+    # Words separated by single spaces, "%" spelled out so "% growth" and "percent growth" agree
+    return _SEPARATORS.sub(" ", text.replace("%", " percent "))
+
+
+def _normalize(text):
+    # country_resolver.normalize_country, applied to the spaced form
+    return _spaced(text).replace(" ", "").lower()
+
+
+class Automaton:
+    """
+    Aho-Corasick automaton over {lower-case pattern: value}, compiled to a DFA so a scan is one dict
+    lookup per character. Upper case maps like lower case and spaces leave the state unchanged.
+    """
+
+    def __init__(self, patterns):
+        goto = [{}]
+        outputs = [[]]
+        for pattern, value in patterns.items():
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append((len(pattern), value))
+        # Breadth-first, so a state's failure target is always complete before the state itself
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]], **goto[state])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+                queue.append(nxt)
+        for state, moves in enumerate(delta):
+            for ch, nxt in list(moves.items()):
+                if len(ch.upper()) == 1:
+                    moves.setdefault(ch.upper(), nxt)
+            moves[" "] = state
+        self.delta = delta
+        self.outputs = outputs
+        self.size = len(goto)
+
+    def matches(self, text):
+        """
+        (end, pattern length, value) for every pattern occurrence in spaced text, overlapping ones included.
+        `end` is exclusive; the length doesn't count the spaces a match spans.
+        """
+        delta = self.delta
+        outputs = self.outputs
+        state = 0
+        for end, ch in enumerate(text, 1):
+            state = delta[state].get(ch, 0)
+            if outputs[state] and ch != " ":
+                for length, value in outputs[state]:
+                    yield end, length, value
+
+
+def _country_patterns():
+    # {normalized spelling: (country ID, rule)} for economies, rule being "" or one of "acronym",
+    # "capitalized" and "ambiguous" (see tag); regional aggregates are not tagged
+    names = {}
+    for country_id, spellings in country_resolver.COUNTRY_CODES.items():
+        if country_id in country_resolver.AGGREGATE_CODES:
+            continue
+        for spelling in spellings:
+            names.setdefault(_normalize(spelling), set()).add(country_id)
+            # "Egypt, Arab Rep." is "Egypt" in prose; kept only where that's unambiguous ("Korea" is not)
+            short = spelling.split(",")[0].split("(")[0]
+            if short != spelling:
+                names.setdefault(_normalize(short), set()).add(country_id)
+    patterns = {name: (ids.pop(), "") for name, ids in names.items() if len(ids) == 1}
+    for alias, target in country_resolver.COUNTRY_VARIANTS.items():
+        country_id = country_resolver.country_id(target)
+        key = _normalize(alias)
+        if country_id is None or country_id in country_resolver.AGGREGATE_CODES or not key or key in names:
+            continue
+        patterns.setdefault(key, (country_id, "acronym" if len(key) <= ACRONYM_LENGTH else ""))
+    for country_id, adjectives in ADJECTIVES.items():
+        if country_id in country_resolver.COUNTRY_CODES:
+            for adjective in adjectives:
+                patterns.setdefault(_normalize(adjective), (country_id, "capitalized"))
+    for name in AMBIGUOUS_NAMES:
+        if _normalize(name) in patterns:
+            patterns[_normalize(name)] = (patterns[_normalize(name)][0], "ambiguous")
+    for phrase in NOT_COUNTRIES:
+        patterns[_normalize(phrase)] = (None, "")
+    return patterns
+
+
+class NewsTagger:
+    def __init__(self, topics=TOPICS):
+        patterns = {key: ("country", country_id, rule) for key, (country_id, rule) in _country_patterns().items()}
+        for topic, keywords in topics.items():
+            for keyword in keywords:
+                patterns.setdefault(_normalize(keyword), ("topic", topic, ""))
+        self.automaton = Automaton(patterns)
+
+    def tag(self, text):
+        """
+        {"countries": {country ID: mentions}, "topics": {topic: mentions}} for one piece of text.
+        Overlapping country names count once, for the longest ("Papua New Guinea", not "Guinea").
+        Short aliases count only in capitals, adjectives only capitalized, and ambiguous names only
+        if the country is also named some other way.
+        """
+        text = _spaced(text or "")
+        size = len(text)
+        countries = []
+        topics = Counter()
+        for end, length, (kind, key, rule) in self.automaton.matches(text):
+            if end < size and text[end] != " ":
+                continue
+            start = end
+            while length:
+                start -= 1
+                if text[start] != " ":
+                    length -= 1
+            if start and text[start - 1] != " ":
+                continue
+            if kind == "topic":
+                topics[key] += 1
+            elif rule == "acronym" and not text[start:end].isupper():
+                continue
+            elif rule == "capitalized" and not text[start].isupper():
+                continue
+            else:
+                countries.append((start, -end, key, rule == "ambiguous"))
+        mentions = Counter()
+        ambiguous = Counter()
+        covered = -1
+        for start, neg_end, country_id, is_ambiguous in sorted(countries):
+            if start >= covered:
+                covered = -neg_end
+                if country_id is not None:
+                    (ambiguous if is_ambiguous else mentions)[country_id] += 1
+        for country_id, count in ambiguous.items():
+            if country_id in mentions:
+                mentions[country_id] += count
+        return {"countries": dict(mentions), "topics": dict(topics)}
+
+
+def get_tagger():
+    tagger = _taggers.get(None)
+    if tagger is None:
+        with _taggers_lock:
+            tagger = _taggers.get(None)
+            if tagger is None:
+                tagger = _taggers[None] = NewsTagger()
+    return tagger
+
+
+def tag_item(item):
+    """
+    Tag a news item from its title and search snippet, which every item has as soon as its search page is
+    parsed, so tags don't depend on whether the article was downloaded yet; stored on the item and returned
+    """
+    text = "\n".join(item.get(field) or "" for field in ("title", "summary"))
+    item["tags"] = get_tagger().tag(text)
+    return item["tags"]
+
+
+def mentions(item, country_id):
+    return item["tags"]["countries"].get(country_id, 0)
+
+
+def query_bucket(query):
+    query = query.lower()
+    for topic in ("bond", "stock", "yield"):
+        if topic in query:
+            return topic
+    return "other"
+
+
+def news_bucket(item):
+    # GDP by what the article says, the financial markets by the query that found it
+    if item["tags"]["topics"].get("gdp"):
+        return "gdp"
+    return query_bucket(item["query"])
+
+
+def relevance(item, country_id):
+    # Sort key: more mentions of the requested country, then more topic hits, first
+    return (-mentions(item, country_id), -sum(item["tags"]["topics"].values()))
+
+
+class BucketQuota:
+    """
+    Live fill state of fetch_economic_news's buckets: up to `limit` GDP, bond, stock and yield articles,
+    and "other" articles only while those four hold fewer than `limit` together. Used by news_fetch to skip
+    downloads that could only land in a full bucket and to stop once every bucket is full. Country tags
+    only rank articles (see relevance); they never reject one.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.counts = Counter()
+
+    def full(self, bucket):
+        if bucket == "other":
+            return self.counts["other"] >= max(0, self.limit - sum(self.counts[b] for b in BUCKETS if b != "other"))
+        return self.counts[bucket] >= self.limit
+
+    def candidates(self, item):
+        """
+        Buckets an article can still end up in, judged from its title and snippet: GDP if they say so,
+        otherwise GDP (if the body turns out to) or the bucket of the query that found it
+        """
+        if "candidates" not in item:
+            snippet = get_tagger().tag(f"{item.get('title') or ''}\n{item.get('summary') or ''}")
+            item["candidates"] = ("gdp",) if snippet["topics"].get("gdp") else ("gdp", query_bucket(item["query"]))
+        return item["candidates"]
+
+    def wanted(self, item):
+        return not all(self.full(bucket) for bucket in self.candidates(item))
+
+    def accept(self, item):
+        """
+        Tag an article (or a search-result stub) and count it; False (with the reason in item["rejected"])
+        if its bucket is full
+        """
+        tag_item(item)
+        item["bucket"] = news_bucket(item)
+        if self.full(item["bucket"]):
+            item["rejected"] = "bucket full"
+            return False
+        self.counts[item["bucket"]] += 1
+        return True
+
+    def done(self):
+        return all(self.full(bucket) for bucket in BUCKETS)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    tagger = get_tagger()
+    print(f"Compiled {tagger.automaton.size} states in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    text = " ".join(sys.argv[1:]) or (
+        "The U.S. Federal Reserve held rates as South Korea's GDP growth slowed to 2% growth; "
+        "Papua New Guinea and Côte d'Ivoire issued bonds while us traders bought UK gilts."
+    )
+    print(tagger.tag(text))
+    repeat = 200
+    start = time.perf_counter()
+    for _ in range(repeat):
+        tagger.tag(text * 50)
+    print(f"{(time.perf_counter() - start) / (repeat * len(text) * 50) * 1e9:.0f} ns per character")
@@ -0,0 +1,110 @@
+import re
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+# URL clean-up for scraped news links.
+# clean_url turns a search-result href into the article's own URL (Google redirect unwrapped, tracking
+# parameters dropped); canonical_url additionally folds the variants one article is reachable under
+# (http/https, www., AMP pages, parameter order) into one key, used to de-duplicate results across
+# queries and to key the article cache.
+# Names that only ever carry click or campaign tracking, dropped from every host
+TRACKING_PARAMS = frozenset((
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_gl", "fbrefresh",
+    "ns_mchannel", "ns_source", "ns_campaign", "ns_linkname", "ns_fee", "xtor", "at_medium", "at_campaign",
+))
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "__twitter", "wt.")
+# Generic names (ref, sa, ...) can select content elsewhere, so they are only dropped on hosts known
+# to use them for tracking; "google" stands for every google.* host
+HOST_TRACKING_PARAMS = {
+    "google": frozenset(("ved", "usg", "sa", "ust")),
+    "nytimes.com": frozenset(("smid", "smtyp")),
+    "yahoo.com": frozenset(("guccounter", "guce_referrer", "guce_referrer_sig")),
+    "msn.com": frozenset(("ocid",)),
+    "twitter.com": frozenset(("ref_src", "ref_url")),
+    "x.com": frozenset(("ref_src", "ref_url")),
+}
+AMP_PARAMS = frozenset(("amp", "_amp", "outputtype", "amp_js_v", "usqp"))
+
+# ".../story.amp.html" -> ".../story.html", ".../story/amp/" and ".../story/amp.html" -> ".../story"
+_AMP_SUFFIX = re.compile(r"\.amp(\.html?)?$", re.IGNORECASE)
+_AMP_SEGMENT = re.compile(r"/amp(?:\.html?)?/?$", re.IGNORECASE)
+_GOOGLE_HOST = re.compile(r"(?:^|\.)google\.[a-z.]+$")
+
+
+def _host_tracking(host):
+    for domain, names in HOST_TRACKING_PARAMS.items():
+        if host == domain or host.endswith(f".{domain}") or (domain == "google" and _GOOGLE_HOST.search(host)):
+            return names
+    return frozenset()
+
+
+def _is_tracking(name, host_params=frozenset()):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES) or name in host_params
+
+
+def unwrap(url):
+    """
+    The target of a Google redirect ("/url?q=...", "google.com/url?url=..."), an AMP cache or viewer link;
+    any other URL unchanged
+    """
+    url = (url or "").strip()
+    for _ in range(3):  # redirects can be nested
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        if parts.path == "/url" and (not host or _GOOGLE_HOST.search(host)):
+            params = dict(parse_qsl(parts.query))
+            target = params.get("q") or params.get("url")
+            if not target:
+                return url
+            url = target
+        elif host.endswith(".cdn.ampproject.org") and parts.path.startswith("/c/"):
+            # /c/s/www.example.com/path is https, /c/www.example.com/path is http
+            rest = parts.path[len("/c/"):]
+            scheme = "https" if rest.startswith("s/") else "http"
+            url = f"{scheme}://{rest[2:] if scheme == 'https' else rest}"
+        elif _GOOGLE_HOST.search(host) and parts.path.startswith("/amp/"):
+            rest = unquote(parts.path[len("/amp/"):])
+            url = f"https://{rest[2:]}" if rest.startswith("s/") else f"http://{rest}"
+        else:
+            return url
+    return url
+
+
+def clean_url(url):
+    """
+    Article URL to download and show: unwrapped, without tracking parameters or fragment.
+    Returns "" for anything that isn't an http(s) link.
+    """
+    parts = urlsplit(unwrap(url))
+    if parts.scheme.lower() not in ("http", "https") or not parts.netloc:
+        return ""
+    host_params = _host_tracking(parts.netloc.lower().split(":")[0])
+    query = [
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(name, host_params)
+    ]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(query), ""))
+
+
+def canonical_url(url):
+    """
+    One key per article: clean_url, then scheme, "www.", default ports, AMP variants, trailing slash
+    and parameter order folded away
+    """
+    cleaned = clean_url(url)
+    if not cleaned:
+        return (url or "").strip()
+    parts = urlsplit(cleaned)
+    host = parts.netloc.lower()
+    host = re.sub(r":(?:80|443)$", "", host)
+    for prefix in ("www.", "amp.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = _AMP_SEGMENT.sub("", _AMP_SUFFIX.sub(r"\1", parts.path)) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in AMP_PARAMS
+    )
+    return urlunsplit(("https", host, path, urlencode(query), ""))
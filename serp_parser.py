@@ -0,0 +1,206 @@
+import logging
+import os
+import re
+import sys
+import threading
+
+import lxml.html
+from lxml import etree
+
+# Google News result page parser shared by news_fetch.py and "Scrape news.py".
+# Only the results region is parsed: the page is cut at the results container (#rso / #search) and its
+# inline scripts and styles are dropped before lxml sees it. Every selector variant is compiled to XPath
+# once. Google serves a few layouts, so each field has several variants; the variant that matched last is
+# cached per thread and tried first.
+CONTAINERS = (("div", "SoaBEf"), ("div", "Gx5Zad"), ("g-card", None))
+FIELDS = {
+    "title": (".vvjwJb", ".n0jPhd", ".mCBkyc"),
+    "source": (".UPmit", ".LfVVr", ".CEMjEf"),
+    "time": ("time", ".ZE0LJd", ".jJzYv"),
+    "summary": (".GI74Re", ".VwiC3b", ".s3v9rd"),
+}
+DEFAULTS = {"source": "News Source", "time": "Recent", "summary": "No summary available"}
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "serp_fixtures")
+
+# Where the results region starts, most specific first
+REGION_MARKERS = (b'id="rso"', b"id='rso'", b"id=rso", b'id="search"', b"id='search'", b"id=search>")
+
+_NOISE = re.compile(rb"<(script|style|noscript)\b", re.IGNORECASE)
+_CHARSET = re.compile(rb"<meta[^>]*charset=[\"']?([\w-]+)", re.IGNORECASE)
+
+_local = threading.local()
+
+
+def _xpath(tag=None, cls=None, first=False):
+    # CSS "tag.cls" as a descendant XPath; class matched as a whole word, like CSS does
+    path = f"descendant::{tag or '*'}"
+    if cls:
+        path += f"[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+    return etree.XPath(path + ("[1]" if first else ""))
+
+
+def _compile(selector):
+    tag, _, cls = selector.partition(".")
+    return _xpath(tag or None, cls or None, first=True)
+
+
+def _region_start(content):
+    # Start of the tag carrying the first region marker; 0 (the whole page) if there is none
+    for marker in REGION_MARKERS:
+        found = content.find(marker)
+        if found >= 0:
+            return max(content.rfind(b"<", 0, found), 0)
+    return 0
+
+
+def _strip_noise(region):
+    # Drop <script>, <style> and <noscript> blocks; plain finds, since a lazy regex over inline JS is slow
+    parts = []
+    pos = 0
+    while True:
+        block = _NOISE.search(region, pos)
+        if block is None:
+            break
+        parts.append(region[pos:block.start()])
+        end = region.find(b"</" + block.group(1).lower(), block.end())
+        if end < 0:
+            end = region.find(b"</" + block.group(1).upper(), block.end())
+        if end < 0:
+            return b"".join(parts)
+        pos = region.find(b">", end) + 1 or len(region)
+    parts.append(region[pos:])
+    return b"".join(parts)
+
+
+class SerpParser:
+    def __init__(self, containers=CONTAINERS, fields=FIELDS):
+        self.containers = [_xpath(tag, cls) for tag, cls in containers]
+        self.fields = {field: [_compile(selector) for selector in selectors] for field, selectors in fields.items()}
+        self.link = _xpath("a", first=True)
+        # Index of the variant that matched last, per container list and field; tried first next time
+        self.plan = dict.fromkeys(("container", *fields), 0)
+        self._html_parsers = {}
+
+    def _html_parser(self, encoding):
+        parser = self._html_parsers.get(encoding)
+        if parser is None:
+            parser = self._html_parsers[encoding] = lxml.html.HTMLParser(
+                encoding=encoding, remove_comments=True, remove_pis=True, no_network=True
+            )
+        return parser
+
+    def _first(self, name, variants, node):
+        # Try the cached variant, then the others in order; cache whichever matches
+        last = self.plan[name]
+        found = variants[last](node)
+        if found:
+            return found
+        for i, variant in enumerate(variants):
+            if i != last:
+                found = variant(node)
+                if found:
+                    self.plan[name] = i
+                    return found
+        return None
+
+    def _region(self, content):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+            encoding = "utf-8"
+        else:
+            charset = _CHARSET.search(content, 0, 4096)
+            encoding = charset.group(1).decode("ascii").lower() if charset else "utf-8"
+        return _strip_noise(content[_region_start(content):]), encoding
+
+    def parse(self, content):
+        """
+        {title, source, time, summary, href} for each result on a search page, in page order.
+        href is the raw link; results without a title or link are left out.
+        """
+        region, encoding = self._region(content)
+        if not region.strip():
+            return []
+        try:
+            root = lxml.html.fromstring(region, parser=self._html_parser(encoding))
+        except (etree.ParserError, LookupError) as e:
+            logging.warning(f"Unparseable search page: {e}")
+            return []
+        articles = self._first("container", self.containers, root) or []
+        results = []
+        for article in articles:
+            title = self._first("title", self.fields["title"], article)
+            link = self.link(article)
+            href = link[0].get("href", "") if link else ""
+            if not title or not href:
+                continue
+            result = {"title": title[0].text_content().strip()}
+            for field in ("source", "time", "summary"):
+                found = self._first(field, self.fields[field], article)
+                result[field] = found[0].text_content().strip() if found else DEFAULTS[field]
+            result["href"] = href
+            results.append(result)
+        return results
+
+
+def get_parser():
+    # One parser (and its cached variants) per thread: lxml parsers and XPath evaluators must not be shared across threads
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = SerpParser()
+    return parser
+
+
+def parse(content):
+    return get_parser().parse(content)
+
+
+def parse_legacy(content):
+    """
+    The previous parser (whole page through html.parser, every variant tried per article); check_fixtures compares against it
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, "html.parser")
+    articles = soup.select("div.SoaBEf") or soup.select("div.Gx5Zad") or soup.select("g-card")
+    results = []
+    for article in articles:
+        title_elem = article.select_one(".vvjwJb") or article.select_one(".n0jPhd") or article.select_one(".mCBkyc")
+        link_elem = article.select_one("a")
+        href = link_elem.get("href", "") if link_elem else ""
+        if not title_elem or not href:
+            continue
+        result = {"title": title_elem.get_text().strip()}
+        for field in ("source", "time", "summary"):
+            elem = None
+            for selector in FIELDS[field]:
+                elem = article.select_one(selector)
+                if elem:
+                    break
+            result[field] = elem.get_text().strip() if elem else DEFAULTS[field]
+        result["href"] = href
+        results.append(result)
+    return results
+
+
+def check_fixtures(fixtures_dir=FIXTURES_DIR):
+    """
+    Parse the saved search pages (*.html) with both parsers; the result count and the pages where they differ.
+    The bundled pages are small synthetic ones, one per layout, so this checks behaviour, not speed.
+    """
+    pages = {}
+    for name in sorted(os.listdir(fixtures_dir)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(fixtures_dir, name), "rb") as f:
+                pages[name] = f.read()
+    parser = SerpParser()
+    return {
+        "pages": len(pages),
+        "results": sum(len(parser.parse(content)) for content in pages.values()),
+        "mismatches": [name for name, content in pages.items() if parse_legacy(content) != parser.parse(content)],
+    }
+
+
+if __name__ == "__main__":
+    result = check_fixtures(sys.argv[1] if len(sys.argv) > 1 else FIXTURES_DIR)
+    print(f"{result['pages']} pages, {result['results']} results")
+    print(f"results differ for: {result['mismatches']}" if result["mismatches"] else "both parsers agree")
@@ -1,5 +1,4 @@
-from fuzzywuzzy import process
-import re
+import country_resolver
 
 def normalize_country_name(input_country, countries_list, threshold=80):
     """
@@ -13,49 +12,8 @@ def normalize_country_name(input_country, countries_list, threshold=80):
     Returns:
         str: The matched standard country name or None if no good match
     """
-    # Clean input: remove special characters, extra spaces
-    cleaned_input = re.sub(r'[^\w\s]', ' ', input_country)
-    cleaned_input = re.sub(r'\s+', ' ', cleaned_input).strip()
-    
-    # Handle common abbreviations and alternative names
-    common_mappings = {
-        'usa': 'United States',
-        'us': 'United States',
-        'u.s.': 'United States',
-        'u.s.a.': 'United States',
-        'america': 'United States',
-        'uk': 'United Kingdom',
-        'u.k.': 'United Kingdom',
-        'great britain': 'United Kingdom',
-        'uae': 'United Arab Emirates',
-        'china': 'China',
-        'prc': 'China',
-        'russia': 'Russian Federation',
-        'skorea': 'Korea, Rep.',
-        'south korea': 'Korea, Rep.',
-        'nkorea': 'Korea, Dem. Peoples Rep.',
-        'north korea': 'Korea, Dem. Peoples Rep.',
-        'hk': 'Hong Kong SAR, China',
-        'hong kong': 'Hong Kong SAR, China',
-        'czech': 'Czech Republic',
-        'czechia': 'Czech Republic',
-    }
-    
-    # Check direct mapping first
-    lower_input = cleaned_input.lower()
-    if lower_input in common_mappings:
-        mapped_name = common_mappings[lower_input]
-        # Ensure the mapped name is in our list
-        if mapped_name in countries_list:
-            return mapped_name
-    
-    # Use fuzzy matching for more complex cases
-    match, score = process.extractOne(cleaned_input, countries_list)
-    
-    if score >= threshold:
-        return match
-    else:
-        return None
+    # Aliases, normalization and scoring are shared with the app (see country_resolver.py)
+    return country_resolver.resolve_country(input_country, countries_list, threshold=threshold)
 
 # Example usage
 def main():
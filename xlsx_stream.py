@@ -0,0 +1,173 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+# Streaming column extractor for .xlsx workbooks.
+# Reads xl/sharedStrings.xml and the worksheet XML incrementally and keeps only the requested
+# columns, so a cold load_data never materializes the hundreds of other country columns.
+# Mirrors the gem_cache read API (sheet_names / read_header / read_sheet).
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+PERIOD_COLUMN = "Unnamed: 0"
+
+_cell_ref = re.compile(r"([A-Z]+)")
+
+
+def _column_index(letters):
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+def _sheet_paths(zf):
+    """
+    Map sheet name -> worksheet part path, following workbook.xml and its relationships
+    """
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    targets = {}
+    for rel in rels.iter(f"{PKG_REL_NS}Relationship"):
+        target = rel.get("Target")
+        # Targets are usually relative to xl/, but some writers emit absolute part names
+        targets[rel.get("Id")] = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    return {
+        sheet.get("name"): targets[sheet.get(f"{REL_NS}id")]
+        for sheet in workbook.iter(f"{MAIN_NS}sheet")
+    }
+
+
+def _shared_strings(zf):
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    for _, elem in ET.iterparse(zf.open("xl/sharedStrings.xml"), events=("end",)):
+        if elem.tag == f"{MAIN_NS}si":
+            # Rich text runs split a string over several <t> elements
+            strings.append("".join(t.text or "" for t in elem.iter(f"{MAIN_NS}t")))
+            elem.clear()
+    return strings
+
+
+def _cell_value(cell, shared):
+    cell_type = cell.get("t")
+    if cell_type == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{MAIN_NS}t")) or None
+    v = cell.find(f"{MAIN_NS}v")
+    if v is None or v.text is None:
+        return None
+    if cell_type == "s":
+        return shared[int(v.text)] or None
+    if cell_type in ("str", "e"):
+        return v.text or None
+    if cell_type == "b":
+        return bool(int(v.text))
+    return float(v.text)
+
+
+def _iter_rows(zf, sheet_path, shared, wanted=None):
+    """
+    Yield {column index: value} per row. The header row is always yielded in full; after it only
+    the `wanted` column indices are kept (all if None). The set may be filled in once the caller
+    has seen the header. Each row element is dropped from the tree as soon as it has been read.
+    """
+    sheet_data = None
+    header_seen = False
+    for event, elem in ET.iterparse(zf.open(sheet_path), events=("start", "end")):
+        if event == "start":
+            if elem.tag == f"{MAIN_NS}sheetData":
+                sheet_data = elem
+            continue
+        if elem.tag != f"{MAIN_NS}row":
+            continue
+        row = {}
+        position = 0
+        for cell in elem.iter(f"{MAIN_NS}c"):
+            ref = cell.get("r")
+            # The r attribute is optional; fall back to the running position
+            index = _column_index(_cell_ref.match(ref).group(1)) if ref else position
+            position = index + 1
+            if wanted is None or not header_seen or index in wanted:
+                value = _cell_value(cell, shared)
+                if value is not None:
+                    row[index] = value
+        header_seen = header_seen or bool(row)
+        yield row
+        if sheet_data is not None:
+            sheet_data.clear()
+
+
+def _header_names(row):
+    # Same headers pandas would produce: stripped text, "Unnamed: N" for blanks
+    width = max(row) + 1 if row else 0
+    return [str(row[i]).strip() if i in row else f"Unnamed: {i}" for i in range(width)]
+
+
+def _period_label(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def sheet_names(file_path):
+    with zipfile.ZipFile(file_path) as zf:
+        return list(_sheet_paths(zf))
+
+
+def read_header(file_path, sheet_name):
+    """
+    Header row of a sheet; stops parsing right after the first row
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        sheet_path = _sheet_paths(zf).get(sheet_name)
+        if sheet_path is None:
+            return None
+        shared = _shared_strings(zf)
+        for row in _iter_rows(zf, sheet_path, shared):
+            if row:
+                return _header_names(row)
+        return []
+
+
+def read_sheet(file_path, sheet_name, columns=None):
+    """
+    Stream the requested columns of a sheet into a frame shaped like gem_cache.read_sheet:
+    period labels as text, values as float64, rows with no data in those columns dropped.
+    Returns None if the workbook has no such sheet.
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        sheet_path = _sheet_paths(zf).get(sheet_name)
+        if sheet_path is None:
+            return None
+        shared = _shared_strings(zf)
+        wanted_indices = set()
+        rows = _iter_rows(zf, sheet_path, shared, wanted_indices)
+        header = []
+        for row in rows:
+            if row:
+                header = _header_names(row)
+                break
+        if columns is None:
+            columns = header
+        positions = {name: i for i, name in enumerate(header)}
+        missing = [name for name in columns if name not in positions]
+        if missing:
+            raise KeyError(f"{missing} not in sheet '{sheet_name}' of {file_path}")
+        wanted = {positions[name]: name for name in columns}
+        # From here on the generator keeps only the wanted cells of each row
+        wanted_indices.update(wanted)
+        records = [row for row in rows if row]
+
+    data = {}
+    for index, name in wanted.items():
+        cells = [row.get(index) for row in records]
+        if name == PERIOD_COLUMN:
+            data[name] = [None if value is None else _period_label(value) for value in cells]
+        else:
+            data[name] = pd.to_numeric(pd.Series(cells, dtype=object), errors="coerce").astype(np.float64)
+    return pd.DataFrame(data, columns=list(columns))